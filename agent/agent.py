@@ -1,9 +1,11 @@
 """
 Agent module for Schelling segregation model.
-Contains the Agent class representing individual residents.
+Contains the Agent class representing individual residents and the
+AgentTable class storing a whole population column by column.
 """
 
-from config import AGENT_TYPE_A, AGENT_TYPE_B, NEIGHBORHOOD_RADIUS, GRID_SIZE
+import numpy as np
+from config import AGENT_TYPE_A, NEIGHBORHOOD_RADIUS, GRID_SIZE, TOPOLOGY_TORUS
 
 
 class Agent:
@@ -14,6 +16,10 @@ class Agent:
     similar agents. They move if their neighborhood doesn't meet their
     similarity threshold.
 
+    An Agent is a lightweight view of one row of an AgentTable: reading or
+    assigning an attribute reads or writes the table's columns. An agent
+    created directly owns a private one-row table.
+
     Attributes:
         x (int): The x-coordinate of the agent's position.
         y (int): The y-coordinate of the agent's position.
@@ -21,20 +27,87 @@ class Agent:
         similarity_threshold (float): Minimum fraction of similar neighbors desired (0-1).
     """
 
+    __slots__ = ('_table', '_index')
+
     def __init__(self, x, y, agent_type, similarity_threshold=0.3):
         """
         Initialize an agent with position, type, and preferences.
 
         Args:
-            x (int): Initial x-coordinate (0 to GRID_SIZE-1).
-            y (int): Initial y-coordinate (0 to GRID_SIZE-1).
+            x (int): Initial x-coordinate (0 to width-1).
+            y (int): Initial y-coordinate (0 to height-1).
             agent_type (int): Agent type (AGENT_TYPE_A or AGENT_TYPE_B).
             similarity_threshold (float): Desired fraction of similar neighbors (0-1).
         """
-        self.x = x
-        self.y = y
-        self.agent_type = agent_type
-        self.similarity_threshold = similarity_threshold
+        self._table = AgentTable([x], [y], [agent_type], [similarity_threshold])
+        self._index = 0
+
+    @classmethod
+    def view(cls, table, index):
+        """
+        Create an agent backed by a row of an existing table.
+
+        Args:
+            table (AgentTable): Table holding the agent's state.
+            index (int): Row of the agent in the table.
+
+        Returns:
+            Agent: View of the given row.
+        """
+        agent = cls.__new__(cls)
+        agent._table = table
+        agent._index = index
+        return agent
+
+    @property
+    def table(self):
+        """AgentTable: Table holding this agent's state."""
+        return self._table
+
+    @property
+    def index(self):
+        """int: Row of this agent in its table (its agent id)."""
+        return self._index
+
+    @property
+    def x(self):
+        return int(self._table.x[self._index])
+
+    @x.setter
+    def x(self, value):
+        self._table.x[self._index] = value
+
+    @property
+    def y(self):
+        return int(self._table.y[self._index])
+
+    @y.setter
+    def y(self, value):
+        self._table.y[self._index] = value
+
+    @property
+    def agent_type(self):
+        return int(self._table.agent_type[self._index])
+
+    @agent_type.setter
+    def agent_type(self, value):
+        self._table.agent_type[self._index] = value
+
+    @property
+    def similarity_threshold(self):
+        return float(self._table.threshold[self._index])
+
+    @similarity_threshold.setter
+    def similarity_threshold(self, value):
+        self._table.threshold[self._index] = value
+
+    def __eq__(self, other):
+        if not isinstance(other, Agent):
+            return NotImplemented
+        return self._table is other._table and self._index == other._index
+
+    def __hash__(self):
+        return hash((id(self._table), self._index))
 
     def is_happy(self, env):
         """
@@ -49,21 +122,14 @@ class Agent:
         Returns:
             bool: True if agent is happy, False otherwise.
         """
-        neighbor_positions = self.get_neighbor_positions()
-
-        similar_count = 0
-        total_count = 0
+        counts = env.count_neighbors(self.x, self.y)
 
-        for nx, ny in neighbor_positions:
-            neighbor_type = env.grid[nx, ny]
-
-            # Skip empty cells
-            if neighbor_type == 0:
-                continue
-
-            total_count += 1
-            if neighbor_type == self.agent_type:
-                similar_count += 1
+        # Empty cells are not part of the comparison
+        total_count = counts['type_a'] + counts['type_b']
+        if self.agent_type == AGENT_TYPE_A:
+            similar_count = counts['type_a']
+        else:
+            similar_count = counts['type_b']
 
         # If no neighbors, agent is unhappy (isolated)
         if total_count == 0:
@@ -74,28 +140,133 @@ class Agent:
 
         return similarity >= self.similarity_threshold
 
-    def get_neighbor_positions(self):
+    def get_neighbor_positions(self, env=None):
         """
         Get list of neighboring cell positions (Moore neighborhood).
 
-        Returns positions of all cells within NEIGHBORHOOD_RADIUS, excluding
-        the agent's own position. Grid wraps around (toroidal).
+        Returns positions of all cells within the neighborhood radius,
+        excluding the agent's own position. On a toroidal grid positions wrap
+        around; on a bounded grid positions past the edge are left out.
+
+        Args:
+            env (Environment): Environment defining grid size, radius and
+                topology. Defaults to a toroidal GRID_SIZE grid with
+                NEIGHBORHOOD_RADIUS.
 
         Returns:
             list: List of (x, y) tuples for neighboring positions.
         """
+        if env is None:
+            width = height = GRID_SIZE
+            radius = NEIGHBORHOOD_RADIUS
+            wrap = True
+        else:
+            width, height, radius = env.width, env.height, env.radius
+            wrap = env.topology == TOPOLOGY_TORUS
+
         neighbors = []
 
-        for dx in range(-NEIGHBORHOOD_RADIUS, NEIGHBORHOOD_RADIUS + 1):
-            for dy in range(-NEIGHBORHOOD_RADIUS, NEIGHBORHOOD_RADIUS + 1):
+        for dx in range(-radius, radius + 1):
+            for dy in range(-radius, radius + 1):
                 # Skip self
                 if dx == 0 and dy == 0:
                     continue
 
+                nx = self.x + dx
+                ny = self.y + dy
+
                 # Handle grid wrapping
-                nx = (self.x + dx) % GRID_SIZE
-                ny = (self.y + dy) % GRID_SIZE
+                if wrap:
+                    nx %= width
+                    ny %= height
+                elif not (0 <= nx < width and 0 <= ny < height):
+                    continue
 
                 neighbors.append((nx, ny))
 
-        return neighbors
\ No newline at end of file
+        return neighbors
+
+
+class AgentTable:
+    """
+    Columnar (struct-of-arrays) store for a population of agents.
+
+    Each attribute of the population is one NumPy array indexed by agent id,
+    so vectorized code can read and update all agents at once. Indexing or
+    iterating the table yields Agent views of single rows.
+
+    Attributes:
+        x (np.ndarray): X-coordinates (int32).
+        y (np.ndarray): Y-coordinates (int32).
+        agent_type (np.ndarray): Type identifiers (uint8).
+        threshold (np.ndarray): Similarity thresholds (float64).
+    """
+
+    def __init__(self, x, y, agent_type, threshold):
+        """
+        Initialize a table from column data.
+
+        Args:
+            x (array-like): X-coordinates.
+            y (array-like): Y-coordinates.
+            agent_type (array-like): Agent types (AGENT_TYPE_A or AGENT_TYPE_B).
+            threshold (array-like): Similarity thresholds (0-1).
+
+        Raises:
+            ValueError: If the columns have different lengths.
+        """
+        self.x = np.array(x, dtype=np.int32)
+        self.y = np.array(y, dtype=np.int32)
+        self.agent_type = np.array(agent_type, dtype=np.uint8)
+        self.threshold = np.array(threshold, dtype=np.float64)
+
+        lengths = {len(self.x), len(self.y), len(self.agent_type), len(self.threshold)}
+        if len(lengths) != 1:
+            raise ValueError("All agent columns must have the same length")
+
+    @classmethod
+    def from_agents(cls, agents, bind=False):
+        """
+        Build a table from a sequence of Agent objects.
+
+        Args:
+            agents (iterable): Agent objects to copy.
+            bind (bool): If True, the given agents become views of the new
+                table, so later changes to either stay in sync.
+
+        Returns:
+            AgentTable: Table with one row per agent, in order.
+        """
+        if isinstance(agents, cls):
+            return agents
+
+        agents = list(agents)
+        table = cls([a.x for a in agents], [a.y for a in agents],
+                    [a.agent_type for a in agents],
+                    [a.similarity_threshold for a in agents])
+
+        if bind:
+            for i, agent in enumerate(agents):
+                agent._table = table
+                agent._index = i
+
+        return table
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("agent index out of range")
+        return Agent.view(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Agent.view(self, i)
+
+    @property
+    def nbytes(self):
+        """int: Memory used by the agent columns, in bytes."""
+        return self.x.nbytes + self.y.nbytes + self.agent_type.nbytes + self.threshold.nbytes
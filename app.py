@@ -7,85 +7,158 @@ neighbors lead to emergent residential segregation patterns.
 Based on Thomas Schelling's segregation model (1971).
 """
 
+import shutil
+import tempfile
+import weakref
+
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
-import random
-from matplotlib.colors import ListedColormap
 
-from agent.agent import Agent
 from environment.environment import Environment
-from helper import (create_agents, randomly_place_agents, calculate_segregation_index,
-                    calculate_happiness_rate, get_unhappy_agents)
-from config import (GRID_SIZE, AGENT_TYPE_A, AGENT_TYPE_B,
-                    COLOR_EMPTY, COLOR_TYPE_A, COLOR_TYPE_B)
+from simulation.simulation import Simulation
+from simulation.sweep import run_sweep
+from simulation.pacing import FramePacer, DEFAULT_FRAME_BUDGET
+from simulation.trajectory import MoveRecorder, MoveLog, Replay
+from helper import create_agents, randomly_place_agents
+from render import render_grid, image_scale
+from config import (GRID_SIZE, NEIGHBORHOOD_RADIUS, TOPOLOGY_TORUS, TOPOLOGY_BOUNDED,
+                    COLOR_EMPTY, COLOR_TYPE_A, COLOR_TYPE_B, CONVERGED_ALL_HAPPY,
+                    CONVERGED_NO_MOVES, CONVERGED_PLATEAU, DEFAULT_PLATEAU_WINDOW,
+                    MOVE_POLICY_SEQUENTIAL, MOVE_POLICY_SYNCHRONOUS, MOVE_POLICY_CHECKERBOARD,
+                    MOVE_POLICY_BEST_OF_K, DEFAULT_MOVE_CANDIDATES)
+
+# Seconds between frames of the live view while the simulation runs
+LIVE_REFRESH_SECONDS = 0.05
+
+MOVE_POLICY_LABELS = {
+    MOVE_POLICY_SEQUENTIAL: "Sequential",
+    MOVE_POLICY_SYNCHRONOUS: "Synchronous",
+    MOVE_POLICY_CHECKERBOARD: "Checkerboard (local)",
+    MOVE_POLICY_BEST_OF_K: "Best of k",
+}
+
+CONVERGENCE_MESSAGES = {
+    CONVERGED_ALL_HAPPY: "Converged: every agent is happy.",
+    CONVERGED_NO_MOVES: "Converged: unhappy agents remain, but none of them can move.",
+    CONVERGED_PLATEAU: "Converged: segregation and happiness have plateaued.",
+}
 
 # Initialize session state
 if 'initialized' not in st.session_state:
     st.session_state.initialized = False
     st.session_state.running = False
-    st.session_state.step = 0
-    st.session_state.segregation_history = []
-    st.session_state.happiness_history = []
     st.session_state.agents = []
     st.session_state.env = None
-
-
-def initialize_simulation(num_type_a, num_type_b, similarity_threshold):
+    st.session_state.sim = None
+    st.session_state.log_dir = None
+    st.session_state.log_cleanup = None
+    st.session_state.replay = None
+    st.session_state.pacer = None
+    st.session_state.convergence = None
+
+
+def close_recording():
+    """Stop recording the current simulation and delete its move log."""
+    if st.session_state.sim is not None and st.session_state.sim.recorder is not None:
+        st.session_state.sim.recorder.close()
+    if st.session_state.log_cleanup is not None:
+        st.session_state.log_cleanup()
+    st.session_state.log_dir = None
+    st.session_state.log_cleanup = None
+    st.session_state.replay = None
+
+
+def initialize_simulation(num_type_a, num_type_b, similarity_threshold, grid, policy,
+                          candidates):
     """Initialize or reset the simulation."""
-    st.session_state.env = Environment()
+    env = Environment(**grid)
 
     # Create agents
-    st.session_state.agents = create_agents(num_type_a, num_type_b, similarity_threshold)
+    agents = create_agents(num_type_a, num_type_b, similarity_threshold)
 
     # Place agents randomly
-    randomly_place_agents(st.session_state.agents, st.session_state.env)
+    try:
+        randomly_place_agents(agents, env)
+    except ValueError as error:
+        st.sidebar.error(str(error))
+        return
+
+    close_recording()
+    st.session_state.env = env
+    st.session_state.agents = agents
 
-    # Reset statistics
-    st.session_state.step = 0
-    st.session_state.segregation_history = []
-    st.session_state.happiness_history = []
+    # Create engine (resets step counter and statistics)
+    st.session_state.sim = Simulation(st.session_state.env, st.session_state.agents,
+                                      policy=policy, candidates=candidates)
+    st.session_state.pacer = FramePacer()
+    st.session_state.convergence = None
     st.session_state.initialized = True
 
+    # Record moves so past steps can be replayed. The log is deleted on the
+    # next reset, or once an abandoned session's simulation is garbage
+    # collected or the server exits, so no session leaves it behind in /tmp.
+    st.session_state.log_dir = tempfile.mkdtemp(prefix='schelling-')
+    st.session_state.log_cleanup = weakref.finalize(
+        st.session_state.sim, shutil.rmtree, st.session_state.log_dir, ignore_errors=True)
+    st.session_state.sim.record(MoveRecorder(st.session_state.log_dir))
+
+
+def historical_grid(step):
+    """Rebuild the grid after a past step from the move log."""
+    sim = st.session_state.sim
+    replay = st.session_state.replay
+    if replay is None or replay.log.last_step < sim.step_count:
+        sim.recorder.flush()
+        replay = Replay(MoveLog(st.session_state.log_dir))
+        st.session_state.replay = replay
+    return replay.grid_at(step)
+
 
 def run_step():
     """Execute one simulation step."""
     if len(st.session_state.agents) == 0:
         return
 
-    # Get unhappy agents
-    unhappy = get_unhappy_agents(st.session_state.agents, st.session_state.env)
+    st.session_state.sim.step()
+
 
-    # Move unhappy agents to random empty cells
-    empty_cells = st.session_state.env.get_empty_cells()
+def stop_if_converged(plateau_window):
+    """Stop auto-run once the simulation has converged; return True if it has."""
+    state = st.session_state.sim.convergence(plateau_window=plateau_window)
+    st.session_state.convergence = state
+    if state is not None:
+        st.session_state.running = False
+    return state is not None
 
-    if len(empty_cells) > 0 and len(unhappy) > 0:
-        # Shuffle unhappy agents
-        random.shuffle(unhappy)
 
-        for agent in unhappy:
-            if len(empty_cells) == 0:
-                break
+def run_frame(frame_budget, plateau_window):
+    """Execute as many steps as fit in the frame budget (seconds)."""
+    if len(st.session_state.agents) == 0:
+        return
+
+    st.session_state.pacer.budget = frame_budget
+    st.session_state.pacer.advance(st.session_state.sim, plateau_window=plateau_window)
 
-            # Pick random empty cell
-            new_x, new_y = random.choice(empty_cells)
 
-            # Remove from empty cells list
-            empty_cells.remove((new_x, new_y))
+def fits_on_grid(num_agents, grid):
+    """Show an error and return False if the agents cannot all be placed on the grid."""
+    num_cells = grid['width'] * grid['height']
+    if num_agents > num_cells:
+        st.error(f"Not enough cells ({num_cells}) on the {grid['width']}x{grid['height']} "
+                 f"grid for {num_agents} agents; enlarge the grid or reduce the population.")
+        return False
+    return True
 
-            # Add old position to empty cells
-            empty_cells.append((agent.x, agent.y))
 
-            # Move agent
-            st.session_state.env.move_agent(agent, new_x, new_y)
+def legend_item(color, label):
+    """HTML for one color swatch and its label."""
+    return (f'<span style="display:inline-block;width:12px;height:12px;background:{color};'
+            f'border:1px solid #999;margin:0 4px 0 12px;vertical-align:middle"></span>{label}')
 
-    # Update statistics
-    segregation = calculate_segregation_index(st.session_state.agents, st.session_state.env)
-    happiness = calculate_happiness_rate(st.session_state.agents, st.session_state.env)
 
-    st.session_state.segregation_history.append(segregation)
-    st.session_state.happiness_history.append(happiness)
-    st.session_state.step += 1
+GRID_LEGEND = (legend_item(COLOR_TYPE_A, 'Red Agents') + legend_item(COLOR_TYPE_B, 'Blue Agents')
+               + legend_item(COLOR_EMPTY, 'Empty'))
 
 
 # ============================================================================
@@ -109,20 +182,48 @@ with st.sidebar:
     num_type_a = col1.slider("Number of Red Agents", 50, 1500, 1000, 50)
     num_type_b = col2.slider("Number of Blue Agents", 50, 1500, 1000, 50)
 
+    st.subheader("Grid")
+    col1, col2 = st.columns(2)
+    grid_width = col1.slider("Grid Width", 20, 200, GRID_SIZE, 10)
+    grid_height = col2.slider("Grid Height", 20, 200, GRID_SIZE, 10)
+    wrap_edges = st.checkbox("Wrap edges (torus)", value=True)
+    neighborhood_radius = st.slider("Neighborhood Radius", 1, 3, NEIGHBORHOOD_RADIUS, 1)
+
+    grid = {
+        'width': grid_width,
+        'height': grid_height,
+        'radius': neighborhood_radius,
+        'topology': TOPOLOGY_TORUS if wrap_edges else TOPOLOGY_BOUNDED,
+    }
+
     st.subheader("Preferences")
     similarity_threshold = st.slider(
         "Similarity Threshold",
         0.0, 1.0, 0.3, 0.05,
         help="Minimum fraction of similar neighbors desired (e.g., 0.3 = want 30%+ similar)"
     )
+    move_policy = st.selectbox(
+        "Move Policy", list(MOVE_POLICY_LABELS), format_func=MOVE_POLICY_LABELS.get,
+        help="Sequential: unhappy agents move one by one and may take cells vacated "
+             "earlier in the step. Synchronous: all move at once, and each contested "
+             "empty cell goes to one of its claimants at random. Checkerboard: agents "
+             "step to an adjacent empty cell, one non-interfering sublattice at a time. "
+             "Best of k: each agent samples k empty cells and takes the most similar."
+    )
+    if move_policy == MOVE_POLICY_BEST_OF_K:
+        move_candidates = st.slider("Candidates (k)", 1, 32, DEFAULT_MOVE_CANDIDATES, 1,
+                                    help="Empty cells each unhappy agent samples per step")
+    else:
+        move_candidates = DEFAULT_MOVE_CANDIDATES
 
     # Control buttons
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("🎬 Start", use_container_width=True):
             if not st.session_state.initialized:
-                initialize_simulation(num_type_a, num_type_b, similarity_threshold)
-            st.session_state.running = True
+                initialize_simulation(num_type_a, num_type_b, similarity_threshold, grid,
+                                      move_policy, move_candidates)
+            st.session_state.running = st.session_state.initialized
 
     with col2:
         if st.button("⏸️ Pause", use_container_width=True):
@@ -130,116 +231,140 @@ with st.sidebar:
 
     with col3:
         if st.button("🔄 Reset", use_container_width=True):
-            initialize_simulation(num_type_a, num_type_b, similarity_threshold)
+            initialize_simulation(num_type_a, num_type_b, similarity_threshold, grid,
+                                  move_policy, move_candidates)
             st.session_state.running = False
 
-    steps_per_update = st.slider("Steps per Update", 1, 20, 1, 1)
+    plateau_window = st.slider("Plateau Window", 5, 100, DEFAULT_PLATEAU_WINDOW, 5,
+                               help="Stop once neither metric has improved for this many steps")
+    adaptive_speed = st.checkbox("Adaptive speed", value=False,
+                                 help="Run as many steps per frame as fit in a time budget")
+    if adaptive_speed:
+        frame_budget_ms = st.slider("Frame Budget (ms)", 20, 500,
+                                    int(DEFAULT_FRAME_BUDGET * 1000), 10)
+        steps_per_update = None
+    else:
+        frame_budget_ms = None
+        steps_per_update = st.slider("Steps per Update", 1, 20, 1, 1)
 
 
 # ============================================================================
 # TAB 1: SIMULATION
 # ============================================================================
 
-with tab1:
-    # Main content
-    if not st.session_state.initialized:
-        st.info("👈 Configure parameters and click **Start** to begin simulation")
-    else:
-        # Display metrics
-        col1, col2, col3, col4 = st.columns(4)
+@st.fragment(run_every=LIVE_REFRESH_SECONDS if st.session_state.running else None)
+def live_view(steps_per_update, frame_budget_ms, plateau_window):
+    """
+    Advance the running simulation and draw it.
+
+    Runs as a fragment that refreshes itself on a timer while the
+    simulation is running, so only this view is re-executed per frame,
+    not the sidebar or the Sensitivity Analysis tab. Each frame runs
+    either a fixed number of steps or, with a frame budget, as many as fit.
+    Auto-run stops, and the timer with it, once the simulation converges.
+    """
+    was_running = st.session_state.running
+    if was_running and not stop_if_converged(plateau_window):
+        if frame_budget_ms is not None:
+            run_frame(frame_budget_ms / 1000, plateau_window)
+        else:
+            for _ in range(steps_per_update):
+                run_step()
+                if stop_if_converged(plateau_window):
+                    break
+        stop_if_converged(plateau_window)
+    if was_running and not st.session_state.running:
+        # Full rerun re-creates this fragment without its timer
+        st.rerun()
 
-        with col1:
-            st.metric("Step", st.session_state.step)
+    if st.session_state.convergence is not None:
+        st.success(CONVERGENCE_MESSAGES[st.session_state.convergence])
 
-        with col2:
-            occupancy = st.session_state.env.get_occupancy_rate()
-            st.metric("Occupancy", f"{occupancy:.1%}")
-
-        with col3:
-            if len(st.session_state.segregation_history) > 0:
-                seg = st.session_state.segregation_history[-1]
-                st.metric("Segregation", f"{seg:.3f}")
-            else:
-                st.metric("Segregation", "N/A")
-
-        with col4:
-            if len(st.session_state.happiness_history) > 0:
-                happy = st.session_state.happiness_history[-1]
-                st.metric("Happy Agents", f"{happy:.1%}")
-            else:
-                st.metric("Happy Agents", "N/A")
-
-        # Visualizations
-        col1, col2 = st.columns(2)
+    # Step to display: the live grid, or a past step rebuilt from the move log
+    sim = st.session_state.sim
+    shown_step = sim.step_count
+    if sim.step_count > 0 and not st.session_state.running:
+        shown_step = st.slider("Replay Step", 0, sim.step_count, sim.step_count,
+                               help="Scrub back through past steps; the live simulation is unaffected")
+    shown_grid = st.session_state.env.grid if shown_step == sim.step_count \
+        else historical_grid(shown_step)
 
-        with col1:
-            # Grid visualization
-            fig1, ax1 = plt.subplots(figsize=(8, 8), dpi=100)
+    # Display metrics
+    col1, col2, col3, col4 = st.columns(4)
 
-            # Create custom colormap
-            cmap = ListedColormap([COLOR_EMPTY, COLOR_TYPE_A, COLOR_TYPE_B])
+    with col1:
+        st.metric("Step", shown_step)
 
-            # Plot grid
-            ax1.imshow(st.session_state.env.grid.T, cmap=cmap, origin='lower',
-                       interpolation='nearest', vmin=0, vmax=2)
+    with col2:
+        occupancy = st.session_state.env.get_occupancy_rate()
+        st.metric("Occupancy", f"{occupancy:.1%}")
 
-            ax1.set_title("Residential Grid", fontsize=14, fontweight='bold')
-            ax1.set_xlabel("X Position")
-            ax1.set_ylabel("Y Position")
-            ax1.grid(False)
+    with col3:
+        if shown_step > 0:
+            seg = sim.segregation_history[shown_step - 1]
+            st.metric("Segregation", f"{seg:.3f}")
+        else:
+            st.metric("Segregation", "N/A")
+
+    with col4:
+        if shown_step > 0:
+            happy = sim.happiness_history[shown_step - 1]
+            st.metric("Happy Agents", f"{happy:.1%}")
+        else:
+            st.metric("Happy Agents", "N/A")
+
+    # Visualizations
+    col1, col2 = st.columns(2)
 
-            # Add legend
-            from matplotlib.patches import Patch
+    with col1:
+        # Grid visualization: palette lookup straight to pixels, no figure
+        st.markdown("**Residential Grid**")
+        scale = image_scale(st.session_state.env.width, st.session_state.env.height)
+        st.image(render_grid(shown_grid, scale),
+                 caption="X position → (left to right), Y position ↑ (bottom to top)")
+        st.markdown(GRID_LEGEND, unsafe_allow_html=True)
 
-            legend_elements = [
-                Patch(facecolor=COLOR_TYPE_A, label='Red Agents'),
-                Patch(facecolor=COLOR_TYPE_B, label='Blue Agents'),
-                Patch(facecolor=COLOR_EMPTY, label='Empty')
-            ]
-            ax1.legend(handles=legend_elements, loc='upper right')
+    with col2:
+        # Metrics over time
+        fig2, (ax2, ax3) = plt.subplots(2, 1, figsize=(8, 8), dpi=100)
+
+        # Segregation over time
+        if len(st.session_state.sim.segregation_history) > 0:
+            ax2.plot(st.session_state.sim.segregation_history, color='#FF6B6B', linewidth=2)
+            ax2.fill_between(range(len(st.session_state.sim.segregation_history)),
+                             st.session_state.sim.segregation_history, alpha=0.3, color='#FF6B6B')
+
+        ax2.set_title("Segregation Index Over Time", fontsize=14, fontweight='bold')
+        ax2.set_xlabel("Step")
+        ax2.set_ylabel("Segregation Index")
+        ax2.set_ylim([0, 1])
+        ax2.grid(alpha=0.3)
+        ax2.axhline(y=0.5, color='gray', linestyle='--', alpha=0.5, label='50% threshold')
+        ax2.legend()
+
+        # Happiness over time
+        if len(st.session_state.sim.happiness_history) > 0:
+            ax3.plot(st.session_state.sim.happiness_history, color='#4ECDC4', linewidth=2)
+            ax3.fill_between(range(len(st.session_state.sim.happiness_history)),
+                             st.session_state.sim.happiness_history, alpha=0.3, color='#4ECDC4')
+
+        ax3.set_title("Agent Happiness Over Time", fontsize=14, fontweight='bold')
+        ax3.set_xlabel("Step")
+        ax3.set_ylabel("Fraction Happy")
+        ax3.set_ylim([0, 1])
+        ax3.grid(alpha=0.3)
+
+        plt.tight_layout()
+        st.pyplot(fig2)
+        plt.close()
 
-            st.pyplot(fig1)
-            plt.close()
 
-        with col2:
-            # Metrics over time
-            fig2, (ax2, ax3) = plt.subplots(2, 1, figsize=(8, 8), dpi=100)
-
-            # Segregation over time
-            if len(st.session_state.segregation_history) > 0:
-                ax2.plot(st.session_state.segregation_history, color='#FF6B6B', linewidth=2)
-                ax2.fill_between(range(len(st.session_state.segregation_history)),
-                                 st.session_state.segregation_history, alpha=0.3, color='#FF6B6B')
-
-            ax2.set_title("Segregation Index Over Time", fontsize=14, fontweight='bold')
-            ax2.set_xlabel("Step")
-            ax2.set_ylabel("Segregation Index")
-            ax2.set_ylim([0, 1])
-            ax2.grid(alpha=0.3)
-            ax2.axhline(y=0.5, color='gray', linestyle='--', alpha=0.5, label='50% threshold')
-            ax2.legend()
-
-            # Happiness over time
-            if len(st.session_state.happiness_history) > 0:
-                ax3.plot(st.session_state.happiness_history, color='#4ECDC4', linewidth=2)
-                ax3.fill_between(range(len(st.session_state.happiness_history)),
-                                 st.session_state.happiness_history, alpha=0.3, color='#4ECDC4')
-
-            ax3.set_title("Agent Happiness Over Time", fontsize=14, fontweight='bold')
-            ax3.set_xlabel("Step")
-            ax3.set_ylabel("Fraction Happy")
-            ax3.set_ylim([0, 1])
-            ax3.grid(alpha=0.3)
-
-            plt.tight_layout()
-            st.pyplot(fig2)
-            plt.close()
-
-    # Auto-run logic
-    if st.session_state.running:
-        for _ in range(steps_per_update):
-            run_step()
-        st.rerun()
+with tab1:
+    # Main content
+    if not st.session_state.initialized:
+        st.info("👈 Configure parameters and click **Start** to begin simulation")
+    else:
+        live_view(steps_per_update, frame_budget_ms, plateau_window)
 
     # Information panel
     with st.expander("ℹ️ About This Model"):
@@ -294,47 +419,25 @@ with tab2:
             sa_pop_b = st.number_input("Blue Agents", 50, 1500, 1000, 50)
             sa_steps = st.slider("Steps per Run", 50, 500, 100, 50)
 
-            if st.button("🚀 Run Analysis", use_container_width=True):
+            if st.button("🚀 Run Analysis", use_container_width=True) \
+                    and fits_on_grid(sa_pop_a + sa_pop_b, grid):
                 with st.spinner("Running simulations..."):
                     thresholds = np.linspace(0.1, 0.9, 9)
-                    segregation_results = []
-                    happiness_results = []
+                    segregation_results = [0.0] * len(thresholds)
+                    happiness_results = [0.0] * len(thresholds)
 
                     progress_bar = st.progress(0)
 
-                    for i, threshold in enumerate(thresholds):
-                        # Run simulation
-                        env = Environment()
-                        agents = create_agents(sa_pop_a, sa_pop_b, threshold)
-                        randomly_place_agents(agents, env)
-
-                        # Run to convergence
-                        for step in range(sa_steps):
-                            unhappy = get_unhappy_agents(agents, env)
-                            if len(unhappy) == 0:
-                                break
-
-                            empty_cells = env.get_empty_cells()
-                            if len(empty_cells) == 0:
-                                break
-
-                            random.shuffle(unhappy)
-
-                            for agent in unhappy:
-                                if len(empty_cells) == 0:
-                                    break
-                                new_x, new_y = random.choice(empty_cells)
-                                empty_cells.remove((new_x, new_y))
-                                empty_cells.append((agent.x, agent.y))
-                                env.move_agent(agent, new_x, new_y)
-
-                        # Record results
-                        seg = calculate_segregation_index(agents, env)
-                        hap = calculate_happiness_rate(agents, env)
-                        segregation_results.append(seg)
-                        happiness_results.append(hap)
-
-                        progress_bar.progress((i + 1) / len(thresholds))
+                    # Run each threshold to convergence in a worker process
+                    runs = [dict(grid=grid, num_type_a=sa_pop_a, num_type_b=sa_pop_b,
+                                 threshold=float(threshold), max_steps=sa_steps,
+                                 plateau_window=plateau_window, policy=move_policy,
+                                 candidates=move_candidates)
+                            for threshold in thresholds]
+                    for done, (i, (seg, hap)) in enumerate(run_sweep(runs), start=1):
+                        segregation_results[i] = seg
+                        happiness_results[i] = hap
+                        progress_bar.progress(done / len(runs))
 
                     # Store in session state
                     st.session_state.sa_thresholds = thresholds
@@ -397,51 +500,30 @@ with tab2:
             sa_threshold = st.slider("Similarity Threshold", 0.1, 0.9, 0.3, 0.1)
             sa_steps_ratio = st.number_input("Steps per Run", 50, 500, 200, 50, key='ratio_steps')
 
-            if st.button("🚀 Run Ratio Analysis", use_container_width=True):
+            if st.button("🚀 Run Ratio Analysis", use_container_width=True) \
+                    and fits_on_grid(sa_total_pop, grid):
                 with st.spinner("Running simulations..."):
                     # Test different ratios from 10% to 50% minority
                     minority_fractions = np.linspace(0.1, 0.5, 9)
-                    segregation_results = []
-                    happiness_results = []
+                    segregation_results = [0.0] * len(minority_fractions)
+                    happiness_results = [0.0] * len(minority_fractions)
 
                     progress_bar = st.progress(0)
 
-                    for i, minority_frac in enumerate(minority_fractions):
+                    # Run each ratio to convergence in a worker process
+                    runs = []
+                    for minority_frac in minority_fractions:
                         num_minority = int(sa_total_pop * minority_frac)
-                        num_majority = sa_total_pop - num_minority
-
-                        # Run simulation
-                        env = Environment()
-                        agents = create_agents(num_minority, num_majority, sa_threshold)
-                        randomly_place_agents(agents, env)
-
-                        # Run to convergence
-                        for step in range(sa_steps_ratio):
-                            unhappy = get_unhappy_agents(agents, env)
-                            if len(unhappy) == 0:
-                                break
-
-                            empty_cells = env.get_empty_cells()
-                            if len(empty_cells) == 0:
-                                break
-
-                            random.shuffle(unhappy)
-
-                            for agent in unhappy:
-                                if len(empty_cells) == 0:
-                                    break
-                                new_x, new_y = random.choice(empty_cells)
-                                empty_cells.remove((new_x, new_y))
-                                empty_cells.append((agent.x, agent.y))
-                                env.move_agent(agent, new_x, new_y)
-
-                        # Record results
-                        seg = calculate_segregation_index(agents, env)
-                        hap = calculate_happiness_rate(agents, env)
-                        segregation_results.append(seg)
-                        happiness_results.append(hap)
-
-                        progress_bar.progress((i + 1) / len(minority_fractions))
+                        runs.append(dict(grid=grid, num_type_a=num_minority,
+                                         num_type_b=sa_total_pop - num_minority,
+                                         threshold=sa_threshold, max_steps=sa_steps_ratio,
+                                         plateau_window=plateau_window,
+                                         policy=move_policy,
+                                         candidates=move_candidates))
+                    for done, (i, (seg, hap)) in enumerate(run_sweep(runs), start=1):
+                        segregation_results[i] = seg
+                        happiness_results[i] = hap
+                        progress_bar.progress(done / len(runs))
 
                     # Store in session state
                     st.session_state.ratio_fractions = minority_fractions
@@ -3,7 +3,7 @@ Configuration file for Schelling segregation model.
 Contains global constants used across modules.
 """
 
-# Grid dimensions
+# Default grid dimensions
 GRID_SIZE = 50
 
 # Agent types
@@ -14,8 +14,29 @@ EMPTY_CELL = 0
 # Neighborhood
 NEIGHBORHOOD_RADIUS = 1  # Moore neighborhood (8 neighbors)
 
+# Grid topology
+TOPOLOGY_TORUS = 'torus'      # Edges wrap around
+TOPOLOGY_BOUNDED = 'bounded'  # Cells past an edge do not exist
+DEFAULT_TOPOLOGY = TOPOLOGY_TORUS
+
+# Convergence states reported by Simulation.convergence()
+CONVERGED_ALL_HAPPY = 'all_happy'  # No agent wants to move
+CONVERGED_NO_MOVES = 'no_moves'    # Unhappy agents remain but none can move
+CONVERGED_PLATEAU = 'plateau'      # Metrics stopped changing over the plateau window
+DEFAULT_PLATEAU_WINDOW = 20        # Steps
+DEFAULT_PLATEAU_TOLERANCE = 1e-3   # Largest metric change still counted as flat
+
+# Move policies: how unhappy agents pick their new cells each step
+MOVE_POLICY_SEQUENTIAL = 'sequential'      # One at a time; vacated cells reusable
+MOVE_POLICY_SYNCHRONOUS = 'synchronous'    # All at once; one winner per vacancy
+MOVE_POLICY_CHECKERBOARD = 'checkerboard'  # To adjacent cells, one sublattice at a time
+MOVE_POLICY_BEST_OF_K = 'best_of_k'        # Most similar of k sampled empty cells
+DEFAULT_MOVE_POLICY = MOVE_POLICY_SEQUENTIAL
+DEFAULT_MOVE_CANDIDATES = 8                # k, cells sampled per mover by best_of_k
+
 # Similarity preferences
 DEFAULT_SIMILARITY_THRESHOLD = 0.3  # Want 30%+ similar neighbors
+DEFAULT_SWEEP_THRESHOLDS = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]  # Headless sweep
 
 # Visualization colors
 COLOR_EMPTY = '#FFFFFF'     # White
@@ -4,7 +4,124 @@ Contains the Environment class representing the grid world.
 """
 
 import numpy as np
-from config import GRID_SIZE, EMPTY_CELL, AGENT_TYPE_A, AGENT_TYPE_B
+from environment.index_set import IndexSet
+from environment.packing import pack_cells, unpack_cells
+from config import (GRID_SIZE, EMPTY_CELL, AGENT_TYPE_A, AGENT_TYPE_B, NEIGHBORHOOD_RADIUS,
+                    TOPOLOGY_TORUS, TOPOLOGY_BOUNDED, DEFAULT_TOPOLOGY)
+
+
+def box_sum(values, radius, wrap=True):
+    """
+    Sum values over the (2r+1) x (2r+1) window around every cell.
+
+    Computed as a separable box filter over the last two axes: shifted
+    copies are added along x, then along y. Leading axes are independent
+    grids, so a stack of grids is filtered in one call. Shifts wrap when
+    wrap is set (torus) and fill with zeros otherwise (bounded grid).
+
+    Args:
+        values (np.ndarray): Array whose last two axes are (width, height).
+        radius (int): Window radius.
+        wrap (bool): Whether edges wrap around.
+
+    Returns:
+        np.ndarray: Window sums, including the center cell.
+    """
+    def shift(array, offset, axis):
+        if wrap:
+            return np.roll(array, offset, axis=axis)
+        shifted = np.zeros_like(array)
+        source = [slice(None)] * array.ndim
+        target = [slice(None)] * array.ndim
+        if offset > 0:
+            source[axis], target[axis] = slice(None, -offset), slice(offset, None)
+        else:
+            source[axis], target[axis] = slice(-offset, None), slice(None, offset)
+        shifted[tuple(target)] = array[tuple(source)]
+        return shifted
+
+    rows = values.copy()
+    for d in range(1, radius + 1):
+        rows += shift(values, d, -2)
+        rows += shift(values, -d, -2)
+
+    box = rows.copy()
+    for d in range(1, radius + 1):
+        box += shift(rows, d, -1)
+        box += shift(rows, -d, -1)
+    return box
+
+
+def sublattice_colors(size, spacing, wrap=True):
+    """
+    Color the cells along one axis so that cells sharing a color are at
+    least spacing apart.
+
+    Cells are colored by index modulo spacing. On a wrapping axis whose
+    size is not a multiple of spacing, the last size % spacing cells would
+    sit too close to the first ones across the seam, so each gets a color
+    of its own. Coloring both axes this way and pairing the colors gives
+    sublattices whose cells are at least spacing apart in Chebyshev
+    distance.
+
+    Args:
+        size (int): Number of cells along the axis.
+        spacing (int): Minimum distance between cells of one color.
+        wrap (bool): Whether the axis wraps around.
+
+    Returns:
+        np.ndarray: Color of each cell, in [0, number of colors).
+    """
+    colors = np.arange(size) % spacing
+    full = size - size % spacing
+    if wrap and full < size:
+        colors[full:] = (spacing if full else 0) + np.arange(size - full)
+    return colors
+
+
+def count_dtype(radius):
+    """
+    Smallest signed integer type that holds any neighbor count for a radius.
+
+    Args:
+        radius (int): Neighborhood radius.
+
+    Returns:
+        type: np.int16 while a (2r+1) x (2r+1) window fits in it, else np.int32.
+    """
+    return np.int16 if (2 * radius + 1) ** 2 <= np.iinfo(np.int16).max else np.int32
+
+
+class MoveConflictError(ValueError):
+    """
+    Raised when a batch of moves is rejected.
+
+    Attributes:
+        conflicts (np.ndarray): Positions in the batch of the rejected moves.
+    """
+
+    def __init__(self, message, conflicts):
+        super().__init__(message)
+        self.conflicts = conflicts
+
+
+def _duplicated(values):
+    """
+    Mark every element whose value occurs more than once.
+
+    Args:
+        values (np.ndarray): 1D array.
+
+    Returns:
+        np.ndarray: Boolean mask aligned with values.
+    """
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    repeat = ordered[1:] == ordered[:-1]
+    mask = np.zeros(len(values), dtype=bool)
+    mask[order[1:][repeat]] = True
+    mask[order[:-1][repeat]] = True
+    return mask
 
 
 class Environment:
@@ -16,13 +133,170 @@ class Environment:
     methods for agent movement.
 
     Attributes:
-        grid (np.ndarray): 2D array representing the grid (GRID_SIZE x GRID_SIZE).
-                          Values: 0=empty, 1=type A, 2=type B
+        width (int): Number of cells along x.
+        height (int): Number of cells along y.
+        radius (int): Neighborhood radius used for happiness.
+        topology (str): TOPOLOGY_TORUS (edges wrap) or TOPOLOGY_BOUNDED.
+        rng (np.random.Generator): Random stream for everything drawn on
+                          this grid (placement, moves, sampling).
+        grid (np.ndarray): 2D uint8 array representing the grid (width x height).
+                          Values: 0=empty, 1=type A, 2=type B. In packed mode
+                          it is unpacked on first access.
+        vacancies (IndexSet): Flat indices (x * height + y) of empty cells,
+                          built from the grid on first access and then kept
+                          up to date by place_agent, remove_agent and
+                          move_agent.
+        agents (AgentTable): Population whose happiness is tracked
+                          incrementally, or None (see track()).
+        occupant (np.ndarray): Agent id in each cell, -1 if empty (tracking only).
+        type_counts (np.ndarray): Type A and type B neighbor counts of every
+                          cell, shape (2, width, height) (tracking only).
+        unhappy (IndexSet): Ids of currently unhappy agents (tracking only).
+        similarity (np.ndarray): Same-type fraction of each agent's neighbors,
+                          0 for agents without neighbors (tracking only).
     """
 
-    def __init__(self):
-        """Initialize an empty grid."""
-        self.grid = np.zeros((GRID_SIZE, GRID_SIZE), dtype=int)
+    def __init__(self, width=GRID_SIZE, height=GRID_SIZE, radius=NEIGHBORHOOD_RADIUS,
+                 topology=DEFAULT_TOPOLOGY, packed=False, seed=None):
+        """
+        Initialize an empty grid.
+
+        Args:
+            width (int): Number of cells along x.
+            height (int): Number of cells along y.
+            radius (int): Neighborhood radius (1 = Moore neighborhood).
+            topology (str): TOPOLOGY_TORUS or TOPOLOGY_BOUNDED.
+            packed (bool): Start in packed mode, storing 2 bits per cell
+                until the grid is first accessed (see pack()).
+            seed (int, np.random.SeedSequence or np.random.Generator):
+                Seed for rng, or an existing generator to share. None
+                draws fresh entropy.
+
+        Raises:
+            ValueError: If a dimension or the radius is invalid, the topology
+                is unknown, or on a torus the neighborhood is wider than the
+                grid (it would wrap onto itself and count cells twice).
+        """
+        if width < 1 or height < 1:
+            raise ValueError(f"Grid dimensions must be positive, got {width}x{height}")
+        if radius < 1:
+            raise ValueError(f"Neighborhood radius must be at least 1, got {radius}")
+        if topology not in (TOPOLOGY_TORUS, TOPOLOGY_BOUNDED):
+            raise ValueError(f"Unknown topology '{topology}'")
+        if topology == TOPOLOGY_TORUS and 2 * radius + 1 > min(width, height):
+            raise ValueError(f"Neighborhood radius {radius} is too large for a "
+                             f"{width}x{height} torus")
+
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.topology = topology
+        self.rng = np.random.default_rng(seed)
+
+        self._grid = np.zeros((width, height), dtype=np.uint8)
+        self._packed = None
+        if packed:
+            self.pack()
+        self._vacancies = None
+
+        self.agents = None
+        self.occupant = None
+        self.type_counts = None
+        self.unhappy = None
+        self.similarity = None
+        self._has_neighbors = None
+        self._stamp = None
+
+        # Running totals behind segregation_index()
+        self._similarity_sum = 0.0
+        self._valid_agents = 0
+
+        # Flat-index offsets of the neighborhood, center excluded
+        offsets = np.arange(-radius, radius + 1)
+        dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+        not_center = (dx != 0) | (dy != 0)
+        self._dx = dx[not_center]
+        self._dy = dy[not_center]
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            self.unpack()
+        return self._grid
+
+    @grid.setter
+    def grid(self, value):
+        self._grid = value
+        self._packed = None
+
+    @property
+    def vacancies(self):
+        if self._vacancies is None:
+            self.rebuild_vacancies()
+        return self._vacancies
+
+    @vacancies.setter
+    def vacancies(self, value):
+        self._vacancies = value
+
+    @property
+    def is_packed(self):
+        """bool: True while the grid is held in 2-bit packed form."""
+        return self._grid is None
+
+    @property
+    def grid_nbytes(self):
+        """int: Memory used by the grid storage, in bytes."""
+        return self._packed.nbytes if self.is_packed else self._grid.nbytes
+
+    def pack(self):
+        """
+        Switch to packed mode, storing the grid at 2 bits per cell.
+
+        Frees the uint8 grid, cutting its memory 4x (32x compared to int64)
+        while the environment is idle or being serialized. Reading env.grid
+        transparently unpacks it again; neighbor_counts() and
+        get_occupancy_rate() work on packed grids without unpacking them
+        permanently.
+        """
+        if not self.is_packed:
+            self._packed = pack_cells(self._grid)
+            self._grid = None
+
+    def unpack(self):
+        """Switch back to an unpacked uint8 grid."""
+        if self.is_packed:
+            self._grid = unpack_cells(self._packed, (self.width, self.height))
+            self._packed = None
+
+    def packed_cells(self):
+        """
+        Get the grid in 2-bit packed form without changing the mode.
+
+        Returns:
+            np.ndarray: Packed cells as produced by pack_cells().
+        """
+        return self._packed if self.is_packed else pack_cells(self._grid)
+
+    def _cells(self):
+        """
+        Get the grid as a uint8 array without leaving packed mode.
+
+        Returns:
+            np.ndarray: The live grid, or a temporary unpacked copy.
+        """
+        if self.is_packed:
+            return unpack_cells(self._packed, (self.width, self.height))
+        return self._grid
+
+    def rebuild_vacancies(self):
+        """
+        Rebuild the vacancy index from the grid.
+
+        Needed only after writing to the grid directly instead of through
+        the placement and movement methods.
+        """
+        self.vacancies = IndexSet.from_mask(self._cells() == EMPTY_CELL)
 
     def get_empty_cells(self):
         """
@@ -31,12 +305,19 @@ class Environment:
         Returns:
             list: List of (x, y) tuples for empty cells.
         """
-        empty_cells = []
-        for x in range(GRID_SIZE):
-            for y in range(GRID_SIZE):
-                if self.grid[x, y] == EMPTY_CELL:
-                    empty_cells.append((x, y))
-        return empty_cells
+        return [tuple(cell) for cell in np.argwhere(self.grid == EMPTY_CELL).tolist()]
+
+    def sample_empty_cell(self):
+        """
+        Pick a uniformly random empty cell in constant time.
+
+        Returns:
+            tuple: (x, y) coordinates of an empty cell.
+
+        Raises:
+            ValueError: If there are no empty cells.
+        """
+        return divmod(self.vacancies.sample(self.rng), self.height)
 
     def place_agent(self, agent, x, y):
         """
@@ -48,23 +329,109 @@ class Environment:
             y (int): Y-coordinate.
 
         Raises:
-            ValueError: If cell is already occupied.
+            ValueError: If cell is already occupied, or the environment is
+                tracking agents and this one is not part of the population
+                or is already on the grid.
         """
         if self.grid[x, y] != EMPTY_CELL:
             raise ValueError(f"Cell ({x}, {y}) is already occupied")
+        if self.agents is not None:
+            if agent.table is not self.agents:
+                raise ValueError("Agent is not part of the tracked population")
+            if self.occupant[agent.x, agent.y] == agent.index:
+                raise ValueError(f"Agent is already on the grid at ({agent.x}, {agent.y})")
 
+        cell = x * self.height + y
         self.grid[x, y] = agent.agent_type
+        self.vacancies.discard(cell)
         agent.x = x
         agent.y = y
 
+        if self.agents is not None:
+            cells = np.array([cell])
+            neighbors = self._neighborhoods(cells)
+            self.occupant.flat[cell] = agent.index
+            self._shift_counts(neighbors, self.agents.agent_type[[agent.index]], 1)
+            self._refresh(cells, neighbors)
+
+    def place_agents(self, agents, x, y):
+        """
+        Place a whole table of agents at once.
+
+        Validation, the grid write, the agent columns and the vacancy index
+        are each one vectorized operation, so placing millions of agents
+        costs a few passes over arrays. Not available while tracking; use
+        place_agent.
+
+        Args:
+            agents (AgentTable): Agents to place, one per coordinate pair.
+            x (array-like): X-coordinates.
+            y (array-like): Y-coordinates.
+
+        Raises:
+            ValueError: If the environment is tracking agents, the
+                coordinates do not match the agents, a cell is outside the
+                grid or occupied, or two agents share a cell.
+        """
+        if self.agents is not None:
+            raise ValueError("Cannot bulk-place agents while tracking; use place_agent")
+
+        x = np.asarray(x, dtype=np.int64)
+        y = np.asarray(y, dtype=np.int64)
+        if len(x) != len(agents) or len(y) != len(agents):
+            raise ValueError(f"Expected {len(agents)} coordinates, got {len(x)} and {len(y)}")
+        if np.any((x < 0) | (x >= self.width) | (y < 0) | (y >= self.height)):
+            raise ValueError(f"Coordinates outside the {self.width}x{self.height} grid")
+
+        cells = x * self.height + y
+        grid = self.grid.reshape(-1)
+        if np.any(grid[cells] != EMPTY_CELL):
+            raise ValueError("Some cells are already occupied")
+        # Shared cells collapse into one write, so they show up as fewer
+        # newly occupied cells than agents
+        occupied = np.count_nonzero(grid)
+        grid[cells] = agents.agent_type
+        if np.count_nonzero(grid) - occupied != len(cells):
+            grid[cells] = EMPTY_CELL
+            raise ValueError("Several agents share a cell")
+
+        agents.x[:] = x
+        agents.y[:] = y
+        # Scattered removals cost far more per key than one sequential
+        # rebuild, which wins once a sizable part of the grid is filled
+        if len(cells) > self.grid.size // 8:
+            self.rebuild_vacancies()
+        else:
+            self.vacancies.discard_many(cells)
+
     def remove_agent(self, agent):
         """
         Remove an agent from the grid.
 
         Args:
             agent (Agent): The agent to remove.
+
+        Raises:
+            ValueError: If the environment is tracking agents and this one
+                is not on the grid.
         """
+        cell = agent.x * self.height + agent.y
+        if self.agents is not None:
+            agent_id = self.occupant.flat[cell]
+            if agent_id < 0 or (agent.table is self.agents and agent.index != agent_id):
+                raise ValueError(f"Agent is not on the grid at ({agent.x}, {agent.y})")
+
         self.grid[agent.x, agent.y] = EMPTY_CELL
+        self.vacancies.add(cell)
+
+        if self.agents is not None:
+            cells = np.array([cell])
+            neighbors = self._neighborhoods(cells)
+            self.occupant.flat[cell] = -1
+            self.unhappy.discard(agent_id)
+            self._forget(agent_id)
+            self._shift_counts(neighbors, self.agents.agent_type[[agent_id]], -1)
+            self._refresh(cells, neighbors)
 
     def move_agent(self, agent, new_x, new_y):
         """
@@ -76,52 +443,358 @@ class Environment:
             new_y (int): New y-coordinate.
 
         Raises:
-            ValueError: If destination cell is occupied.
+            ValueError: If destination cell is occupied, or the environment
+                is tracking agents and this one is not on the grid.
         """
         if self.grid[new_x, new_y] != EMPTY_CELL:
             raise ValueError(f"Cannot move to occupied cell ({new_x}, {new_y})")
 
+        if self.agents is not None:
+            agent_id = self.occupant[agent.x, agent.y]
+            if agent_id < 0 or (agent.table is self.agents and agent.index != agent_id):
+                raise ValueError(f"Agent is not on the grid at ({agent.x}, {agent.y})")
+            self.apply_moves(np.array([agent_id]), np.array([new_x * self.height + new_y]))
+            return
+
         # Remove from old position
         self.grid[agent.x, agent.y] = EMPTY_CELL
+        self.vacancies.add(agent.x * self.height + agent.y)
 
         # Place at new position
         self.grid[new_x, new_y] = agent.agent_type
+        self.vacancies.discard(new_x * self.height + new_y)
         agent.x = new_x
         agent.y = new_y
 
-    def count_neighbors(self, x, y, radius=1):
+    def move_agents(self, agent_ids, dest_x, dest_y):
+        """
+        Move a batch of tracked agents, all or none.
+
+        The whole batch is validated at once: each agent id must be valid,
+        on the grid and appear once, and each destination must be on the
+        grid, claimed by one agent only, and empty or vacated by another
+        agent of the batch (so chains and swaps are allowed). A valid batch
+        is applied with apply_moves(); otherwise nothing changes.
+
+        Args:
+            agent_ids (array-like): Rows of the tracked agent table.
+            dest_x (array-like): Destination x-coordinate per agent.
+            dest_y (array-like): Destination y-coordinate per agent.
+
+        Raises:
+            ValueError: If the environment is not tracking agents or the
+                arrays have different lengths.
+            MoveConflictError: If any move is invalid; its conflicts
+                attribute holds the positions of all offending moves.
+        """
+        if self.agents is None:
+            raise ValueError("Batch moves need tracked agents; call track() first")
+
+        ids = np.asarray(agent_ids, dtype=np.int64)
+        dest_x = np.asarray(dest_x, dtype=np.int64)
+        dest_y = np.asarray(dest_y, dtype=np.int64)
+        if not len(ids) == len(dest_x) == len(dest_y):
+            raise ValueError(f"Got {len(ids)} agents but {len(dest_x)} and {len(dest_y)} "
+                             "destination coordinates")
+
+        invalid = (ids < 0) | (ids >= len(self.agents))
+        invalid |= (dest_x < 0) | (dest_x >= self.width) | (dest_y < 0) | (dest_y >= self.height)
+
+        # An agent removed from the grid keeps its last coordinates
+        known = np.where(invalid, 0, ids)
+        sources = self.agents.x[known].astype(np.int64) * self.height + self.agents.y[known]
+        invalid |= self.occupant.ravel()[sources] != ids
+
+        destinations = np.where(invalid, 0, dest_x * self.height + dest_y)
+
+        # A destination is free if it is empty or its occupant moves too
+        occupant = self.occupant.ravel()[destinations]
+        occupied = (occupant >= 0) & ~np.isin(occupant, ids)
+
+        conflicts = invalid | occupied | _duplicated(ids)
+        valid = np.flatnonzero(~invalid)
+        conflicts[valid] |= _duplicated(destinations[valid])
+        if conflicts.any():
+            rejected = np.flatnonzero(conflicts)
+            raise MoveConflictError(f"{len(rejected)} of {len(ids)} moves conflict", rejected)
+
+        self.apply_moves(ids, destinations)
+
+    def track(self, agents):
+        """
+        Start tracking neighbor counts and happiness incrementally.
+
+        Builds the occupant map, per-type neighbor counts and the set of
+        unhappy agents for a population already placed on the grid. From then
+        on place_agent, remove_agent and move_agent update them in
+        O(radius^2) per agent, so only cells near a change are
+        re-evaluated. A cell's same/other counts are the counts of its
+        occupant's type and of the other type. While tracking, the grid must
+        only be changed through these methods.
+
+        Args:
+            agents (AgentTable): Placed agents; ids are their table rows.
+        """
+        self.agents = agents
+        self.rebuild_vacancies()
+
+        self.occupant = np.full(self.grid.shape, -1, dtype=np.int64)
+        self.occupant[agents.x, agents.y] = np.arange(len(agents))
+
+        self._stamp = np.empty(len(agents), dtype=np.int64)
+        self._recount()
+
+    def _recount(self):
+        """Recompute all tracked counts, sets and totals from scratch."""
+        counts = self.neighbor_counts()
+        self.type_counts = np.stack([counts['type_a'], counts['type_b']])
+
+        ids = np.arange(len(self.agents))
+        happy, similarity, has_neighbors = self._evaluate(ids)
+        self.unhappy = IndexSet(len(self.agents), ids[~happy])
+
+        self.similarity = similarity
+        self._has_neighbors = has_neighbors
+        self._similarity_sum = float(similarity.sum())
+        self._valid_agents = int(np.count_nonzero(has_neighbors))
+
+    def segregation_index(self):
+        """
+        Get the segregation index of the tracked agents in O(1).
+
+        The mean same-type neighbor fraction over agents with neighbors is
+        kept as a running sum and count, updated for the agents around each
+        move.
+
+        Returns:
+            float: Segregation index (0-1). Returns 0 if no tracked agent
+                has neighbors.
+        """
+        if self._valid_agents == 0:
+            return 0.0
+        return self._similarity_sum / self._valid_agents
+
+    def _forget(self, agent_id):
+        """
+        Drop a tracked agent's contribution to the segregation totals.
+
+        Args:
+            agent_id (int): Id of an agent leaving the grid.
+        """
+        self._similarity_sum -= self.similarity[agent_id]
+        self._valid_agents -= int(self._has_neighbors[agent_id])
+        self.similarity[agent_id] = 0.0
+        self._has_neighbors[agent_id] = False
+
+    def _evaluate(self, ids):
+        """
+        Evaluate the happiness rule for tracked agents from cached counts.
+
+        Args:
+            ids (np.ndarray): Agent ids.
+
+        Returns:
+            tuple: (happy, similarity, has_neighbors) arrays aligned with ids.
+        """
+        agents = self.agents
+        cells = agents.x[ids].astype(np.int64) * self.height + agents.y[ids]
+        type_a = self.type_counts[0].ravel()[cells]
+        type_b = self.type_counts[1].ravel()[cells]
+
+        same = np.where(agents.agent_type[ids] == AGENT_TYPE_A, type_a, type_b)
+        total = type_a + type_b
+        has_neighbors = total > 0
+        similarity = np.divide(same, total, out=np.zeros(len(ids)), where=has_neighbors)
+
+        # Isolated agents are unhappy
+        happy = has_neighbors & (similarity >= agents.threshold[ids])
+        return happy, similarity, has_neighbors
+
+    def _neighborhoods(self, cells):
+        """
+        Get the flat indices of the neighborhoods of the given cells.
+
+        Args:
+            cells (np.ndarray): Flat cell indices.
+
+        Returns:
+            np.ndarray: Flat neighbor indices, shape (len(cells), neighbors).
+                Neighbors past the edge of a bounded grid are -1.
+        """
+        x, y = np.divmod(cells, self.height)
+        nx = x[:, None] + self._dx
+        ny = y[:, None] + self._dy
+
+        if self.topology == TOPOLOGY_TORUS:
+            return (nx % self.width) * self.height + ny % self.height
+
+        inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+        return np.where(inside, nx * self.height + ny, -1)
+
+    def _shift_counts(self, neighbors, agent_types, delta):
+        """
+        Add delta to the neighbor counts around cells gaining or losing an agent.
+
+        Args:
+            neighbors (np.ndarray): Neighborhoods of the changed cells, as
+                returned by _neighborhoods().
+            agent_types (np.ndarray): Type of the agent at each changed cell.
+            delta (int): +1 for an arriving agent, -1 for a leaving one.
+        """
+        type_offset = (agent_types.astype(np.int64) - AGENT_TYPE_A) * self.grid.size
+        targets = (neighbors + type_offset[:, None])[neighbors >= 0]
+        np.add.at(self.type_counts.reshape(-1), targets,
+                  np.full(len(targets), delta, dtype=self.type_counts.dtype))
+
+    def _refresh(self, cells, neighbors):
+        """
+        Re-evaluate happiness and similarity of agents on or next to the given cells.
+
+        Args:
+            cells (np.ndarray): Flat indices of the changed cells.
+            neighbors (np.ndarray): Neighborhoods of those cells.
+        """
+        nearby = np.concatenate([cells, neighbors[neighbors >= 0]])
+        ids = self.occupant.ravel()[nearby]
+        ids = ids[ids >= 0]
+
+        # Drop repeated ids without sorting: the last write to a stamp wins
+        positions = np.arange(len(ids))
+        self._stamp[ids] = positions
+        ids = ids[self._stamp[ids] == positions]
+
+        happy, similarity, has_neighbors = self._evaluate(ids)
+        self.unhappy.discard_many(ids[happy])
+        self.unhappy.add_many(ids[~happy])
+
+        self._similarity_sum += float(similarity.sum() - self.similarity[ids].sum())
+        self._valid_agents += int(np.count_nonzero(has_neighbors)
+                                  - np.count_nonzero(self._has_neighbors[ids]))
+        self.similarity[ids] = similarity
+        self._has_neighbors[ids] = has_neighbors
+
+    def apply_moves(self, ids, destinations):
+        """
+        Move a batch of tracked agents and update all indexes.
+
+        The batch is not validated: every destination must be empty or be
+        vacated by another agent of the same batch, and no two agents may
+        share a destination. Cost is O(len(ids) * radius^2),
+        capped by one whole-grid recount for very large batches.
+
+        Args:
+            ids (np.ndarray): Ids of the moving agents (rows of the agent table).
+            destinations (np.ndarray): Flat destination cell per agent.
+        """
+        agents = self.agents
+        sources = agents.x[ids].astype(np.int64) * self.height + agents.y[ids]
+        agent_types = agents.agent_type[ids]
+
+        self.grid.ravel()[sources] = EMPTY_CELL
+        self.grid.ravel()[destinations] = agent_types
+        self.occupant.ravel()[sources] = -1
+        self.occupant.ravel()[destinations] = ids
+        agents.x[ids], agents.y[ids] = np.divmod(destinations, self.height)
+
+        # Cells both vacated and refilled in the batch end up occupied
+        self.vacancies.add_many(sources)
+        self.vacancies.discard_many(destinations)
+
+        # A batch touching most of the grid is cheaper to recount wholesale
+        if 2 * len(ids) * len(self._dx) > self.grid.size:
+            self._recount()
+            return
+
+        cells = np.concatenate([sources, destinations])
+        neighbors = self._neighborhoods(cells)
+        self._shift_counts(neighbors[:len(ids)], agent_types, -1)
+        self._shift_counts(neighbors[len(ids):], agent_types, 1)
+        self._refresh(cells, neighbors)
+
+    def count_neighbors(self, x, y, radius=None):
         """
         Count neighbors of each type around a position.
 
         Args:
             x (int): X-coordinate of center position.
             y (int): Y-coordinate of center position.
-            radius (int): Neighborhood radius (default 1 = Moore neighborhood).
+            radius (int): Neighborhood radius (default: the environment's radius).
 
         Returns:
             dict: Dictionary with counts {'type_a': int, 'type_b': int, 'empty': int}
         """
-        counts = {'type_a': 0, 'type_b': 0, 'empty': 0}
+        if radius is None:
+            radius = self.radius
+
+        # Window around the center, including the center itself
+        if self.topology == TOPOLOGY_TORUS:
+            offsets = np.arange(-radius, radius + 1)
+            window = self.grid.take(x + offsets, axis=0, mode='wrap')
+            window = window.take(y + offsets, axis=1, mode='wrap')
+        else:
+            window = self.grid[max(x - radius, 0):x + radius + 1,
+                               max(y - radius, 0):y + radius + 1]
+
+        type_a = int(np.count_nonzero(window == AGENT_TYPE_A))
+        type_b = int(np.count_nonzero(window == AGENT_TYPE_B))
+
+        # Exclude center
+        center = self.grid[x, y]
+        if center == AGENT_TYPE_A:
+            type_a -= 1
+        elif center == AGENT_TYPE_B:
+            type_b -= 1
+
+        neighborhood_size = window.size - 1
+        return {'type_a': type_a, 'type_b': type_b,
+                'empty': neighborhood_size - type_a - type_b}
+
+    def _box_sum(self, values, radius):
+        """
+        Sum values over the (2r+1) x (2r+1) window around every cell.
 
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                # Skip center
-                if dx == 0 and dy == 0:
-                    continue
+        Args:
+            values (np.ndarray): Array shaped like the grid.
+            radius (int): Window radius.
+
+        Returns:
+            np.ndarray: Window sums, including the center cell.
+        """
+        return box_sum(values, radius, wrap=self.topology == TOPOLOGY_TORUS)
+
+    def neighbor_counts(self, radius=None):
+        """
+        Count neighbors of each type around every cell in one pass.
+
+        The Moore neighborhood sum is a separable box filter over the whole
+        grid, minus the cell itself, so the cost is 4r+2 whole-grid additions
+        instead of a Python loop per cell.
+
+        Args:
+            radius (int): Neighborhood radius (default: the environment's radius).
+
+        Returns:
+            dict: Arrays shaped like the grid
+                  {'type_a': np.ndarray, 'type_b': np.ndarray, 'empty': np.ndarray}
+        """
+        if radius is None:
+            radius = self.radius
 
-                # Handle wrapping
-                nx = (x + dx) % GRID_SIZE
-                ny = (y + dy) % GRID_SIZE
+        cells = self._cells()
 
-                cell_value = self.grid[nx, ny]
+        counts = {}
+        for key, agent_type in (('type_a', AGENT_TYPE_A), ('type_b', AGENT_TYPE_B)):
+            present = (cells == agent_type).astype(count_dtype(radius))
+            counts[key] = self._box_sum(present, radius) - present
 
-                if cell_value == EMPTY_CELL:
-                    counts['empty'] += 1
-                elif cell_value == AGENT_TYPE_A:
-                    counts['type_a'] += 1
-                elif cell_value == AGENT_TYPE_B:
-                    counts['type_b'] += 1
+        if self.topology == TOPOLOGY_TORUS:
+            neighborhood_size = (2 * radius + 1) ** 2 - 1
+        else:
+            # Cells near an edge have fewer neighbors
+            neighborhood_size = self._box_sum(np.ones(cells.shape, dtype=count_dtype(radius)),
+                                              radius) - 1
 
+        counts['empty'] = neighborhood_size - counts['type_a'] - counts['type_b']
         return counts
 
     def get_occupancy_rate(self):
@@ -131,6 +804,5 @@ class Environment:
         Returns:
             float: Occupancy rate (0-1).
         """
-        occupied = np.sum(self.grid != EMPTY_CELL)
-        total = GRID_SIZE * GRID_SIZE
-        return occupied / total
\ No newline at end of file
+        occupied = np.count_nonzero(self._cells() != EMPTY_CELL)
+        return occupied / (self.width * self.height)
@@ -0,0 +1,197 @@
+"""
+Index set module for Schelling segregation model.
+Contains the IndexSet class, a set of flat cell indices with O(1) updates.
+"""
+
+import numpy as np
+
+# Cells converted per pass by IndexSet.from_mask, bounding its temporaries
+MASK_CHUNK_SIZE = 1 << 20
+
+
+class IndexSet:
+    """
+    Set of integer keys in [0, capacity) with constant-time operations.
+
+    Members are kept densely packed in an array; a second array maps every
+    key to its slot in the first (-1 if absent). Removal moves the last
+    member into the freed slot (swap-remove), so insert, remove, membership
+    and uniform sampling are all O(1), and batch updates cost O(batch).
+    Both arrays are int32 whenever the capacity allows it, so a set over
+    every cell of a grid costs 8 bytes per cell.
+
+    Attributes:
+        capacity (int): Exclusive upper bound on keys.
+    """
+
+    def __init__(self, capacity, keys=()):
+        """
+        Initialize the set.
+
+        Args:
+            capacity (int): Exclusive upper bound on keys.
+            keys (array-like): Initial members (must be distinct).
+        """
+        self.capacity = capacity
+        dtype = np.int32 if capacity <= np.iinfo(np.int32).max else np.int64
+        self._keys = np.empty(capacity, dtype=dtype)
+        self._slots = np.full(capacity, -1, dtype=dtype)
+
+        keys = np.asarray(keys, dtype=np.int64)
+        self._size = len(keys)
+        self._keys[:self._size] = keys
+        self._slots[keys] = np.arange(self._size, dtype=dtype)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Create the set of positions where a boolean mask is True.
+
+        Members are inserted in ascending order. The mask is converted in
+        chunks of MASK_CHUNK_SIZE, so besides the set itself no index array
+        as large as the mask is allocated.
+
+        Args:
+            mask (np.ndarray): Boolean array; its size is the capacity.
+
+        Returns:
+            IndexSet: Set of the flat indices of the True entries.
+        """
+        mask = np.asarray(mask, dtype=bool).reshape(-1)
+        members = cls(mask.size)
+        for start in range(0, mask.size, MASK_CHUNK_SIZE):
+            keys = np.flatnonzero(mask[start:start + MASK_CHUNK_SIZE]) + start
+            end = members._size + len(keys)
+            members._keys[members._size:end] = keys
+            members._slots[keys] = np.arange(members._size, end, dtype=members._slots.dtype)
+            members._size = end
+        return members
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return self._slots[key] >= 0
+
+    @property
+    def keys(self):
+        """np.ndarray: Read-only view of the current members, in slot order."""
+        view = self._keys[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def add(self, key):
+        """
+        Insert a key.
+
+        Args:
+            key (int): Key to insert.
+
+        Returns:
+            bool: True if the key was inserted, False if already present.
+        """
+        if self._slots[key] >= 0:
+            return False
+
+        self._keys[self._size] = key
+        self._slots[key] = self._size
+        self._size += 1
+        return True
+
+    def discard(self, key):
+        """
+        Remove a key if present.
+
+        Args:
+            key (int): Key to remove.
+
+        Returns:
+            bool: True if the key was removed, False if it was absent.
+        """
+        slot = self._slots[key]
+        if slot < 0:
+            return False
+
+        # Move last member into the freed slot
+        self._size -= 1
+        last = self._keys[self._size]
+        self._keys[slot] = last
+        self._slots[last] = slot
+        self._slots[key] = -1
+        return True
+
+    def sample(self, rng=None):
+        """
+        Draw a uniformly random member.
+
+        Args:
+            rng (np.random.Generator): Source of randomness (default: a
+                fresh unseeded generator).
+
+        Returns:
+            int: A member of the set.
+
+        Raises:
+            ValueError: If the set is empty.
+        """
+        if self._size == 0:
+            raise ValueError("Cannot sample from an empty set")
+        if rng is None:
+            rng = np.random.default_rng()
+        return int(self._keys[rng.integers(self._size)])
+
+    def add_many(self, keys):
+        """
+        Insert a batch of keys in O(len(keys)).
+
+        Keys already present and repeated keys are inserted once.
+
+        Args:
+            keys (np.ndarray): Keys to insert.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        keys = keys[self._slots[keys] < 0]
+
+        # Keep one copy of repeated keys: the last write to a slot wins
+        tentative = self._size + np.arange(len(keys))
+        self._slots[keys] = tentative
+        keys = keys[self._slots[keys] == tentative]
+
+        new_size = self._size + len(keys)
+        self._keys[self._size:new_size] = keys
+        self._slots[keys] = np.arange(self._size, new_size)
+        self._size = new_size
+
+    def discard_many(self, keys):
+        """
+        Remove a batch of keys in O(len(keys)).
+
+        Absent keys are ignored. Removed slots are refilled from the tail
+        of the member array, the batch form of swap-remove.
+
+        Args:
+            keys (np.ndarray): Keys to remove.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        keys = keys[self._slots[keys] >= 0]
+        slots = self._slots[keys]
+
+        # Keep one copy of repeated keys
+        marker = -2 - np.arange(len(keys))
+        self._slots[keys] = marker
+        unique = self._slots[keys] == marker
+        keys = keys[unique]
+        slots = slots[unique]
+
+        new_size = self._size - len(keys)
+
+        # Members in the tail that survive fill the holes left below new_size
+        holes = slots[slots < new_size]
+        tail_removed = np.zeros(self._size - new_size, dtype=bool)
+        tail_removed[slots[slots >= new_size] - new_size] = True
+        fillers = self._keys[new_size:self._size][~tail_removed]
+
+        self._keys[holes] = fillers
+        self._slots[fillers] = holes
+        self._slots[keys] = -1
+        self._size = new_size
@@ -0,0 +1,59 @@
+"""
+Packing module for Schelling segregation model.
+Contains vectorized conversion between uint8 grids and 2-bit packed storage.
+"""
+
+import numpy as np
+
+CELLS_PER_BYTE = 4
+_SHIFTS = np.arange(0, 8, 2, dtype=np.uint8)
+
+
+def packed_size(num_cells):
+    """
+    Get the number of bytes needed to pack a number of cells.
+
+    Args:
+        num_cells (int): Number of grid cells.
+
+    Returns:
+        int: Size of the packed array in bytes.
+    """
+    return -(-num_cells // CELLS_PER_BYTE)
+
+
+def pack_cells(grid):
+    """
+    Pack cell values (0-3) into 2 bits each, four cells per byte.
+
+    Cells are taken in row-major order; cell i occupies bits 2*(i % 4) and
+    2*(i % 4) + 1 of byte i // 4.
+
+    Args:
+        grid (np.ndarray): Array of cell values in 0-3.
+
+    Returns:
+        np.ndarray: 1D uint8 array of packed_size(grid.size) bytes.
+    """
+    cells = np.ravel(grid).astype(np.uint8, copy=False)
+    padded = np.zeros(packed_size(cells.size) * CELLS_PER_BYTE, dtype=np.uint8)
+    padded[:cells.size] = cells
+
+    quads = padded.reshape(-1, CELLS_PER_BYTE) << _SHIFTS
+    return np.bitwise_or.reduce(quads, axis=1)
+
+
+def unpack_cells(packed, shape):
+    """
+    Unpack 2-bit cell values produced by pack_cells.
+
+    Args:
+        packed (np.ndarray): 1D uint8 array of packed cells.
+        shape (tuple): Shape of the grid to rebuild.
+
+    Returns:
+        np.ndarray: uint8 array of the given shape.
+    """
+    num_cells = int(np.prod(shape))
+    cells = (np.asarray(packed, dtype=np.uint8)[:, None] >> _SHIFTS) & 0b11
+    return cells.reshape(-1)[:num_cells].reshape(shape)
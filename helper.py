@@ -3,10 +3,9 @@ Helper functions for Schelling segregation model.
 Contains utility functions for metrics and agent creation.
 """
 
-import random
 import numpy as np
-from agent.agent import Agent
-from config import GRID_SIZE, AGENT_TYPE_A, AGENT_TYPE_B
+from agent.agent import AgentTable
+from config import AGENT_TYPE_A, AGENT_TYPE_B, EMPTY_CELL
 
 
 def create_agents(num_agents_type_a, num_agents_type_b, similarity_threshold=0.3):
@@ -19,96 +18,113 @@ def create_agents(num_agents_type_a, num_agents_type_b, similarity_threshold=0.3
         similarity_threshold (float): Desired similarity fraction (0-1).
 
     Returns:
-        list: List of Agent objects (not yet placed on grid).
+        AgentTable: Table of agents (not yet placed on grid), type A first.
     """
-    agents = []
+    num_agents = num_agents_type_a + num_agents_type_b
 
-    # Create type A agents
-    for _ in range(num_agents_type_a):
-        agent = Agent(x=0, y=0, agent_type=AGENT_TYPE_A,
-                     similarity_threshold=similarity_threshold)
-        agents.append(agent)
+    agent_types = np.repeat([AGENT_TYPE_A, AGENT_TYPE_B],
+                            [num_agents_type_a, num_agents_type_b])
 
-    # Create type B agents
-    for _ in range(num_agents_type_b):
-        agent = Agent(x=0, y=0, agent_type=AGENT_TYPE_B,
-                     similarity_threshold=similarity_threshold)
-        agents.append(agent)
-
-    return agents
+    return AgentTable(x=np.zeros(num_agents, dtype=np.int32),
+                      y=np.zeros(num_agents, dtype=np.int32),
+                      agent_type=agent_types,
+                      threshold=np.full(num_agents, similarity_threshold))
 
 
 def randomly_place_agents(agents, env):
     """
     Randomly place agents on empty cells in the environment.
 
+    Cells are drawn from the environment's random generator, so placement
+    is reproducible for a seeded Environment. The draw is one permutation
+    of the flat empty-cell indices and, unless env is already tracking an
+    agent table, the placement is one bulk Environment.place_agents call.
+
     Args:
-        agents (list): List of Agent objects to place.
+        agents (AgentTable or list): Agents to place. A list of Agent
+            objects is bound to a new table, so the objects see their cells.
         env (Environment): Environment with grid.
 
     Raises:
         ValueError: If not enough empty cells for all agents.
     """
-    empty_cells = env.get_empty_cells()
+    empty_cells = np.flatnonzero(env.grid == EMPTY_CELL)
 
     if len(agents) > len(empty_cells):
         raise ValueError(f"Not enough empty cells ({len(empty_cells)}) for {len(agents)} agents")
 
-    # Shuffle for random placement
-    random.shuffle(empty_cells)
+    # Random distinct cells, drawn in one block
+    chosen = empty_cells[env.rng.permutation(len(empty_cells))[:len(agents)]]
+    x = chosen // env.height
+    y = chosen - x * env.height
 
-    for i, agent in enumerate(agents):
-        x, y = empty_cells[i]
-        env.place_agent(agent, x, y)
+    if env.agents is not None:
+        for agent, cx, cy in zip(agents, x.tolist(), y.tolist()):
+            env.place_agent(agent, cx, cy)
+        return
 
+    env.place_agents(AgentTable.from_agents(agents, bind=True), x, y)
 
-def calculate_segregation_index(agents, env):
+
+def compute_step_metrics(agents, env):
     """
-    Calculate segregation index (average similarity experienced by agents).
+    Compute segregation, happiness and the unhappy mask in one pass.
 
-    Segregation index ranges from 0 (perfectly integrated) to 1 (perfectly segregated).
-    It measures the average fraction of same-type neighbors each agent has.
+    All three come from the same per-agent neighbor composition, read from
+    a single whole-grid neighbor count. If env is tracking these agents
+    incrementally (see Environment.track), its cached counts are used and
+    no grid pass is needed at all.
 
     Args:
-        agents (list): List of Agent objects.
+        agents (AgentTable or list): Agents to evaluate.
         env (Environment): Environment with grid.
 
     Returns:
-        float: Segregation index (0-1). Returns 0 if no agents.
+        dict: {'segregation': float, 'happiness': float,
+               'unhappy': np.ndarray of bool aligned with agents}.
+               Segregation and happiness are 0 if there are no agents.
     """
-    if len(agents) == 0:
-        return 0.0
+    table = AgentTable.from_agents(agents)
+    if len(table) == 0:
+        return {'segregation': 0.0, 'happiness': 0.0, 'unhappy': np.zeros(0, dtype=bool)}
 
-    total_similarity = 0.0
-    valid_agents = 0
+    if env.agents is not None and env.agents is table:
+        type_a = env.type_counts[0][table.x, table.y]
+        type_b = env.type_counts[1][table.x, table.y]
+    else:
+        counts = env.neighbor_counts()
+        type_a = counts['type_a'][table.x, table.y]
+        type_b = counts['type_b'][table.x, table.y]
 
-    for agent in agents:
-        neighbor_positions = agent.get_neighbor_positions()
+    same = np.where(table.agent_type == AGENT_TYPE_A, type_a, type_b)
+    total = type_a + type_b
 
-        similar_count = 0
-        total_count = 0
+    # Agents without neighbors have no similarity and are unhappy (isolated)
+    has_neighbors = total > 0
+    similarity = np.divide(same, total, out=np.zeros(len(table)), where=has_neighbors)
+    unhappy = ~(has_neighbors & (similarity >= table.threshold))
 
-        for nx, ny in neighbor_positions:
-            neighbor_type = env.grid[nx, ny]
+    segregation = float(np.mean(similarity[has_neighbors])) if np.any(has_neighbors) else 0.0
+    happiness = (len(table) - np.count_nonzero(unhappy)) / len(table)
 
-            # Skip empty cells
-            if neighbor_type == 0:
-                continue
+    return {'segregation': segregation, 'happiness': happiness, 'unhappy': unhappy}
 
-            total_count += 1
-            if neighbor_type == agent.agent_type:
-                similar_count += 1
 
-        # Only count agents with neighbors
-        if total_count > 0:
-            similarity = similar_count / total_count
-            total_similarity += similarity
-            valid_agents += 1
+def calculate_segregation_index(agents, env):
+    """
+    Calculate segregation index (average similarity experienced by agents).
+
+    Segregation index ranges from 0 (perfectly integrated) to 1 (perfectly segregated).
+    It measures the average fraction of same-type neighbors each agent has.
 
-    if valid_agents == 0:
-        return 0.0
+    Args:
+        agents (AgentTable or list): Agents to evaluate.
+        env (Environment): Environment with grid.
 
-    return total_similarity / valid_agents
+    Returns:
+        float: Segregation index (0-1). Returns 0 if no agents.
+    """
+    return compute_step_metrics(agents, env)['segregation']
 
 
 def calculate_happiness_rate(agents, env):
@@ -116,17 +132,13 @@ def calculate_happiness_rate(agents, env):
     Calculate fraction of agents that are happy.
 
     Args:
-        agents (list): List of Agent objects.
+        agents (AgentTable or list): Agents to evaluate.
         env (Environment): Environment with grid.
 
     Returns:
         float: Happiness rate (0-1). Returns 0 if no agents.
     """
-    if len(agents) == 0:
-        return 0.0
-
-    happy_count = sum(1 for agent in agents if agent.is_happy(env))
-    return happy_count / len(agents)
+    return compute_step_metrics(agents, env)['happiness']
 
 
 def get_unhappy_agents(agents, env):
@@ -134,13 +146,14 @@ def get_unhappy_agents(agents, env):
     Get list of agents that are currently unhappy.
 
     Args:
-        agents (list): List of Agent objects.
+        agents (AgentTable or list): Agents to evaluate.
         env (Environment): Environment with grid.
 
     Returns:
         list: List of unhappy Agent objects.
     """
-    return [agent for agent in agents if not agent.is_happy(env)]
+    unhappy = np.flatnonzero(compute_step_metrics(agents, env)['unhappy'])
+    return [agents[i] for i in unhappy.tolist()]
 
 
 def get_agent_counts_by_type(agents):
@@ -148,12 +161,13 @@ def get_agent_counts_by_type(agents):
     Count agents by type.
 
     Args:
-        agents (list): List of Agent objects.
+        agents (AgentTable or list): Agents to evaluate.
 
     Returns:
         dict: Dictionary with counts {'type_a': int, 'type_b': int}
     """
-    type_a_count = sum(1 for agent in agents if agent.agent_type == AGENT_TYPE_A)
-    type_b_count = sum(1 for agent in agents if agent.agent_type == AGENT_TYPE_B)
+    agent_types = AgentTable.from_agents(agents).agent_type
+    type_a_count = int(np.count_nonzero(agent_types == AGENT_TYPE_A))
+    type_b_count = int(np.count_nonzero(agent_types == AGENT_TYPE_B))
 
     return {'type_a': type_a_count, 'type_b': type_b_count}
\ No newline at end of file
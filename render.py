@@ -0,0 +1,76 @@
+"""
+Rendering functions for Schelling segregation model.
+Converts grids to RGB images with a palette lookup, without matplotlib.
+"""
+
+import numpy as np
+from config import (EMPTY_CELL, AGENT_TYPE_A, AGENT_TYPE_B, COLOR_EMPTY, COLOR_TYPE_A,
+                    COLOR_TYPE_B)
+
+
+def hex_to_rgb(color):
+    """
+    Convert a '#RRGGBB' color string to an RGB triple.
+
+    Args:
+        color (str): Hex color such as '#FF6B6B'.
+
+    Returns:
+        tuple: (red, green, blue) ints in 0-255.
+    """
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def build_palette():
+    """
+    Build the lookup table from cell values to colors.
+
+    Returns:
+        np.ndarray: (256, 3) uint8 table indexed by cell value; values
+            without a color map to black.
+    """
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    for value, color in ((EMPTY_CELL, COLOR_EMPTY), (AGENT_TYPE_A, COLOR_TYPE_A),
+                         (AGENT_TYPE_B, COLOR_TYPE_B)):
+        palette[value] = hex_to_rgb(color)
+    return palette
+
+
+PALETTE = build_palette()
+
+
+def image_scale(width, height, target_size=600):
+    """
+    Pick an integer upscaling factor for displaying a grid.
+
+    Args:
+        width (int): Grid width in cells.
+        height (int): Grid height in cells.
+        target_size (int): Desired length of the longer image side in pixels.
+
+    Returns:
+        int: Pixels per cell, at least 1.
+    """
+    return max(1, target_size // max(width, height))
+
+
+def render_grid(grid, scale=1):
+    """
+    Render a grid as an RGB image.
+
+    The image has x along the horizontal axis and y increasing upwards, so
+    cell (0, 0) is the bottom-left pixel block. Each cell becomes a
+    scale x scale block of one color (nearest-neighbor upscaling).
+
+    Args:
+        grid (np.ndarray): (width, height) uint8 grid of cell values.
+        scale (int): Pixels per cell along each axis.
+
+    Returns:
+        np.ndarray: (height * scale, width * scale, 3) uint8 image.
+    """
+    image = PALETTE[np.asarray(grid).T[::-1]]
+    if scale > 1:
+        image = np.repeat(np.repeat(image, scale, axis=0), scale, axis=1)
+    return image
@@ -0,0 +1,219 @@
+"""
+Headless command line runner for the Schelling segregation model.
+
+Runs a simulation without the Streamlit UI and writes its metrics as JSON
+lines, one record per step, or sweeps similarity thresholds over an
+ensemble of replicas and writes one record per replica. Only NumPy and the
+core model modules are imported, so a run starts in well under a second.
+
+Usage:
+    python -m schelling run --size 100 --type-a 4000 --type-b 4000 \\
+        --threshold 0.4 --seed 1 --max-steps 200 --output metrics.jsonl
+    python -m schelling sweep --size 30 --type-a 300 --type-b 300 \\
+        --replicas 10 --seed 1 --output sweep.jsonl
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from config import (GRID_SIZE, NEIGHBORHOOD_RADIUS, DEFAULT_TOPOLOGY, TOPOLOGY_TORUS,
+                    TOPOLOGY_BOUNDED, DEFAULT_SIMILARITY_THRESHOLD, DEFAULT_PLATEAU_WINDOW,
+                    MOVE_POLICY_SEQUENTIAL, MOVE_POLICY_SYNCHRONOUS, MOVE_POLICY_CHECKERBOARD,
+                    MOVE_POLICY_BEST_OF_K, DEFAULT_MOVE_POLICY, DEFAULT_MOVE_CANDIDATES,
+                    DEFAULT_SWEEP_THRESHOLDS)
+from environment.environment import Environment
+from simulation.simulation import Simulation
+from simulation.ensemble import Ensemble
+from simulation.trajectory import MoveRecorder, DEFAULT_KEYFRAME_INTERVAL
+from helper import create_agents, randomly_place_agents
+
+
+def add_model_arguments(parser):
+    """
+    Add the grid, population and run-length options shared by all subcommands.
+
+    Args:
+        parser (argparse.ArgumentParser): Subcommand parser to extend.
+    """
+    parser.add_argument('--size', type=int, default=GRID_SIZE,
+                        help='Grid width and height (default: %(default)s).')
+    parser.add_argument('--width', type=int, help='Grid width, overrides --size.')
+    parser.add_argument('--height', type=int, help='Grid height, overrides --size.')
+    parser.add_argument('--radius', type=int, default=NEIGHBORHOOD_RADIUS,
+                        help='Neighborhood radius (default: %(default)s).')
+    parser.add_argument('--topology', choices=[TOPOLOGY_TORUS, TOPOLOGY_BOUNDED],
+                        default=DEFAULT_TOPOLOGY, help='Grid topology (default: %(default)s).')
+    parser.add_argument('--type-a', type=int, default=1000,
+                        help='Number of type A agents (default: %(default)s).')
+    parser.add_argument('--type-b', type=int, default=1000,
+                        help='Number of type B agents (default: %(default)s).')
+    parser.add_argument('--seed', type=int, help='Random seed for a reproducible run.')
+    parser.add_argument('--max-steps', type=int, default=100,
+                        help='Maximum number of steps (default: %(default)s).')
+    parser.add_argument('--output', default='-',
+                        help="Output JSONL path, or '-' for stdout (default).")
+
+
+def build_parser():
+    """
+    Build the command line parser.
+
+    Returns:
+        argparse.ArgumentParser: Parser with 'run' and 'sweep' subcommands.
+    """
+    parser = argparse.ArgumentParser(prog='schelling',
+                                     description='Headless Schelling segregation model runner.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run one simulation and write its metrics as JSONL.')
+    add_model_arguments(run)
+    run.add_argument('--threshold', type=float, default=DEFAULT_SIMILARITY_THRESHOLD,
+                     help='Similarity threshold in [0, 1] (default: %(default)s).')
+    run.add_argument('--policy', choices=[MOVE_POLICY_SEQUENTIAL, MOVE_POLICY_SYNCHRONOUS,
+                                          MOVE_POLICY_CHECKERBOARD, MOVE_POLICY_BEST_OF_K],
+                     default=DEFAULT_MOVE_POLICY,
+                     help='How unhappy agents relocate each step (default: %(default)s).')
+    run.add_argument('--candidates', type=int, default=DEFAULT_MOVE_CANDIDATES,
+                     help='Empty cells each mover samples under the best_of_k policy '
+                          '(default: %(default)s).')
+    run.add_argument('--plateau-window', type=int, default=DEFAULT_PLATEAU_WINDOW,
+                     help='Stop once metrics stay flat for this many steps; 0 disables '
+                          '(default: %(default)s).')
+    run.add_argument('--record', metavar='DIR',
+                     help='Also write a binary move log with keyframes to this directory.')
+    run.add_argument('--keyframe-interval', type=int, default=DEFAULT_KEYFRAME_INTERVAL,
+                     help='Steps between keyframes of the move log (default: %(default)s).')
+
+    sweep = commands.add_parser('sweep', help='Run many replicas at once as one ensemble and '
+                                              'write their final metrics as JSONL.')
+    add_model_arguments(sweep)
+    sweep.add_argument('--thresholds', type=float, nargs='+', default=DEFAULT_SWEEP_THRESHOLDS,
+                       help='Similarity thresholds to sweep (default: 0.1 to 0.9 by 0.1).')
+    sweep.add_argument('--replicas', type=int, default=1,
+                       help='Independent replicas per threshold (default: %(default)s).')
+    return parser
+
+
+def run_simulation(args, out):
+    """
+    Run one simulation and write a metrics record per step.
+
+    The first record (step 0) describes the initial random placement. The
+    run stops early once the simulation has converged (see
+    Simulation.convergence).
+
+    Args:
+        args (argparse.Namespace): Parsed 'run' arguments.
+        out (file): Text stream the JSON lines are written to.
+
+    Returns:
+        int: Number of steps executed.
+
+    Raises:
+        ValueError: If the grid parameters are invalid or the agents do not
+            fit on the grid.
+    """
+    env = Environment(width=args.width or args.size, height=args.height or args.size,
+                      radius=args.radius, topology=args.topology, seed=args.seed)
+    agents = create_agents(args.type_a, args.type_b, args.threshold)
+    randomly_place_agents(agents, env)
+    sim = Simulation(env, agents, policy=args.policy, candidates=args.candidates)
+    if args.record:
+        sim.record(MoveRecorder(args.record, keyframe_interval=args.keyframe_interval))
+
+    def write(moved):
+        segregation, happiness = sim.metrics()
+        record = {'step': sim.step_count, 'segregation': segregation,
+                  'happiness': happiness, 'moved': moved}
+        out.write(json.dumps(record) + '\n')
+
+    write(0)
+    try:
+        while sim.step_count < args.max_steps:
+            if sim.convergence(plateau_window=args.plateau_window) is not None:
+                break
+            write(sim.step())
+    finally:
+        if sim.recorder is not None:
+            sim.recorder.close()
+    return sim.step_count
+
+
+def run_ensemble_sweep(args, out):
+    """
+    Run a threshold sweep as one ensemble and write a record per replica.
+
+    All replicas share the grid and population and are stepped together
+    (see Ensemble), which is far faster than separate simulations on small
+    grids. Each runs until no agent can move or max_steps is reached; the
+    ensemble follows the sequential move rule and has no plateau rule.
+
+    Args:
+        args (argparse.Namespace): Parsed 'sweep' arguments.
+        out (file): Text stream the JSON lines are written to.
+
+    Raises:
+        ValueError: If the grid parameters are invalid or the agents do not
+            fit on the grid.
+    """
+    thresholds = np.repeat(args.thresholds, args.replicas)
+    ensemble = Ensemble.random(args.type_a, args.type_b, thresholds,
+                               width=args.width or args.size, height=args.height or args.size,
+                               radius=args.radius, topology=args.topology, seed=args.seed)
+    steps = ensemble.run_until_converged(max_steps=args.max_steps)
+    segregation, happiness = ensemble.metrics()
+
+    for i, threshold in enumerate(thresholds.tolist()):
+        record = {'replica': i, 'threshold': threshold, 'steps': int(steps[i]),
+                  'segregation': float(segregation[i]), 'happiness': float(happiness[i])}
+        out.write(json.dumps(record) + '\n')
+
+
+def main(argv=None):
+    """
+    Entry point for 'python -m schelling'.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: Process exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.max_steps < 0:
+        parser.error('--max-steps must be non-negative')
+    if args.command == 'run':
+        if not 0.0 <= args.threshold <= 1.0:
+            parser.error('--threshold must be between 0 and 1')
+        if args.plateau_window < 0:
+            parser.error('--plateau-window must be non-negative')
+        if args.keyframe_interval < 1:
+            parser.error('--keyframe-interval must be positive')
+        if args.candidates < 1:
+            parser.error('--candidates must be positive')
+        command = run_simulation
+    else:
+        if not all(0.0 <= t <= 1.0 for t in args.thresholds):
+            parser.error('--thresholds must be between 0 and 1')
+        if args.replicas < 1:
+            parser.error('--replicas must be positive')
+        command = run_ensemble_sweep
+
+    try:
+        if args.output == '-':
+            command(args, sys.stdout)
+        else:
+            with open(args.output, 'w') as out:
+                command(args, out)
+    except ValueError as error:
+        parser.exit(2, f'schelling: error: {error}\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
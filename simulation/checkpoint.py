@@ -0,0 +1,106 @@
+"""
+Checkpoint module for Schelling segregation model.
+Reads and writes named arrays as .npz files, optionally memory-mapped.
+"""
+
+import json
+import struct
+import zipfile
+
+import numpy as np
+
+# Fixed part of a zip local file header; name and extra field lengths are
+# the two little-endian uint16 values at its end
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+
+def save_arrays(path, arrays, compressed=True):
+    """
+    Write named arrays to an .npz file.
+
+    Args:
+        path (str): Output file path, used as given (no suffix is added).
+        arrays (dict): Array name -> np.ndarray.
+        compressed (bool): Deflate the arrays. Uncompressed files are larger
+            but can be memory-mapped by load_arrays().
+    """
+    with open(path, 'wb') as f:
+        if compressed:
+            np.savez_compressed(f, **arrays)
+        else:
+            np.savez(f, **arrays)
+
+
+def load_arrays(path, mmap_mode=None):
+    """
+    Read named arrays from an .npz file.
+
+    np.load() ignores mmap_mode for .npz archives. Here every member stored
+    without compression is instead mapped straight from its offset in the
+    file, so opening a large uncompressed checkpoint costs no reading or
+    copying up front. Compressed members are always read into memory.
+
+    Args:
+        path (str): File written by save_arrays().
+        mmap_mode (str): None to read everything, or a np.memmap mode
+            for uncompressed members: 'r' maps them read-only, 'r+' writes
+            changes through to the file, 'c' keeps changes in memory.
+
+    Returns:
+        dict: Array name -> np.ndarray (np.memmap for mapped members).
+    """
+    if mmap_mode is None:
+        with np.load(path) as archive:
+            return {name: archive[name] for name in archive.files}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info))
+                continue
+
+            f.seek(info.header_offset)
+            fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            f.seek(fields[-2] + fields[-1], 1)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"Cannot memory-map object array '{name}'")
+            if 0 in shape:
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=f.tell(),
+                                     shape=shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+def pack_json(value):
+    """
+    Encode a JSON-serializable value as a 0-d array for storage in an .npz.
+
+    Args:
+        value: Any JSON-serializable value (arbitrary-size ints included).
+
+    Returns:
+        np.ndarray: 0-d unicode array.
+    """
+    return np.array(json.dumps(value))
+
+
+def unpack_json(array):
+    """
+    Decode a value stored with pack_json().
+
+    Args:
+        array (np.ndarray): 0-d unicode array.
+
+    Returns:
+        The decoded value.
+    """
+    return json.loads(str(array[()]))
@@ -0,0 +1,306 @@
+"""
+Ensemble module for Schelling segregation model.
+Contains the Ensemble class that steps many independent replicas at once.
+"""
+
+import numpy as np
+from environment.environment import box_sum, count_dtype
+from config import (GRID_SIZE, EMPTY_CELL, AGENT_TYPE_A, AGENT_TYPE_B, NEIGHBORHOOD_RADIUS,
+                    TOPOLOGY_TORUS, TOPOLOGY_BOUNDED, DEFAULT_TOPOLOGY)
+
+
+class Ensemble:
+    """
+    Runs R independent replicas of the Schelling dynamics as one array.
+
+    The replicas share grid shape, radius and topology and are stacked into
+    a (R, width, height) array, so neighbor counts, happiness and metrics
+    for all of them come from a handful of whole-array operations. Each
+    replica has its own population and similarity threshold and follows the
+    same rule as Simulation: every agent unhappy at the start of a step
+    moves, in random order, to a random empty cell of its own replica.
+
+    This suits sweeps over many small grids, where a single Simulation
+    would be dominated by per-step interpreter overhead.
+
+    Attributes:
+        grids (np.ndarray): (R, width, height) uint8 array of cell values.
+        thresholds (np.ndarray): Similarity threshold of each replica.
+        radius (int): Neighborhood radius used for happiness.
+        topology (str): TOPOLOGY_TORUS or TOPOLOGY_BOUNDED.
+        rng (np.random.Generator): Random stream shared by all replicas.
+        step_count (int): Number of steps executed so far.
+        segregation_history (list): Per-replica segregation after each step.
+        happiness_history (list): Per-replica happiness after each step.
+    """
+
+    def __init__(self, grids, thresholds, radius=NEIGHBORHOOD_RADIUS, topology=DEFAULT_TOPOLOGY,
+                 seed=None):
+        """
+        Initialize an ensemble from already populated grids.
+
+        Args:
+            grids (np.ndarray): (R, width, height) array of cell values.
+            thresholds (float or array-like): Similarity threshold, one per
+                replica or a single value for all.
+            radius (int): Neighborhood radius (1 = Moore neighborhood).
+            topology (str): TOPOLOGY_TORUS or TOPOLOGY_BOUNDED.
+            seed (int, np.random.SeedSequence or np.random.Generator):
+                Seed for rng, or an existing generator to share.
+
+        Raises:
+            ValueError: If grids is not 3D, the radius or topology is
+                invalid (see Environment), or thresholds do not match the
+                number of replicas.
+        """
+        grids = np.array(grids, dtype=np.uint8)
+        if grids.ndim != 3:
+            raise ValueError(f"Expected a (replicas, width, height) array, got shape {grids.shape}")
+        if radius < 1:
+            raise ValueError(f"Neighborhood radius must be at least 1, got {radius}")
+        if topology not in (TOPOLOGY_TORUS, TOPOLOGY_BOUNDED):
+            raise ValueError(f"Unknown topology '{topology}'")
+        if topology == TOPOLOGY_TORUS and 2 * radius + 1 > min(grids.shape[1:]):
+            raise ValueError(f"Neighborhood radius {radius} is too large for a "
+                             f"{grids.shape[1]}x{grids.shape[2]} torus")
+
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        if thresholds.ndim == 0:
+            thresholds = np.full(len(grids), thresholds)
+        if thresholds.shape != (len(grids),):
+            raise ValueError(f"Expected {len(grids)} thresholds, got {thresholds.size}")
+
+        self.grids = grids
+        self.thresholds = thresholds
+        self.radius = radius
+        self.topology = topology
+        self.rng = np.random.default_rng(seed)
+        self.step_count = 0
+        self.segregation_history = []
+        self.happiness_history = []
+
+        # Evaluation of the current grids, reused until the next move
+        self._state = None
+
+    @classmethod
+    def random(cls, num_type_a, num_type_b, thresholds, width=GRID_SIZE, height=GRID_SIZE,
+               radius=NEIGHBORHOOD_RADIUS, topology=DEFAULT_TOPOLOGY, seed=None):
+        """
+        Create an ensemble with agents placed uniformly at random.
+
+        Populations and thresholds are per replica; scalars are broadcast.
+        The number of replicas is the broadcast length of the three.
+
+        Args:
+            num_type_a (int or array-like): Type A agents per replica.
+            num_type_b (int or array-like): Type B agents per replica.
+            thresholds (float or array-like): Similarity threshold per replica.
+            width (int): Number of cells along x.
+            height (int): Number of cells along y.
+            radius (int): Neighborhood radius.
+            topology (str): TOPOLOGY_TORUS or TOPOLOGY_BOUNDED.
+            seed (int, np.random.SeedSequence or np.random.Generator):
+                Seed for the placement and the ensemble's rng.
+
+        Returns:
+            Ensemble: The new ensemble.
+
+        Raises:
+            ValueError: If a replica has more agents than cells.
+        """
+        if width < 1 or height < 1:
+            raise ValueError(f"Grid dimensions must be positive, got {width}x{height}")
+
+        num_type_a, num_type_b, thresholds = np.broadcast_arrays(
+            np.atleast_1d(num_type_a), np.atleast_1d(num_type_b), np.atleast_1d(thresholds))
+        num_cells = width * height
+        if np.any(num_type_a + num_type_b > num_cells):
+            raise ValueError(f"Not enough empty cells ({num_cells}) for "
+                             f"{int(np.max(num_type_a + num_type_b))} agents")
+
+        # Rank cells of each replica in random order; the lowest ranks get
+        # type A, the next ones type B and the rest stay empty
+        rng = np.random.default_rng(seed)
+        ranks = rng.permuted(np.tile(np.arange(num_cells), (len(thresholds), 1)), axis=1)
+        rank_types = np.where(np.arange(num_cells) < num_type_a[:, None], AGENT_TYPE_A,
+                              np.where(np.arange(num_cells) < (num_type_a + num_type_b)[:, None],
+                                       AGENT_TYPE_B, EMPTY_CELL)).astype(np.uint8)
+        grids = np.empty_like(rank_types)
+        np.put_along_axis(grids, ranks, rank_types, axis=1)
+
+        return cls(grids.reshape(len(thresholds), width, height), thresholds,
+                   radius=radius, topology=topology, seed=rng)
+
+    def __len__(self):
+        """Number of replicas."""
+        return len(self.grids)
+
+    def neighbor_counts(self):
+        """
+        Count neighbors of each type around every cell of every replica.
+
+        Returns:
+            tuple: (type_a, type_b) integer arrays shaped like grids, of
+                the dtype given by count_dtype(radius).
+        """
+        wrap = self.topology == TOPOLOGY_TORUS
+        counts = []
+        for agent_type in (AGENT_TYPE_A, AGENT_TYPE_B):
+            present = (self.grids == agent_type).astype(count_dtype(self.radius))
+            counts.append(box_sum(present, self.radius, wrap=wrap) - present)
+        return tuple(counts)
+
+    def _evaluate(self):
+        """
+        Evaluate every agent of every replica, reusing the last result if
+        nothing has moved since.
+
+        Returns:
+            dict: Arrays shaped like grids: 'similarity' (0 on empty or
+                isolated cells), 'has_neighbors' and 'unhappy' (both False
+                on empty cells), plus 'occupied'.
+        """
+        if self._state is not None:
+            return self._state
+
+        type_a, type_b = self.neighbor_counts()
+        occupied = self.grids != EMPTY_CELL
+        same = np.where(self.grids == AGENT_TYPE_A, type_a, type_b)
+        total = type_a + type_b
+
+        has_neighbors = occupied & (total > 0)
+        similarity = np.divide(same, total, out=np.zeros(self.grids.shape), where=has_neighbors)
+        happy = has_neighbors & (similarity >= self.thresholds[:, None, None])
+
+        self._state = {'similarity': similarity, 'has_neighbors': has_neighbors,
+                       'unhappy': occupied & ~happy, 'occupied': occupied}
+        return self._state
+
+    def unhappy_counts(self):
+        """
+        Get the number of unhappy agents in each replica.
+
+        Returns:
+            np.ndarray: One count per replica.
+        """
+        return np.count_nonzero(self._evaluate()['unhappy'], axis=(1, 2))
+
+    def metrics(self):
+        """
+        Get the segregation index and happiness rate of every replica.
+
+        Returns:
+            tuple: (segregation, happiness) float arrays with one entry per
+                replica. Both are 0 for a replica without agents.
+        """
+        state = self._evaluate()
+        axes = (1, 2)
+
+        num_agents = np.count_nonzero(state['occupied'], axis=axes)
+        num_valid = np.count_nonzero(state['has_neighbors'], axis=axes)
+        num_unhappy = np.count_nonzero(state['unhappy'], axis=axes)
+
+        segregation = np.divide(state['similarity'].sum(axis=axes), num_valid,
+                                out=np.zeros(len(self)), where=num_valid > 0)
+        happiness = np.divide(num_agents - num_unhappy, num_agents,
+                              out=np.zeros(len(self)), where=num_agents > 0)
+        return segregation, happiness
+
+    def step(self):
+        """
+        Execute one step in every replica and record its metrics.
+
+        Returns:
+            np.ndarray: Number of agents that moved in each replica.
+        """
+        moved = self._move_unhappy()
+
+        self.step_count += 1
+        segregation, happiness = self.metrics()
+        self.segregation_history.append(segregation)
+        self.happiness_history.append(happiness)
+
+        return moved
+
+    def _move_unhappy(self):
+        """
+        Relocate all currently unhappy agents to random empty cells.
+
+        Uses the same slot chain as Simulation._move_unhappy over a single
+        slot space: the empty cells of all replicas are listed replica by
+        replica, and each mover draws a slot from its own replica's range,
+        so chains never cross replicas.
+
+        Returns:
+            np.ndarray: Number of agents that moved in each replica.
+        """
+        num_replicas = len(self)
+        cells_per_replica = self.grids[0].size
+        flat = self.grids.reshape(-1)
+
+        vacancies = np.flatnonzero(flat == EMPTY_CELL)
+        num_vacancies = np.bincount(vacancies // cells_per_replica, minlength=num_replicas)
+        offsets = np.cumsum(num_vacancies) - num_vacancies
+
+        movers = np.flatnonzero(self._evaluate()['unhappy'].reshape(-1))
+        movers = movers[num_vacancies[movers // cells_per_replica] > 0]
+        if len(movers) == 0:
+            return np.zeros(num_replicas, dtype=np.int64)
+
+        movers = self.rng.permutation(movers)
+        replicas = movers // cells_per_replica
+        slots = offsets[replicas] + self.rng.integers(0, num_vacancies[replicas])
+
+        order = np.argsort(slots, kind='stable')
+        slots = slots[order]
+        sources = movers[order]
+
+        # First claimant of a slot gets the original vacancy, later ones
+        # get the cell left by the previous claimant of the same slot
+        first = np.ones(len(slots), dtype=bool)
+        first[1:] = slots[1:] != slots[:-1]
+        destinations = np.empty_like(sources)
+        destinations[first] = vacancies[slots[first]]
+        chained = np.flatnonzero(~first)
+        destinations[chained] = sources[chained - 1]
+
+        agent_types = flat[sources]
+        flat[sources] = EMPTY_CELL
+        flat[destinations] = agent_types
+        self._state = None
+
+        return np.bincount(replicas, minlength=num_replicas)
+
+    def run(self, max_steps):
+        """
+        Execute a fixed number of steps.
+
+        Args:
+            max_steps (int): Number of steps to run.
+        """
+        for _ in range(max_steps):
+            self.step()
+
+    def run_until_converged(self, max_steps=None):
+        """
+        Run until no agent in any replica can move or max_steps is reached.
+
+        A replica that has converged stays unchanged while the others keep
+        running, so its final state matches a separate Simulation run.
+
+        Args:
+            max_steps (int): Optional upper bound on the number of steps.
+
+        Returns:
+            np.ndarray: Per replica, the number of steps in which at least
+                one of its agents moved.
+        """
+        active_steps = np.zeros(len(self), dtype=np.int64)
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            moved = self.step()
+            if not moved.any():
+                break
+            active_steps += moved > 0
+            steps += 1
+        return active_steps
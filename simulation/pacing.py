@@ -0,0 +1,92 @@
+"""
+Pacing module for Schelling segregation model.
+Contains the FramePacer class that fits simulation steps into a time budget.
+"""
+
+import time
+
+from config import DEFAULT_PLATEAU_WINDOW
+
+# Default time per displayed frame, in seconds
+DEFAULT_FRAME_BUDGET = 0.1
+
+
+class FramePacer:
+    """
+    Runs as many simulation steps per frame as fit in a time budget.
+
+    The cost of a step is tracked as an exponential moving average of
+    measured step times; each frame plans a batch of budget / cost steps.
+    The clock is also checked after every step, so a sudden slowdown ends
+    the frame early instead of overrunning the budget. At least one step
+    runs per frame.
+
+    Attributes:
+        budget (float): Target seconds of simulation per frame.
+        smoothing (float): Weight of the newest measurement in the average.
+        step_cost (float): Estimated seconds per step, None until measured.
+    """
+
+    def __init__(self, budget=DEFAULT_FRAME_BUDGET, smoothing=0.3, clock=time.perf_counter):
+        """
+        Initialize a pacer.
+
+        Args:
+            budget (float): Target seconds of simulation per frame.
+            smoothing (float): Weight in (0, 1] of the newest step time.
+            clock (callable): Monotonic clock returning seconds.
+
+        Raises:
+            ValueError: If budget is not positive or smoothing is outside (0, 1].
+        """
+        if budget <= 0:
+            raise ValueError(f"Frame budget must be positive, got {budget}")
+        if not 0 < smoothing <= 1:
+            raise ValueError(f"Smoothing must be in (0, 1], got {smoothing}")
+
+        self.budget = budget
+        self.smoothing = smoothing
+        self.step_cost = None
+        self._clock = clock
+
+    def batch_size(self):
+        """
+        Get the number of steps planned for the next frame.
+
+        Returns:
+            int: Steps expected to fit in the budget, at least 1.
+        """
+        if not self.step_cost:
+            return 1
+        return max(1, int(self.budget / self.step_cost))
+
+    def advance(self, sim, plateau_window=DEFAULT_PLATEAU_WINDOW):
+        """
+        Step a simulation for about one frame budget.
+
+        Stops early once the simulation has converged.
+
+        Args:
+            sim (Simulation): Simulation to advance.
+            plateau_window (int): Plateau window for sim.convergence().
+
+        Returns:
+            int: Number of steps executed.
+        """
+        batch = self.batch_size()
+        start = self._clock()
+        steps = 0
+        while steps < batch and sim.convergence(plateau_window=plateau_window) is None:
+            sim.step()
+            steps += 1
+            if self._clock() - start >= self.budget:
+                break
+        if steps == 0:
+            return 0
+
+        cost = (self._clock() - start) / steps
+        if self.step_cost is None:
+            self.step_cost = cost
+        else:
+            self.step_cost += self.smoothing * (cost - self.step_cost)
+        return steps
@@ -0,0 +1,587 @@
+"""
+Simulation module for Schelling segregation model.
+Contains the Simulation class that advances the model one step at a time.
+"""
+
+import numpy as np
+from agent.agent import AgentTable
+from environment.environment import Environment, sublattice_colors
+from environment.index_set import IndexSet
+from simulation.checkpoint import save_arrays, load_arrays, pack_json, unpack_json
+from config import (CONVERGED_ALL_HAPPY, CONVERGED_NO_MOVES, CONVERGED_PLATEAU,
+                    DEFAULT_PLATEAU_WINDOW, DEFAULT_PLATEAU_TOLERANCE, MOVE_POLICY_SEQUENTIAL,
+                    MOVE_POLICY_SYNCHRONOUS, MOVE_POLICY_CHECKERBOARD, MOVE_POLICY_BEST_OF_K,
+                    DEFAULT_MOVE_POLICY, DEFAULT_MOVE_CANDIDATES, AGENT_TYPE_A, EMPTY_CELL,
+                    TOPOLOGY_TORUS)
+
+# Bumped whenever the checkpoint layout written by Simulation.save changes
+CHECKPOINT_VERSION = 1
+
+# Move policy -> Simulation method relocating one step's movers
+_POLICIES = {
+    MOVE_POLICY_SEQUENTIAL: '_move_unhappy',
+    MOVE_POLICY_SYNCHRONOUS: '_move_synchronous',
+    MOVE_POLICY_CHECKERBOARD: '_move_checkerboard',
+    MOVE_POLICY_BEST_OF_K: '_move_best_of_k',
+}
+
+# Offsets of the eight cells adjacent to a cell, the reach of a local move
+_ADJACENT_DX, _ADJACENT_DY = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                                       if dx or dy]).T
+
+# Cells of one sublattice are this far apart, so their 3x3 blocks are disjoint
+_SUBLATTICE_SPACING = 3
+
+
+class Simulation:
+    """
+    Runs the Schelling dynamics on an environment populated with agents.
+
+    Each step, the agents that are unhappy at the start of the step move
+    to random empty cells. Under the sequential policy every one of them
+    moves, in random order, and a cell vacated earlier in the step is
+    available to later movers. Under the synchronous policy they all pick
+    among the cells empty at the start of the step at once; a contested cell
+    goes to one claimant at random and the others stay put. Under the
+    checkerboard policy moves are local instead (see _move_checkerboard),
+    and under the best-of-k policy each mover picks the most similar of
+    several sampled cells (see _move_best_of_k). Movers come from the
+    environment's incrementally tracked unhappy set and empty cells from its
+    vacancy index. Each step is applied as one vectorized batch that
+    re-evaluates only agents near a move, so near convergence a step costs
+    time proportional to the number of movers rather than the population.
+
+    Attributes:
+        env (Environment): The environment containing the grid.
+        agents (AgentTable): Agents placed in the environment.
+        rng (np.random.Generator): Random stream for move order and targets.
+        policy (str): Move policy (MOVE_POLICY_SEQUENTIAL,
+            MOVE_POLICY_SYNCHRONOUS, MOVE_POLICY_CHECKERBOARD or
+            MOVE_POLICY_BEST_OF_K).
+        candidates (int): Cells each mover samples under the best-of-k policy.
+        step_count (int): Number of steps executed so far.
+        segregation_history (list): Segregation index after each step.
+        happiness_history (list): Happiness rate after each step.
+        recorder (MoveRecorder): Log receiving every step's moves, or None
+            (see record()).
+    """
+
+    def __init__(self, env, agents, seed=None, policy=DEFAULT_MOVE_POLICY,
+                 candidates=DEFAULT_MOVE_CANDIDATES):
+        """
+        Initialize a simulation for agents already placed in the environment.
+
+        Args:
+            env (Environment): Environment with agents placed on its grid.
+            agents (AgentTable or list): Placed agents. A list of Agent
+                objects is converted to a table whose rows they then view.
+            seed (int, np.random.SeedSequence or np.random.Generator):
+                Seed for a stream of the simulation's own. None shares the
+                environment's generator, so a seeded Environment alone
+                makes the whole run reproducible.
+            policy (str): Move policy (MOVE_POLICY_SEQUENTIAL,
+                MOVE_POLICY_SYNCHRONOUS, MOVE_POLICY_CHECKERBOARD or
+                MOVE_POLICY_BEST_OF_K).
+            candidates (int): Cells each mover samples under the best-of-k
+                policy.
+
+        Raises:
+            ValueError: If the policy is unknown or candidates is not positive.
+        """
+        if policy not in _POLICIES:
+            raise ValueError(f"Unknown move policy '{policy}'")
+        if candidates < 1:
+            raise ValueError(f"Candidates must be positive, got {candidates}")
+
+        self.env = env
+        self.policy = policy
+        self.candidates = candidates
+        self.rng = env.rng if seed is None else np.random.default_rng(seed)
+        self.agents = AgentTable.from_agents(agents, bind=True)
+        self.env.track(self.agents)
+        self.step_count = 0
+        self.segregation_history = []
+        self.happiness_history = []
+        self.recorder = None
+        self._improvement_scan = None
+        self._sublattices = None
+        # Set when a checkerboard step found no unhappy agent able to move
+        self._stalled = False
+
+    def record(self, recorder):
+        """
+        Append the moves of every following step to a move log.
+
+        The log starts with a keyframe of the current grid. The caller owns
+        the recorder and closes it when done.
+
+        Args:
+            recorder (MoveRecorder): Recorder that has not begun yet.
+        """
+        recorder.begin(self.env, self.step_count)
+        self.recorder = recorder
+
+    def unhappy_indices(self):
+        """
+        Get indices of agents that are currently unhappy.
+
+        Returns:
+            np.ndarray: Sorted agent ids (rows of self.agents).
+        """
+        return np.sort(self.env.unhappy.keys)
+
+    def step(self):
+        """
+        Execute one simulation step and record its metrics.
+
+        Returns:
+            int: Number of agents that moved.
+        """
+        moved = getattr(self, _POLICIES[self.policy])()
+
+        self.step_count += 1
+        if self.recorder is not None:
+            self.recorder.end_step(self.env)
+        segregation, happiness = self.metrics()
+        self.segregation_history.append(segregation)
+        self.happiness_history.append(happiness)
+
+        return moved
+
+    def _move_unhappy(self):
+        """
+        Relocate all currently unhappy agents to random empty cells.
+
+        Movers are processed in random order; each picks a uniformly random
+        slot of the vacancy list and leaves its old cell in that slot. Movers
+        drawing the same slot form a chain in which each one takes the cell
+        vacated by the previous one, which reproduces the sequential rule
+        exactly without a Python loop.
+
+        Returns:
+            int: Number of agents that moved.
+        """
+        agents = self.agents
+        vacancies = self.env.vacancies
+        height = self.env.height
+
+        movers = self.rng.permutation(self.env.unhappy.keys.copy())
+        if len(movers) == 0 or len(vacancies) == 0:
+            return 0
+
+        slots = self.rng.integers(0, len(vacancies), size=len(movers))
+        order = np.argsort(slots, kind='stable')
+        slots = slots[order]
+        movers = movers[order]
+        sources = agents.x[movers].astype(np.int64) * height + agents.y[movers]
+
+        # First claimant of a slot gets the original vacancy, later ones
+        # get the cell left by the previous claimant of the same slot
+        first = np.ones(len(slots), dtype=bool)
+        first[1:] = slots[1:] != slots[:-1]
+        destinations = np.empty_like(sources)
+        destinations[first] = vacancies.keys[slots[first]]
+        chained = np.flatnonzero(~first)
+        destinations[chained] = sources[chained - 1]
+
+        self.env.apply_moves(movers, destinations)
+        if self.recorder is not None:
+            self.recorder.append(movers, sources, destinations)
+        return len(movers)
+
+    def _move_synchronous(self):
+        """
+        Relocate unhappy agents simultaneously, one winner per vacancy.
+
+        Every mover proposes a uniformly random cell among those empty at
+        the start of the step. Each cell goes to one of its claimants at
+        random (see _claim); losers stay for the step.
+
+        Returns:
+            int: Number of agents that moved.
+        """
+        vacancies = self.env.vacancies
+
+        movers = self.rng.permutation(self.env.unhappy.keys.copy())
+        if len(movers) == 0 or len(vacancies) == 0:
+            return 0
+
+        proposals = vacancies.keys[self.rng.integers(0, len(vacancies), size=len(movers))]
+        return self._claim(movers, proposals)
+
+    def _move_best_of_k(self):
+        """
+        Relocate unhappy agents to the best of k sampled vacancies each.
+
+        Every mover draws self.candidates cells among those empty at the
+        start of the step. All movers x candidates are scored at once from
+        the environment's cached neighbor counts, discounting the mover
+        itself where a candidate lies in its current neighborhood, and each
+        mover proposes its candidate with the highest similarity (one that
+        meets its threshold whenever any does; isolated cells score last).
+        Contested cells are then settled as in _move_synchronous.
+
+        Returns:
+            int: Number of agents that moved.
+        """
+        env = self.env
+        agents = self.agents
+        vacancies = env.vacancies
+        height = env.height
+
+        movers = self.rng.permutation(env.unhappy.keys.copy())
+        if len(movers) == 0 or len(vacancies) == 0:
+            return 0
+
+        candidates = vacancies.keys[self.rng.integers(0, len(vacancies),
+                                                      size=(len(movers), self.candidates))]
+        type_a = env.type_counts[0].ravel()[candidates]
+        type_b = env.type_counts[1].ravel()[candidates]
+
+        # Counts at a candidate next to the mover's cell include the mover
+        x, y = np.divmod(candidates, height)
+        dx = np.abs(x - agents.x[movers][:, None])
+        dy = np.abs(y - agents.y[movers][:, None])
+        if env.topology == TOPOLOGY_TORUS:
+            dx = np.minimum(dx, env.width - dx)
+            dy = np.minimum(dy, height - dy)
+        own = ((dx <= env.radius) & (dy <= env.radius)).astype(type_a.dtype)
+        is_a = (agents.agent_type[movers] == AGENT_TYPE_A)[:, None]
+        type_a = type_a - np.where(is_a, own, 0)
+        type_b = type_b - np.where(is_a, 0, own)
+
+        same = np.where(is_a, type_a, type_b)
+        total = type_a + type_b
+        score = np.divide(same, total, out=np.full(total.shape, -1.0), where=total > 0)
+        best = np.argmax(score, axis=1)
+        return self._claim(movers, candidates[np.arange(len(movers)), best])
+
+    def _claim(self, movers, proposals):
+        """
+        Move each proposed cell's first claimant there, as one batch.
+
+        Proposals are sorted by cell; since movers come in random order,
+        keeping the first proposal for each cell gives every claimant an
+        equal chance. Winners move through Environment.move_agents; losers
+        stay for the step.
+
+        Args:
+            movers (np.ndarray): Agent ids in random order.
+            proposals (np.ndarray): Proposed empty cell per mover.
+
+        Returns:
+            int: Number of agents that moved.
+        """
+        height = self.env.height
+        order = np.argsort(proposals, kind='stable')
+        proposals = proposals[order]
+        first = np.ones(len(proposals), dtype=bool)
+        first[1:] = proposals[1:] != proposals[:-1]
+        movers = movers[order][first]
+        destinations = proposals[first]
+        sources = self.agents.x[movers].astype(np.int64) * height + self.agents.y[movers]
+
+        self.env.move_agents(movers, *np.divmod(destinations, height))
+        if self.recorder is not None:
+            self.recorder.append(movers, sources, destinations)
+        return len(movers)
+
+    def _move_checkerboard(self):
+        """
+        Move unhappy agents to adjacent empty cells, one sublattice at a time.
+
+        The grid is split into sublattices whose cells are at least three
+        apart (a 3x3 coloring, with extra colors at the seam of a torus
+        whose size is not a multiple of three), so the 3x3 blocks around
+        the cells of one sublattice never overlap. Each step visits the
+        sublattices in a fixed cycle; on each, every unhappy agent moves to
+        a uniformly random empty adjacent cell, all in one conflict-free
+        batch. Happiness is re-evaluated between sublattices, so an agent
+        can move again on a later sublattice of the same step. Agents with
+        no empty adjacent cell stay put.
+
+        Returns:
+            int: Number of agents that ended the step on a different cell.
+        """
+        env = self.env
+        agents = self.agents
+        height = env.height
+        wrap = env.topology == TOPOLOGY_TORUS
+
+        if self._sublattices is None:
+            self._sublattices = (sublattice_colors(env.width, _SUBLATTICE_SPACING, wrap),
+                                 sublattice_colors(height, _SUBLATTICE_SPACING, wrap))
+        colors_x, colors_y = self._sublattices
+        num_colors_y = int(colors_y.max()) + 1
+        num_colors = (int(colors_x.max()) + 1) * num_colors_y
+
+        moved, sources = [], []
+        for color in range(num_colors):
+            unhappy = env.unhappy.keys
+            color_of = colors_x[agents.x[unhappy]] * num_colors_y + colors_y[agents.y[unhappy]]
+            ids = unhappy[color_of == color]
+            if len(ids) == 0:
+                continue
+
+            x = agents.x[ids].astype(np.int64)[:, None] + _ADJACENT_DX
+            y = agents.y[ids].astype(np.int64)[:, None] + _ADJACENT_DY
+            if wrap:
+                x %= env.width
+                y %= height
+                free = env.grid[x, y] == EMPTY_CELL
+            else:
+                inside = (x >= 0) & (x < env.width) & (y >= 0) & (y < height)
+                free = inside & (env.grid[np.where(inside, x, 0), np.where(inside, y, 0)]
+                                 == EMPTY_CELL)
+
+            # Uniform choice among free cells: the largest random key wins
+            keys = np.where(free, self.rng.random(free.shape), -1.0)
+            choice = np.argmax(keys, axis=1)
+            rows = np.flatnonzero(free.any(axis=1))
+            if len(rows) == 0:
+                continue
+            ids = ids[rows]
+            moved.append(ids)
+            sources.append(agents.x[ids].astype(np.int64) * height + agents.y[ids])
+            env.move_agents(ids, x[rows, choice[rows]], y[rows, choice[rows]])
+
+        self._stalled = not moved
+        if not moved:
+            return 0
+
+        # Net moves of the step: first source and final cell of each agent
+        ids, first = np.unique(np.concatenate(moved), return_index=True)
+        sources = np.concatenate(sources)[first]
+        destinations = agents.x[ids].astype(np.int64) * height + agents.y[ids]
+        relocated = destinations != sources
+        ids, sources, destinations = ids[relocated], sources[relocated], destinations[relocated]
+
+        if self.recorder is not None:
+            self.recorder.append(ids, sources, destinations)
+        return len(ids)
+
+    def run(self, max_steps):
+        """
+        Execute a fixed number of steps.
+
+        Args:
+            max_steps (int): Number of steps to run.
+        """
+        for _ in range(max_steps):
+            self.step()
+
+    def convergence(self, plateau_window=DEFAULT_PLATEAU_WINDOW,
+                    plateau_tolerance=DEFAULT_PLATEAU_TOLERANCE):
+        """
+        Report whether the simulation has converged, and how.
+
+        Every agent being happy and unhappy agents with no empty cell to
+        move to are both fixed points: further steps change nothing. Under
+        the checkerboard policy, where only adjacent cells are reachable, a
+        step that moved no agent is such a fixed point too. A
+        plateau is reached when neither segregation nor happiness has risen
+        above its best value so far by more than plateau_tolerance in the
+        last plateau_window steps; agents may still be moving, but only
+        fluctuating around a steady state.
+
+        Args:
+            plateau_window (int): Steps without improvement that make a
+                plateau, or None to disable plateau detection.
+            plateau_tolerance (float): Smallest rise over the best value
+                that counts as an improvement.
+
+        Returns:
+            str: CONVERGED_ALL_HAPPY, CONVERGED_NO_MOVES or
+                CONVERGED_PLATEAU, or None while still evolving.
+        """
+        if len(self.env.unhappy) == 0:
+            return CONVERGED_ALL_HAPPY
+        if len(self.env.vacancies) == 0 or self._stalled:
+            return CONVERGED_NO_MOVES
+
+        if plateau_window and self._steps_since_improvement(plateau_tolerance) >= plateau_window:
+            return CONVERGED_PLATEAU
+        return None
+
+    def _steps_since_improvement(self, tolerance):
+        """
+        Count recorded steps since either metric last set a new best.
+
+        History entries are scanned once; the running bests are kept
+        between calls, so checking every step costs O(1) amortized.
+
+        Args:
+            tolerance (float): Smallest rise that counts as a new best.
+
+        Returns:
+            int: Steps since the last improvement (all steps if none).
+        """
+        scan = self._improvement_scan
+        num_steps = len(self.segregation_history)
+        if scan is None or scan['tolerance'] != tolerance or scan['scanned'] > num_steps:
+            scan = {'tolerance': tolerance, 'scanned': 0, 'best': [-np.inf, -np.inf],
+                    'last': 0}
+            self._improvement_scan = scan
+
+        histories = (self.segregation_history, self.happiness_history)
+        for i in range(scan['scanned'], num_steps):
+            for k, history in enumerate(histories):
+                if history[i] > scan['best'][k] + tolerance:
+                    scan['best'][k] = history[i]
+                    scan['last'] = i + 1
+        scan['scanned'] = num_steps
+        return num_steps - scan['last']
+
+    def run_until_converged(self, max_steps=None, plateau_window=DEFAULT_PLATEAU_WINDOW,
+                            plateau_tolerance=DEFAULT_PLATEAU_TOLERANCE):
+        """
+        Run until convergence() reports a state or max_steps is reached.
+
+        Convergence is checked before each step, so no step is spent (or
+        recorded in the histories) once the simulation has converged.
+
+        Args:
+            max_steps (int): Optional upper bound on the number of steps.
+            plateau_window (int): Plateau window for convergence(), or None
+                to stop only at a fixed point.
+            plateau_tolerance (float): Plateau tolerance for convergence().
+
+        Returns:
+            int: Number of steps executed (some may have moved no agent).
+        """
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            if self.convergence(plateau_window, plateau_tolerance) is not None:
+                break
+            self.step()
+            steps += 1
+        return steps
+
+    def metrics(self):
+        """
+        Get the segregation index and happiness rate of the current grid.
+
+        Both are read in O(1) from the environment's incrementally
+        maintained totals.
+
+        Returns:
+            tuple: (segregation, happiness) as floats. Both are 0 if there
+                are no agents.
+        """
+        num_agents = len(self.agents)
+        if num_agents == 0:
+            return 0.0, 0.0
+
+        happiness = (num_agents - len(self.env.unhappy)) / num_agents
+        return self.env.segregation_index(), happiness
+
+    def save(self, path, compressed=True):
+        """
+        Write the full simulation state to a checkpoint file.
+
+        The file is an .npz archive holding the uint8 grid, the agent
+        columns, the order of the vacancy and unhappy sets, the random
+        generator states, the move policy, the step counter, the metric
+        histories and the running similarity sum behind the segregation
+        index, so a loaded simulation continues exactly as this one would,
+        metrics included to the last bit.
+
+        Args:
+            path (str): Output file path, used as given.
+            compressed (bool): Deflate the arrays (smallest file). Write
+                uncompressed to allow memory-mapped loading.
+        """
+        env = self.env
+        meta = {
+            'version': CHECKPOINT_VERSION,
+            'width': env.width,
+            'height': env.height,
+            'radius': env.radius,
+            'topology': env.topology,
+            'packed': env.is_packed,
+            'step_count': self.step_count,
+            'policy': self.policy,
+            'candidates': self.candidates,
+            'env_rng': env.rng.bit_generator.state,
+            'sim_rng': None if self.rng is env.rng else self.rng.bit_generator.state,
+            'similarity_sum': env._similarity_sum,
+        }
+        save_arrays(path, {
+            'meta': pack_json(meta),
+            'grid': env._cells(),
+            'x': self.agents.x,
+            'y': self.agents.y,
+            'agent_type': self.agents.agent_type,
+            'threshold': self.agents.threshold,
+            'vacancies': env.vacancies.keys,
+            'unhappy': env.unhappy.keys,
+            'segregation_history': np.asarray(self.segregation_history, dtype=np.float64),
+            'happiness_history': np.asarray(self.happiness_history, dtype=np.float64),
+        }, compressed=compressed)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        Restore a simulation written by save().
+
+        Args:
+            path (str): Checkpoint file path.
+            mmap_mode (str): None to read the file into memory, or 'c' to
+                memory-map an uncompressed checkpoint copy-on-write: the
+                grid is used straight from the mapping and the file is
+                never modified. Other np.memmap modes are rejected, since
+                stepping writes to the grid ('r' would fail, 'r+' would
+                overwrite the checkpoint).
+
+        Returns:
+            Simulation: The restored simulation.
+
+        Raises:
+            ValueError: If mmap_mode is not None or 'c', or the file was
+                written by an incompatible version.
+        """
+        if mmap_mode not in (None, 'c'):
+            raise ValueError(f"Unsupported mmap_mode '{mmap_mode}'; use None or 'c'")
+
+        arrays = load_arrays(path, mmap_mode=mmap_mode)
+        meta = unpack_json(arrays['meta'])
+        if meta['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {meta['version']}")
+
+        env = Environment(width=meta['width'], height=meta['height'], radius=meta['radius'],
+                          topology=meta['topology'], seed=_restore_generator(meta['env_rng']))
+        env.grid = np.asarray(arrays['grid'])
+        agents = AgentTable(arrays['x'], arrays['y'], arrays['agent_type'], arrays['threshold'])
+
+        sim_rng = meta['sim_rng']
+        sim = cls(env, agents, seed=None if sim_rng is None else _restore_generator(sim_rng),
+                  policy=meta.get('policy', DEFAULT_MOVE_POLICY),
+                  candidates=meta.get('candidates', DEFAULT_MOVE_CANDIDATES))
+
+        # Set order feeds the random draws, so restore it exactly
+        env.vacancies = IndexSet(env.width * env.height, arrays['vacancies'])
+        env.unhappy = IndexSet(env.unhappy.capacity, arrays['unhappy'])
+        # The running sum drifts in its last bits from a fresh total
+        env._similarity_sum = meta.get('similarity_sum', env._similarity_sum)
+        if meta['packed']:
+            env.pack()
+
+        sim.step_count = meta['step_count']
+        sim.segregation_history = arrays['segregation_history'].tolist()
+        sim.happiness_history = arrays['happiness_history'].tolist()
+        return sim
+
+
+def _restore_generator(state):
+    """
+    Rebuild a random generator from its saved bit generator state.
+
+    Args:
+        state (dict): Value of Generator.bit_generator.state.
+
+    Returns:
+        np.random.Generator: Generator continuing from that state.
+    """
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
@@ -0,0 +1,70 @@
+"""
+Parameter sweep module for Schelling segregation model.
+Runs independent simulations in parallel worker processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from environment.environment import Environment
+from simulation.simulation import Simulation
+from helper import create_agents, randomly_place_agents
+from config import DEFAULT_PLATEAU_WINDOW, DEFAULT_MOVE_POLICY, DEFAULT_MOVE_CANDIDATES
+
+
+def run_converged(grid, num_type_a, num_type_b, threshold, max_steps, seed=None,
+                  plateau_window=DEFAULT_PLATEAU_WINDOW, policy=DEFAULT_MOVE_POLICY,
+                  candidates=DEFAULT_MOVE_CANDIDATES):
+    """
+    Run one simulation from a random placement until it converges.
+
+    Args:
+        grid (dict): Keyword arguments for Environment.
+        num_type_a (int): Number of type A agents.
+        num_type_b (int): Number of type B agents.
+        threshold (float): Similarity threshold of every agent.
+        max_steps (int): Upper bound on the number of steps.
+        seed (int or np.random.SeedSequence): Optional seed for the run's
+            random generator.
+        plateau_window (int): Plateau window for stopping early, or None
+            to stop only at a fixed point (see Simulation.convergence).
+        policy (str): Move policy of the simulation.
+        candidates (int): Cells sampled per mover by the best-of-k policy.
+
+    Returns:
+        tuple: (segregation, happiness) of the final grid.
+    """
+    env = Environment(**grid, seed=seed)
+    agents = create_agents(num_type_a, num_type_b, threshold)
+    randomly_place_agents(agents, env)
+
+    sim = Simulation(env, agents, policy=policy, candidates=candidates)
+    sim.run_until_converged(max_steps=max_steps, plateau_window=plateau_window)
+    return sim.metrics()
+
+
+def run_sweep(runs, seed=None, max_workers=None):
+    """
+    Run independent simulations in a process pool.
+
+    Each run gets its own child of SeedSequence(seed), so the streams are
+    statistically independent and results are bit-identical whatever the
+    number of workers or the order in which runs complete.
+
+    Args:
+        runs (list): Keyword argument dicts for run_converged, without seed.
+        seed (int): Optional base seed; None draws fresh entropy.
+        max_workers (int): Number of worker processes, defaults to the
+            number of CPUs.
+
+    Yields:
+        tuple: (index, (segregation, happiness)) for each run, in order of
+            completion; index is the position of the run in runs.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(runs))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_converged, seed=run_seed, **run): i
+                   for i, (run, run_seed) in enumerate(zip(runs, seeds))}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
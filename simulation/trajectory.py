@@ -0,0 +1,372 @@
+"""
+Trajectory module for Schelling segregation model.
+Records the moves of every step to an append-only binary log on disk and
+replays it to rebuild the grid of any recorded step.
+"""
+
+import json
+import os
+
+import numpy as np
+from environment.packing import unpack_cells, packed_size
+
+# One record per move: agent id and flat cell indices (x * height + y)
+MOVE_DTYPE = np.dtype([('agent', '<u4'), ('source', '<u4'), ('destination', '<u4')])
+
+DEFAULT_KEYFRAME_INTERVAL = 100
+
+_META_FILE = 'meta.json'
+_MOVES_FILE = 'moves.bin'
+_STEPS_FILE = 'steps.bin'
+_KEYFRAMES_FILE = 'keyframes.bin'
+
+
+def apply_step(grid, moves):
+    """
+    Apply the moves of one step to a grid in place.
+
+    The moves of a step form one batch (no cell is the destination of two
+    moves), so they can be applied in any order.
+
+    Args:
+        grid (np.ndarray): (width, height) uint8 grid before the step.
+        moves (np.ndarray): MOVE_DTYPE records of the step.
+    """
+    flat = grid.reshape(-1)
+    agent_types = flat[moves['source']]
+    flat[moves['source']] = 0
+    flat[moves['destination']] = agent_types
+
+
+class _GrowableArray:
+    """
+    A 1D array backed by a memory-mapped file that grows on append.
+
+    Capacity doubles when full, so appends are amortized O(1) and the file
+    is remapped only O(log n) times. close() trims the file to its size.
+    """
+
+    def __init__(self, path, dtype, capacity=1024):
+        self.dtype = np.dtype(dtype)
+        self.size = 0
+        self._file = open(path, 'w+b')
+        self._map = None
+        self._capacity = 0
+        self._reserve(capacity)
+
+    def _reserve(self, capacity):
+        if capacity <= self._capacity:
+            return
+        capacity = max(capacity, 2 * self._capacity)
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        self._file.truncate(capacity * self.dtype.itemsize)
+        self._map = np.memmap(self._file, dtype=self.dtype, mode='r+', shape=(capacity,))
+        self._capacity = capacity
+
+    def append(self, values):
+        values = np.asarray(values, dtype=self.dtype).reshape(-1)
+        end = self.size + len(values)
+        self._reserve(end)
+        self._map[self.size:end] = values
+        self.size = end
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.flush()
+        self._map = None
+        self._file.truncate(self.size * self.dtype.itemsize)
+        self._file.close()
+
+
+class MoveRecorder:
+    """
+    Appends the moves of each simulation step to a log directory.
+
+    Each move is a 12-byte (agent, source, destination) record in a
+    memory-mapped file that grows as needed; a second file holds the
+    cumulative number of moves after each step, so the moves of any step
+    are one slice. Every keyframe_interval steps the full grid is also
+    stored, 2-bit packed, so a reader can jump to a nearby keyframe and
+    apply only the moves since. Attach it with Simulation.record().
+
+    Attributes:
+        path (str): Log directory.
+        keyframe_interval (int): Steps between full-grid keyframes.
+        first_step (int): Simulation step at which recording started.
+        num_steps (int): Steps recorded so far.
+    """
+
+    def __init__(self, path, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        """
+        Create a recorder writing to a new or emptied log directory.
+
+        Args:
+            path (str): Log directory; created if missing, and any previous
+                log in it is overwritten.
+            keyframe_interval (int): Steps between full-grid keyframes.
+
+        Raises:
+            ValueError: If keyframe_interval is not positive.
+        """
+        if keyframe_interval < 1:
+            raise ValueError(f"Keyframe interval must be positive, got {keyframe_interval}")
+
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.first_step = None
+        self.num_steps = 0
+        self._shape = None
+
+        os.makedirs(path, exist_ok=True)
+        self._moves = _GrowableArray(os.path.join(path, _MOVES_FILE), MOVE_DTYPE, 1 << 16)
+        self._steps = _GrowableArray(os.path.join(path, _STEPS_FILE), np.int64)
+        self._keyframes = None
+
+    def begin(self, env, step):
+        """
+        Start the log at the current state of an environment.
+
+        Args:
+            env (Environment): Environment being simulated.
+            step (int): Current simulation step; the first keyframe.
+
+        Raises:
+            ValueError: If recording has already begun, or the grid has
+                more cells than a record can address.
+        """
+        if self.first_step is not None:
+            raise ValueError("Recording has already begun")
+        if env.width * env.height > np.iinfo(np.uint32).max:
+            raise ValueError(f"Grid of {env.width}x{env.height} cells is too large to record")
+
+        self.first_step = step
+        self._shape = (env.width, env.height)
+        self._keyframes = _GrowableArray(os.path.join(self.path, _KEYFRAMES_FILE), np.uint8,
+                                         packed_size(env.width * env.height))
+        self._keyframes.append(env.packed_cells())
+        self._write_meta()
+
+    def append(self, agent_ids, sources, destinations):
+        """
+        Record a batch of moves of the current step.
+
+        Args:
+            agent_ids (np.ndarray): Ids of the moving agents.
+            sources (np.ndarray): Flat cells the agents left.
+            destinations (np.ndarray): Flat cells the agents moved to.
+        """
+        records = np.empty(len(agent_ids), dtype=MOVE_DTYPE)
+        records['agent'] = agent_ids
+        records['source'] = sources
+        records['destination'] = destinations
+        self._moves.append(records)
+
+    def end_step(self, env):
+        """
+        Close the current step, storing a keyframe if one is due.
+
+        Args:
+            env (Environment): Environment after the step.
+        """
+        self._steps.append([self._moves.size])
+        self.num_steps += 1
+        if self.num_steps % self.keyframe_interval == 0:
+            self._keyframes.append(env.packed_cells())
+
+    def flush(self):
+        """Write buffered records and metadata so readers see every finished step."""
+        self._moves.flush()
+        self._steps.flush()
+        if self._keyframes is not None:
+            self._keyframes.flush()
+        self._write_meta()
+
+    def close(self):
+        """Flush the log and trim its files to their exact size."""
+        self._write_meta()
+        self._moves.close()
+        self._steps.close()
+        if self._keyframes is not None:
+            self._keyframes.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_meta(self):
+        meta = {
+            'width': self._shape[0] if self._shape else None,
+            'height': self._shape[1] if self._shape else None,
+            'keyframe_interval': self.keyframe_interval,
+            'first_step': self.first_step,
+            'num_steps': self.num_steps,
+        }
+        with open(os.path.join(self.path, _META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+
+class MoveLog:
+    """
+    Read-only view of a log written by MoveRecorder.
+
+    Files are memory-mapped, so opening a log is instant and only the
+    steps and keyframes actually read are paged in.
+
+    Attributes:
+        width (int): Grid width.
+        height (int): Grid height.
+        keyframe_interval (int): Steps between keyframes.
+        first_step (int): Simulation step of the first keyframe.
+        last_step (int): Simulation step after the last recorded step.
+    """
+
+    def __init__(self, path):
+        """
+        Open a log directory.
+
+        Args:
+            path (str): Directory written by MoveRecorder.
+
+        Raises:
+            ValueError: If recording never began in this directory.
+        """
+        with open(os.path.join(path, _META_FILE)) as f:
+            meta = json.load(f)
+        if meta['first_step'] is None:
+            raise ValueError(f"No recording in '{path}'")
+
+        self.width = meta['width']
+        self.height = meta['height']
+        self.keyframe_interval = meta['keyframe_interval']
+        self.first_step = meta['first_step']
+        self.last_step = self.first_step + meta['num_steps']
+
+        num_steps = meta['num_steps']
+        self._offsets = np.zeros(num_steps + 1, dtype=np.int64)
+        if num_steps:
+            self._offsets[1:] = np.memmap(os.path.join(path, _STEPS_FILE), dtype=np.int64,
+                                          mode='r', shape=(num_steps,))
+
+        num_moves = int(self._offsets[-1])
+        self._moves = (np.memmap(os.path.join(path, _MOVES_FILE), dtype=MOVE_DTYPE,
+                                 mode='r', shape=(num_moves,))
+                       if num_moves else np.zeros(0, dtype=MOVE_DTYPE))
+
+        frame_size = packed_size(self.width * self.height)
+        num_keyframes = num_steps // self.keyframe_interval + 1
+        self._keyframes = np.memmap(os.path.join(path, _KEYFRAMES_FILE), dtype=np.uint8,
+                                    mode='r', shape=(num_keyframes, frame_size))
+
+    def __len__(self):
+        """Number of recorded steps."""
+        return self.last_step - self.first_step
+
+    def moves(self, step):
+        """
+        Get the moves made during one step.
+
+        Args:
+            step (int): Simulation step, first_step < step <= last_step.
+
+        Returns:
+            np.ndarray: MOVE_DTYPE records of that step.
+
+        Raises:
+            IndexError: If the step was not recorded.
+        """
+        if not self.first_step < step <= self.last_step:
+            raise IndexError(f"Step {step} not in log ({self.first_step}, {self.last_step}]")
+        i = step - self.first_step
+        return self._moves[self._offsets[i - 1]:self._offsets[i]]
+
+    def keyframe(self, step):
+        """
+        Get the latest keyframe at or before a step.
+
+        Args:
+            step (int): Simulation step, first_step <= step <= last_step.
+
+        Returns:
+            tuple: (keyframe_step, grid) with grid a (width, height) uint8 array.
+
+        Raises:
+            IndexError: If the step is outside the log.
+        """
+        keyframe_step = self.keyframe_step(step)
+        k = (keyframe_step - self.first_step) // self.keyframe_interval
+        return keyframe_step, unpack_cells(self._keyframes[k], (self.width, self.height))
+
+    def keyframe_step(self, step):
+        """
+        Get the step of the latest keyframe at or before a step.
+
+        Args:
+            step (int): Simulation step, first_step <= step <= last_step.
+
+        Returns:
+            int: Step of the keyframe.
+
+        Raises:
+            IndexError: If the step is outside the log.
+        """
+        if not self.first_step <= step <= self.last_step:
+            raise IndexError(f"Step {step} not in log [{self.first_step}, {self.last_step}]")
+        k = (step - self.first_step) // self.keyframe_interval
+        return self.first_step + k * self.keyframe_interval
+
+
+class Replay:
+    """
+    Rebuilds the grid of any recorded step from a move log.
+
+    A step is reached by unpacking the nearest keyframe at or before it and
+    applying the moves since, so the cost is O(moves since the keyframe).
+    The last rebuilt grid is kept: scrubbing forward past it without
+    crossing a keyframe applies only the moves in between.
+
+    Attributes:
+        log (MoveLog): Log being replayed.
+    """
+
+    def __init__(self, log):
+        """
+        Initialize a replay of a log.
+
+        Args:
+            log (MoveLog): Log to replay.
+        """
+        self.log = log
+        self._step = None
+        self._grid = None
+
+    def grid_at(self, step):
+        """
+        Get the grid as it was after a step.
+
+        Args:
+            step (int): Simulation step, log.first_step <= step <= log.last_step.
+
+        Returns:
+            np.ndarray: Read-only (width, height) uint8 grid, valid until
+                the next call.
+
+        Raises:
+            IndexError: If the step is outside the log.
+        """
+        keyframe_step = self.log.keyframe_step(step)
+        if self._step is None or not keyframe_step <= self._step <= step:
+            self._step, self._grid = self.log.keyframe(step)
+
+        for s in range(self._step + 1, step + 1):
+            apply_step(self._grid, self.log.moves(s))
+        self._step = step
+
+        grid = self._grid.view()
+        grid.flags.writeable = False
+        return grid
@@ -1,8 +1,9 @@
 """Unit tests for Agent class."""
 
-from agent.agent import Agent
+import numpy as np
+from agent.agent import Agent, AgentTable
 from environment.environment import Environment
-from config import AGENT_TYPE_A, AGENT_TYPE_B, GRID_SIZE
+from config import AGENT_TYPE_A, AGENT_TYPE_B, GRID_SIZE, TOPOLOGY_BOUNDED
 
 
 class TestAgentInitialization:
@@ -67,4 +68,72 @@ class TestAgentNeighborhood:
         # Should wrap around grid
         assert (GRID_SIZE - 1, GRID_SIZE - 1) in neighbors
         assert (0, GRID_SIZE - 1) in neighbors
-        assert (GRID_SIZE - 1, 0) in neighbors
\ No newline at end of file
+        assert (GRID_SIZE - 1, 0) in neighbors
+
+    def test_neighbor_positions_use_environment(self):
+        env = Environment(width=10, height=6, radius=2)
+        agent = Agent(x=0, y=0, agent_type=AGENT_TYPE_A, similarity_threshold=0.3)
+        neighbors = agent.get_neighbor_positions(env)
+
+        assert len(neighbors) == 24
+        assert (8, 4) in neighbors
+
+    def test_neighbor_positions_bounded(self):
+        env = Environment(topology=TOPOLOGY_BOUNDED)
+        agent = Agent(x=0, y=0, agent_type=AGENT_TYPE_A, similarity_threshold=0.3)
+        neighbors = agent.get_neighbor_positions(env)
+
+        assert sorted(neighbors) == [(0, 1), (1, 0), (1, 1)]
+
+
+class TestAgentTable:
+    """Test columnar agent storage and views."""
+
+    def test_table_columns(self):
+        table = AgentTable([1, 2], [3, 4], [AGENT_TYPE_A, AGENT_TYPE_B], [0.3, 0.6])
+
+        assert len(table) == 2
+        assert table.x.tolist() == [1, 2]
+        assert table.agent_type.dtype == np.uint8
+        assert table.nbytes == 2 * (4 + 4 + 1 + 8)
+
+    def test_view_reads_and_writes_columns(self):
+        table = AgentTable([1, 2], [3, 4], [AGENT_TYPE_A, AGENT_TYPE_B], [0.3, 0.6])
+
+        agent = table[1]
+        assert (agent.x, agent.y, agent.agent_type) == (2, 4, AGENT_TYPE_B)
+        assert agent.similarity_threshold == 0.6
+
+        agent.x = 7
+        assert table.x[1] == 7
+        assert table[-1].x == 7
+
+    def test_views_compare_by_row(self):
+        table = AgentTable([1, 2], [3, 4], [AGENT_TYPE_A, AGENT_TYPE_B], [0.3, 0.6])
+
+        assert table[0] == table[0]
+        assert table[0] != table[1]
+
+    def test_from_agents_bind(self):
+        agents = [Agent(x=i, y=0, agent_type=AGENT_TYPE_A) for i in range(3)]
+
+        table = AgentTable.from_agents(agents, bind=True)
+        table.y[:] = 5
+
+        assert [agent.y for agent in agents] == [5, 5, 5]
+        assert agents[2] == table[2]
+
+    def test_view_is_happy(self):
+        env = Environment()
+        table = AgentTable([25, 24], [25, 25], [AGENT_TYPE_A, AGENT_TYPE_A], [0.5, 0.5])
+        env.grid[25, 25] = AGENT_TYPE_A
+        env.grid[24, 25] = AGENT_TYPE_A
+
+        assert table[0].is_happy(env)
+        assert len(table[0].get_neighbor_positions()) == 8
+
+    def test_table_rejects_ragged_columns(self):
+        import pytest
+
+        with pytest.raises(ValueError):
+            AgentTable([1, 2], [3], [AGENT_TYPE_A], [0.3])
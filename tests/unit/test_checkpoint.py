@@ -0,0 +1,59 @@
+"""Unit tests for checkpoint array storage."""
+
+import numpy as np
+from simulation.checkpoint import save_arrays, load_arrays, pack_json, unpack_json
+
+
+def sample_arrays():
+    return {
+        'grid': np.arange(60, dtype=np.uint8).reshape(6, 10),
+        'ids': np.array([5, 3, 9], dtype=np.int64),
+        'empty': np.zeros(0, dtype=np.float64),
+        'meta': pack_json({'state': 2 ** 100, 'name': 'torus'}),
+    }
+
+
+class TestArrayStorage:
+    """Test writing and reading named arrays."""
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / 'state.ckpt')
+        save_arrays(path, sample_arrays())
+        loaded = load_arrays(path)
+
+        for name, array in sample_arrays().items():
+            assert np.array_equal(loaded[name], array)
+            assert loaded[name].dtype == array.dtype
+
+    def test_path_used_as_given(self, tmp_path):
+        path = tmp_path / 'state.ckpt'
+        save_arrays(str(path), sample_arrays())
+        assert path.exists()
+
+    def test_uncompressed_members_are_memory_mapped(self, tmp_path):
+        path = str(tmp_path / 'state.npz')
+        save_arrays(path, sample_arrays(), compressed=False)
+        loaded = load_arrays(path, mmap_mode='r')
+
+        assert isinstance(loaded['grid'], np.memmap)
+        for name, array in sample_arrays().items():
+            assert np.array_equal(loaded[name], array)
+
+    def test_compressed_members_fall_back_to_reading(self, tmp_path):
+        path = str(tmp_path / 'state.npz')
+        save_arrays(path, sample_arrays())
+        loaded = load_arrays(path, mmap_mode='r')
+
+        assert not isinstance(loaded['grid'], np.memmap)
+        assert np.array_equal(loaded['ids'], [5, 3, 9])
+
+    def test_copy_on_write_leaves_file_unchanged(self, tmp_path):
+        path = str(tmp_path / 'state.npz')
+        save_arrays(path, sample_arrays(), compressed=False)
+        loaded = load_arrays(path, mmap_mode='c')
+        loaded['grid'][:] = 0
+
+        assert np.array_equal(load_arrays(path)['grid'], sample_arrays()['grid'])
+
+    def test_json_keeps_large_integers(self):
+        assert unpack_json(pack_json({'state': 2 ** 100})) == {'state': 2 ** 100}
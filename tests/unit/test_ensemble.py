@@ -0,0 +1,120 @@
+"""Unit tests for the batched ensemble engine."""
+
+import numpy as np
+import pytest
+from agent.agent import AgentTable
+from environment.environment import Environment
+from simulation.ensemble import Ensemble
+from simulation.simulation import Simulation
+from config import AGENT_TYPE_A, AGENT_TYPE_B, TOPOLOGY_BOUNDED
+
+
+def replica_simulation(ensemble, r):
+    """Build a Simulation holding the same agents as replica r."""
+    env = Environment(width=ensemble.grids.shape[1], height=ensemble.grids.shape[2],
+                      radius=ensemble.radius, topology=ensemble.topology)
+    positions = np.argwhere(ensemble.grids[r] != 0)
+    agent_types = ensemble.grids[r][positions[:, 0], positions[:, 1]]
+    agents = AgentTable(positions[:, 0], positions[:, 1], agent_types,
+                        np.full(len(positions), ensemble.thresholds[r]))
+    env.grid = ensemble.grids[r].copy()
+    return Simulation(env, agents)
+
+
+class TestCreation:
+    """Test building ensembles."""
+
+    def test_random_populations_per_replica(self):
+        ensemble = Ensemble.random([10, 50, 0], [40, 50, 100], 0.3, width=20, height=15, seed=0)
+
+        assert ensemble.grids.shape == (3, 20, 15)
+        assert np.count_nonzero(ensemble.grids == AGENT_TYPE_A, axis=(1, 2)).tolist() == [10, 50, 0]
+        assert np.count_nonzero(ensemble.grids == AGENT_TYPE_B, axis=(1, 2)).tolist() == [40, 50, 100]
+        assert ensemble.thresholds.tolist() == [0.3, 0.3, 0.3]
+
+    def test_same_seed_same_placement(self):
+        first = Ensemble.random(40, 40, 0.3, width=10, height=10, seed=9)
+        second = Ensemble.random(40, 40, 0.3, width=10, height=10, seed=9)
+        assert np.array_equal(first.grids, second.grids)
+
+    def test_too_many_agents_raises_error(self):
+        with pytest.raises(ValueError):
+            Ensemble.random([10, 60], 50, 0.3, width=10, height=10)
+
+    def test_torus_neighborhood_wider_than_grid_raises_error(self):
+        with pytest.raises(ValueError):
+            Ensemble(np.zeros((2, 3, 3)), 0.3, radius=2)
+
+    def test_threshold_count_must_match(self):
+        with pytest.raises(ValueError):
+            Ensemble(np.zeros((3, 5, 5)), [0.1, 0.2])
+
+
+class TestMetrics:
+    """Test counts and metrics against single-replica simulations."""
+
+    @pytest.mark.parametrize('topology', ['torus', TOPOLOGY_BOUNDED])
+    def test_counts_match_environment(self, topology):
+        ensemble = Ensemble.random(60, 60, 0.5, width=16, height=12, radius=2,
+                                   topology=topology, seed=1)
+        type_a, type_b = ensemble.neighbor_counts()
+
+        env = Environment(width=16, height=12, radius=2, topology=topology)
+        env.grid = ensemble.grids[0].copy()
+        counts = env.neighbor_counts()
+        assert np.array_equal(type_a[0], counts['type_a'])
+        assert np.array_equal(type_b[0], counts['type_b'])
+
+    def test_metrics_match_simulation(self):
+        ensemble = Ensemble.random([30, 80, 120], [120, 80, 30], [0.2, 0.5, 0.8],
+                                   width=20, height=20, seed=2)
+        segregation, happiness = ensemble.metrics()
+
+        for r in range(len(ensemble)):
+            expected = replica_simulation(ensemble, r).metrics()
+            assert segregation[r] == pytest.approx(expected[0], abs=1e-12)
+            assert happiness[r] == expected[1]
+
+    def test_empty_replica_metrics_are_zero(self):
+        ensemble = Ensemble(np.zeros((2, 5, 5)), 0.3)
+        segregation, happiness = ensemble.metrics()
+        assert segregation.tolist() == [0.0, 0.0]
+        assert happiness.tolist() == [0.0, 0.0]
+
+
+class TestStep:
+    """Test stepping all replicas at once."""
+
+    def test_step_moves_every_unhappy_agent_and_keeps_populations(self):
+        ensemble = Ensemble.random([100, 150], [100, 50], [0.5, 0.7], width=20, height=20, seed=3)
+        unhappy = ensemble.unhappy_counts()
+        before = [np.bincount(g.ravel(), minlength=3) for g in ensemble.grids]
+
+        moved = ensemble.step()
+
+        assert moved.tolist() == unhappy.tolist()
+        for grid, counts in zip(ensemble.grids, before):
+            assert np.bincount(grid.ravel(), minlength=3).tolist() == counts.tolist()
+        assert ensemble.step_count == 1
+        assert len(ensemble.segregation_history) == 1
+
+    def test_converged_replica_is_unchanged(self):
+        ensemble = Ensemble.random(100, 100, [0.0, 0.6], width=20, height=20, seed=4)
+        ensemble.grids[0] = 0
+        ensemble.grids[0, :10] = AGENT_TYPE_A
+        ensemble.grids[0, 10:] = AGENT_TYPE_B
+        ensemble.grids[0, 0, 0] = 0
+        frozen = ensemble.grids[0].copy()
+
+        ensemble.run(5)
+
+        assert np.array_equal(ensemble.grids[0], frozen)
+
+    def test_run_until_converged(self):
+        ensemble = Ensemble.random(150, 150, [0.1, 0.3, 0.5], width=25, height=25, seed=5)
+        active = ensemble.run_until_converged(max_steps=200)
+
+        assert active.shape == (3,)
+        assert ensemble.unhappy_counts().tolist() == [0, 0, 0]
+        segregation, _ = ensemble.metrics()
+        assert segregation[2] > segregation[0]
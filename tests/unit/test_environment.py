@@ -1,9 +1,11 @@
 """Unit tests for Environment class."""
 
 import pytest
-from agent.agent import Agent
-from environment.environment import Environment
-from config import AGENT_TYPE_A, AGENT_TYPE_B, EMPTY_CELL, GRID_SIZE
+import numpy as np
+from agent.agent import Agent, AgentTable
+from helper import calculate_segregation_index
+from environment.environment import Environment, MoveConflictError, sublattice_colors
+from config import AGENT_TYPE_A, AGENT_TYPE_B, EMPTY_CELL, GRID_SIZE, TOPOLOGY_BOUNDED
 
 
 class TestEnvironmentInitialization:
@@ -14,6 +16,33 @@ class TestEnvironmentInitialization:
         assert env.grid.shape == (GRID_SIZE, GRID_SIZE)
         assert env.grid.sum() == 0  # All empty initially
 
+    def test_grid_is_uint8(self):
+        env = Environment()
+        assert env.grid.dtype == np.uint8
+        assert env.grid_nbytes == GRID_SIZE * GRID_SIZE
+
+    def test_custom_dimensions(self):
+        env = Environment(width=30, height=20, radius=2, topology=TOPOLOGY_BOUNDED)
+        assert env.grid.shape == (30, 20)
+        assert (env.width, env.height, env.radius) == (30, 20, 2)
+        assert len(env.vacancies) == 600
+
+    def test_invalid_arguments_raise_error(self):
+        with pytest.raises(ValueError):
+            Environment(width=0)
+        with pytest.raises(ValueError):
+            Environment(radius=0)
+        with pytest.raises(ValueError):
+            Environment(topology='sphere')
+
+    def test_torus_neighborhood_wider_than_grid_raises_error(self):
+        with pytest.raises(ValueError):
+            Environment(width=3, height=3, radius=2)
+        with pytest.raises(ValueError):
+            Environment(width=40, height=4, radius=2)
+        Environment(width=5, height=5, radius=2)
+        Environment(width=3, height=3, radius=2, topology=TOPOLOGY_BOUNDED)
+
 
 class TestEmptyCells:
     """Test empty cell tracking."""
@@ -34,6 +63,36 @@ class TestEmptyCells:
         assert (20, 20) not in empty
 
 
+class TestVacancyIndex:
+    """Test the constant-time vacancy index."""
+
+    def test_vacancies_start_full(self):
+        env = Environment()
+        assert len(env.vacancies) == GRID_SIZE * GRID_SIZE
+
+    def test_index_follows_place_move_remove(self):
+        env = Environment()
+        agent = Agent(x=0, y=0, agent_type=AGENT_TYPE_A, similarity_threshold=0.3)
+
+        env.place_agent(agent, 10, 10)
+        assert 10 * GRID_SIZE + 10 not in env.vacancies
+
+        env.move_agent(agent, 20, 20)
+        assert 10 * GRID_SIZE + 10 in env.vacancies
+        assert 20 * GRID_SIZE + 20 not in env.vacancies
+
+        env.remove_agent(agent)
+        assert len(env.vacancies) == GRID_SIZE * GRID_SIZE
+
+    def test_sample_empty_cell(self):
+        env = Environment()
+        env.grid[:, :] = AGENT_TYPE_A
+        env.grid[3, 4] = EMPTY_CELL
+        env.rebuild_vacancies()
+
+        assert env.sample_empty_cell() == (3, 4)
+
+
 class TestAgentPlacement:
     """Test agent placement."""
 
@@ -57,6 +116,45 @@ class TestAgentPlacement:
         with pytest.raises(ValueError):
             env.place_agent(agent2, 10, 10)
 
+    def test_place_agents_bulk(self):
+        env = Environment(width=10, height=8)
+        agents = AgentTable(np.zeros(3), np.zeros(3), [AGENT_TYPE_A, AGENT_TYPE_B, AGENT_TYPE_A],
+                            np.full(3, 0.3))
+
+        env.place_agents(agents, [0, 4, 9], [0, 7, 3])
+
+        assert env.grid[0, 0] == AGENT_TYPE_A
+        assert env.grid[4, 7] == AGENT_TYPE_B
+        assert env.grid[9, 3] == AGENT_TYPE_A
+        np.testing.assert_array_equal(agents.x, [0, 4, 9])
+        np.testing.assert_array_equal(agents.y, [0, 7, 3])
+        assert sorted(env.vacancies.keys) == np.flatnonzero(env.grid == EMPTY_CELL).tolist()
+
+    @pytest.mark.parametrize('x, y', [([0, 0], [1, 1]),    # shared cell
+                                      ([0, 10], [1, 1]),   # out of bounds
+                                      ([5, 6], [5, 5]),    # occupied
+                                      ([0], [1])])         # length mismatch
+    def test_place_agents_rejects_invalid_batch(self, x, y):
+        env = Environment(width=10, height=10)
+        env.place_agent(Agent(0, 0, AGENT_TYPE_B), 5, 5)
+        grid = env.grid.copy()
+        agents = AgentTable(np.zeros(2), np.zeros(2), [AGENT_TYPE_A, AGENT_TYPE_A], np.full(2, 0.3))
+
+        with pytest.raises(ValueError):
+            env.place_agents(agents, x, y)
+
+        np.testing.assert_array_equal(env.grid, grid)
+        assert len(env.vacancies) == 99
+
+    def test_place_agents_while_tracking_raises_error(self):
+        env = Environment(width=10, height=10)
+        agents = AgentTable([0], [0], [AGENT_TYPE_A], [0.3])
+        env.place_agents(agents, [0], [0])
+        env.track(agents)
+
+        with pytest.raises(ValueError):
+            env.place_agents(AgentTable([0], [0], [AGENT_TYPE_A], [0.3]), [1], [1])
+
 
 class TestAgentMovement:
     """Test agent movement."""
@@ -117,6 +215,335 @@ class TestNeighborCounting:
         assert counts['type_b'] == 1
         assert counts['empty'] == 5
 
+    def test_count_neighbors_wrapping(self):
+        env = Environment()
+        env.grid[GRID_SIZE - 1, GRID_SIZE - 1] = AGENT_TYPE_A
+        env.grid[1, 0] = AGENT_TYPE_B
+
+        counts = env.count_neighbors(0, 0)
+
+        assert counts['type_a'] == 1
+        assert counts['type_b'] == 1
+
+
+class TestTopology:
+    """Test non-square and bounded grids."""
+
+    def test_bounded_count_neighbors_at_corner(self):
+        env = Environment(topology=TOPOLOGY_BOUNDED)
+        env.grid[GRID_SIZE - 1, GRID_SIZE - 1] = AGENT_TYPE_A
+        env.grid[1, 1] = AGENT_TYPE_B
+
+        counts = env.count_neighbors(0, 0)
+
+        assert counts == {'type_a': 0, 'type_b': 1, 'empty': 2}
+
+    def test_large_radius_counts_do_not_overflow(self):
+        env = Environment(width=250, height=250, radius=100, topology=TOPOLOGY_BOUNDED)
+        env.grid[:, :] = AGENT_TYPE_A
+
+        counts = env.neighbor_counts()
+
+        assert counts['type_a'][125, 125] == env.count_neighbors(125, 125)['type_a'] == 201 ** 2 - 1
+        assert counts['empty'].min() == 0
+
+    def test_bounded_neighbor_counts_match_count_neighbors(self):
+        rng = np.random.default_rng(1)
+        env = Environment(width=12, height=7, radius=2, topology=TOPOLOGY_BOUNDED)
+        env.grid[:, :] = rng.integers(0, 3, size=(12, 7))
+
+        counts = env.neighbor_counts()
+
+        for x in range(12):
+            for y in range(7):
+                expected = env.count_neighbors(x, y)
+                for key in ('type_a', 'type_b', 'empty'):
+                    assert counts[key][x, y] == expected[key]
+
+    def test_rectangular_torus_wraps_each_axis(self):
+        env = Environment(width=10, height=4)
+        env.grid[9, 3] = AGENT_TYPE_A
+
+        assert env.count_neighbors(0, 0)['type_a'] == 1
+        assert env.neighbor_counts()['type_a'][0, 0] == 1
+
+    def test_tracking_on_bounded_grid(self):
+        env = Environment(width=15, height=9, topology=TOPOLOGY_BOUNDED)
+        agents = AgentTable([0, 1, 14, 7], [0, 0, 8, 4],
+                            [AGENT_TYPE_A, AGENT_TYPE_A, AGENT_TYPE_B, AGENT_TYPE_B],
+                            [0.5] * 4)
+        env.grid[agents.x, agents.y] = agents.agent_type
+        env.track(agents)
+
+        env.move_agent(agents[2], 0, 1)
+        env.move_agent(agents[3], 14, 8)
+
+        counts = env.neighbor_counts()
+        assert (env.type_counts[0] == counts['type_a']).all()
+        assert (env.type_counts[1] == counts['type_b']).all()
+        assert sorted(env.unhappy.keys.tolist()) == [
+            i for i, agent in enumerate(agents) if not agent.is_happy(env)]
+
+
+class TestSublatticeColors:
+    """Test the sublattice coloring used for parallel local updates."""
+
+    @pytest.mark.parametrize('size', [1, 2, 3, 4, 5, 9, 10, 11, 50])
+    def test_same_color_cells_are_spaced_on_torus(self, size):
+        colors = sublattice_colors(size, 3, wrap=True)
+
+        for i in range(size):
+            for j in range(i + 1, size):
+                if colors[i] == colors[j]:
+                    assert min(j - i, size - (j - i)) >= 3
+
+    def test_divisible_torus_uses_three_colors(self):
+        assert sublattice_colors(9, 3).tolist() == [0, 1, 2] * 3
+
+    def test_seam_cells_get_own_colors(self):
+        assert sublattice_colors(8, 3).tolist() == [0, 1, 2, 0, 1, 2, 3, 4]
+        assert sublattice_colors(8, 3, wrap=False).tolist() == [0, 1, 2, 0, 1, 2, 0, 1]
+
+
+class TestNeighborCountArrays:
+    """Test whole-grid neighbor counting."""
+
+    def test_neighbor_counts_shape(self):
+        env = Environment()
+        counts = env.neighbor_counts()
+
+        for key in ('type_a', 'type_b', 'empty'):
+            assert counts[key].shape == (GRID_SIZE, GRID_SIZE)
+        assert (counts['empty'] == 8).all()
+
+    def test_neighbor_counts_match_count_neighbors(self):
+        rng = np.random.default_rng(0)
+        env = Environment()
+        env.grid[:, :] = rng.integers(0, 3, size=(GRID_SIZE, GRID_SIZE))
+
+        counts = env.neighbor_counts()
+
+        for x, y in [(0, 0), (25, 25), (GRID_SIZE - 1, 3), (7, GRID_SIZE - 1)]:
+            expected = env.count_neighbors(x, y)
+            for key in ('type_a', 'type_b', 'empty'):
+                assert counts[key][x, y] == expected[key]
+
+    def test_neighbor_counts_larger_radius(self):
+        env = Environment()
+        env.grid[10, 10] = AGENT_TYPE_B
+
+        counts = env.neighbor_counts(radius=2)
+
+        assert counts['type_b'][12, 8] == 1
+        assert counts['type_b'][13, 10] == 0
+        assert counts['type_b'][10, 10] == 0
+        assert counts['empty'][0, 0] == 24
+
+
+class TestHappinessTracking:
+    """Test incremental neighbor count and happiness tracking."""
+
+    def make_tracked_env(self, seed=0):
+        rng = np.random.default_rng(seed)
+        env = Environment()
+        cells = rng.permutation(GRID_SIZE * GRID_SIZE)[:1500]
+        x, y = np.divmod(cells, GRID_SIZE)
+        agent_types = np.where(np.arange(1500) % 2 == 0, AGENT_TYPE_A, AGENT_TYPE_B)
+        agents = AgentTable(x, y, agent_types, np.full(1500, 0.5))
+        env.grid[x, y] = agent_types
+        env.track(agents)
+        return env, agents
+
+    def assert_consistent(self, env, agents):
+        counts = env.neighbor_counts()
+        assert (env.type_counts[0] == counts['type_a']).all()
+        assert (env.type_counts[1] == counts['type_b']).all()
+
+        expected = [i for i, agent in enumerate(agents) if not agent.is_happy(env)]
+        assert sorted(env.unhappy.keys.tolist()) == expected
+
+        on_grid = env.occupant[env.occupant >= 0]
+        placed = AgentTable(agents.x[on_grid], agents.y[on_grid],
+                            agents.agent_type[on_grid], agents.threshold[on_grid])
+        assert abs(env.segregation_index() - calculate_segregation_index(placed, env)) < 1e-12
+
+    def test_track_builds_state(self):
+        env, agents = self.make_tracked_env()
+
+        assert env.occupant[agents.x[0], agents.y[0]] == 0
+        assert (env.occupant >= 0).sum() == len(agents)
+        self.assert_consistent(env, agents)
+
+    def test_move_agent_updates_tracking(self):
+        env, agents = self.make_tracked_env()
+        rng = np.random.default_rng(1)
+
+        for agent_id in rng.integers(0, len(agents), size=200).tolist():
+            x, y = env.sample_empty_cell()
+            env.move_agent(agents[agent_id], x, y)
+
+        assert env.occupant[agents.x[5], agents.y[5]] == 5
+        self.assert_consistent(env, agents)
+
+    def test_move_agents_applies_batch(self):
+        env, agents = self.make_tracked_env()
+        ids = np.arange(0, 600, 3)
+        cells = env.vacancies.keys[:len(ids)].copy()
+        # Chain and swap: agent 1 takes agent 0's cell, agents 2 and 4 trade places
+        ids = np.append(ids, [1, 2, 4])
+        cells = np.append(cells, [agents.x[0] * GRID_SIZE + agents.y[0],
+                                  agents.x[4] * GRID_SIZE + agents.y[4],
+                                  agents.x[2] * GRID_SIZE + agents.y[2]])
+
+        env.move_agents(ids, *np.divmod(cells, GRID_SIZE))
+
+        np.testing.assert_array_equal(agents.x[ids] * GRID_SIZE + agents.y[ids], cells)
+        assert sorted(env.vacancies.keys) == np.flatnonzero(env.grid == EMPTY_CELL).tolist()
+        self.assert_consistent(env, agents)
+
+    def test_move_agents_reports_conflicts(self):
+        env, agents = self.make_tracked_env()
+        free = env.vacancies.keys[:3].copy()
+        x, y = np.divmod(free, GRID_SIZE)
+        grid = env.grid.copy()
+
+        ids = [0, 1, 2, 3, 3, 4, len(agents)]
+        dest_x = [x[0], x[1], x[1], x[2], x[2], GRID_SIZE, x[0]]
+        dest_y = [y[0], y[1], y[1], agents.y[5], agents.y[5], 0, y[0]]
+        dest_x[3] = dest_x[4] = agents.x[5]
+
+        with pytest.raises(MoveConflictError) as exc:
+            env.move_agents(ids, dest_x, dest_y)
+
+        # Shared destination, occupied cell, repeated agent, off-grid, unknown agent
+        assert exc.value.conflicts.tolist() == [1, 2, 3, 4, 5, 6]
+        np.testing.assert_array_equal(env.grid, grid)
+        self.assert_consistent(env, agents)
+
+    def test_removed_agent_cannot_be_moved(self):
+        env, agents = self.make_tracked_env()
+        freed = (int(agents.x[5]), int(agents.y[5]))
+        env.remove_agent(agents[5])
+        env.move_agent(agents[6], *freed)
+        x, y = env.sample_empty_cell()
+
+        with pytest.raises(MoveConflictError) as exc:
+            env.move_agents([5], [x], [y])
+        assert exc.value.conflicts.tolist() == [0]
+        with pytest.raises(ValueError):
+            env.move_agent(agents[5], x, y)
+
+        assert env.occupant[freed] == 6
+        assert np.count_nonzero(env.grid) == len(agents) - 1
+        counts = env.neighbor_counts()
+        assert (env.type_counts[0] == counts['type_a']).all()
+        assert (env.type_counts[1] == counts['type_b']).all()
+
+    def test_move_agents_untracked_raises_error(self):
+        with pytest.raises(ValueError):
+            Environment().move_agents([0], [1], [1])
+
+    def test_remove_and_place_update_tracking(self):
+        env, agents = self.make_tracked_env()
+        agent = agents[10]
+
+        env.remove_agent(agent)
+        assert 10 not in env.unhappy
+        x, y = env.sample_empty_cell()
+        env.place_agent(agent, x, y)
+
+        self.assert_consistent(env, agents)
+
+    def test_removed_agent_cannot_be_removed_again(self):
+        env, agents = self.make_tracked_env()
+        freed = (int(agents.x[5]), int(agents.y[5]))
+        env.remove_agent(agents[5])
+
+        with pytest.raises(ValueError):
+            env.remove_agent(agents[5])
+        env.move_agent(agents[6], *freed)
+        with pytest.raises(ValueError):
+            env.remove_agent(agents[5])
+
+        assert env.occupant[freed] == 6
+        counts = env.neighbor_counts()
+        assert (env.type_counts[0] == counts['type_a']).all()
+        assert (env.type_counts[1] == counts['type_b']).all()
+        on_grid = np.sort(env.occupant[env.occupant >= 0])
+        expected = [i for i in on_grid.tolist() if not agents[i].is_happy(env)]
+        assert sorted(env.unhappy.keys.tolist()) == expected
+
+    def test_placed_agent_cannot_be_placed_again(self):
+        env, agents = self.make_tracked_env()
+        x, y = env.sample_empty_cell()
+
+        with pytest.raises(ValueError):
+            env.place_agent(agents[10], x, y)
+        assert env.grid[x, y] == EMPTY_CELL
+        self.assert_consistent(env, agents)
+
+    def test_segregation_index_untracked_is_zero(self):
+        assert Environment().segregation_index() == 0.0
+
+    def test_place_untracked_agent_raises_error(self):
+        env, agents = self.make_tracked_env()
+        stranger = Agent(x=0, y=0, agent_type=AGENT_TYPE_A, similarity_threshold=0.3)
+        x, y = env.sample_empty_cell()
+
+        with pytest.raises(ValueError):
+            env.place_agent(stranger, x, y)
+
+
+class TestPackedMode:
+    """Test 2-bit packed grid storage."""
+
+    def test_packed_environment_starts_packed(self):
+        env = Environment(width=40, height=30, packed=True)
+        assert env.is_packed
+        assert env.grid_nbytes == 300
+        assert env._vacancies is None
+
+    def test_vacancies_built_on_first_use(self):
+        env = Environment(width=40, height=30, packed=True)
+
+        assert len(env.vacancies) == 40 * 30
+        assert env.is_packed
+
+    def test_pack_round_trip(self):
+        rng = np.random.default_rng(2)
+        env = Environment()
+        env.grid[:, :] = rng.integers(0, 3, size=(GRID_SIZE, GRID_SIZE))
+        expected = env.grid.copy()
+
+        env.pack()
+        assert env.is_packed
+        assert env.grid_nbytes == GRID_SIZE * GRID_SIZE // 4
+
+        assert (env.grid == expected).all()
+        assert not env.is_packed
+
+    def test_neighbor_counts_keep_packed_mode(self):
+        rng = np.random.default_rng(3)
+        env = Environment()
+        env.grid[:, :] = rng.integers(0, 3, size=(GRID_SIZE, GRID_SIZE))
+        expected = env.neighbor_counts()
+        occupancy = env.get_occupancy_rate()
+
+        env.pack()
+        counts = env.neighbor_counts()
+
+        assert env.is_packed
+        assert (counts['type_a'] == expected['type_a']).all()
+        assert (counts['type_b'] == expected['type_b']).all()
+        assert env.get_occupancy_rate() == occupancy
+
+    def test_writes_after_unpacking_persist(self):
+        env = Environment(packed=True)
+        env.grid[3, 3] = AGENT_TYPE_B
+
+        env.pack()
+        assert env.grid[3, 3] == AGENT_TYPE_B
+
 
 class TestOccupancy:
     """Test occupancy calculation."""
@@ -3,7 +3,8 @@
 from agent.agent import Agent
 from environment.environment import Environment
 from helper import (create_agents, randomly_place_agents, calculate_segregation_index,
-                    calculate_happiness_rate, get_unhappy_agents, get_agent_counts_by_type)
+                    calculate_happiness_rate, get_unhappy_agents, get_agent_counts_by_type,
+                    compute_step_metrics)
 from config import AGENT_TYPE_A, AGENT_TYPE_B
 
 
@@ -43,6 +44,35 @@ class TestRandomPlacement:
         for agent in agents:
             assert env.grid[agent.x, agent.y] == agent.agent_type
 
+    def test_places_agent_objects(self):
+        env = Environment(width=10, height=10)
+        agents = [Agent(0, 0, AGENT_TYPE_A), Agent(0, 0, AGENT_TYPE_B)]
+
+        randomly_place_agents(agents, env)
+
+        assert env.grid[agents[0].x, agents[0].y] == AGENT_TYPE_A
+        assert env.grid[agents[1].x, agents[1].y] == AGENT_TYPE_B
+        assert len(env.vacancies) == 98
+
+    def test_same_seed_same_placement(self):
+        grids = []
+        for _ in range(2):
+            env = Environment(width=20, height=15, seed=3)
+            randomly_place_agents(create_agents(100, 80, 0.3), env)
+            grids.append(env.grid)
+
+        assert (grids[0] == grids[1]).all()
+
+    def test_fills_grid_completely(self):
+        env = Environment(width=12, height=9)
+        agents = create_agents(60, 48, 0.3)
+
+        randomly_place_agents(agents, env)
+
+        assert env.get_occupancy_rate() == 1.0
+        assert len(env.vacancies) == 0
+        assert len({(a.x, a.y) for a in agents}) == 108
+
     def test_placement_raises_error_if_too_many_agents(self):
         import pytest
 
@@ -154,6 +184,42 @@ class TestUnhappyAgents:
         assert unhappy[0] == agent_a
 
 
+class TestStepMetrics:
+    """Test the fused metrics pass."""
+
+    def test_empty_population(self):
+        metrics = compute_step_metrics([], Environment())
+
+        assert metrics['segregation'] == 0.0
+        assert metrics['happiness'] == 0.0
+        assert len(metrics['unhappy']) == 0
+
+    def test_metrics_match_per_agent_rules(self):
+        env = Environment()
+        agents = create_agents(500, 500, 0.5)
+        randomly_place_agents(agents, env)
+
+        metrics = compute_step_metrics(agents, env)
+
+        expected_unhappy = [not agent.is_happy(env) for agent in agents]
+        assert metrics['unhappy'].tolist() == expected_unhappy
+        assert metrics['happiness'] == calculate_happiness_rate(agents, env)
+        assert metrics['segregation'] == calculate_segregation_index(agents, env)
+
+    def test_tracked_environment_uses_cached_counts(self):
+        env = Environment()
+        agents = create_agents(400, 400, 0.5)
+        randomly_place_agents(agents, env)
+        untracked = compute_step_metrics(agents, env)
+
+        env.track(agents)
+        tracked = compute_step_metrics(agents, env)
+
+        assert tracked['segregation'] == untracked['segregation']
+        assert (tracked['unhappy'] == untracked['unhappy']).all()
+        assert tracked['unhappy'].sum() == len(env.unhappy)
+
+
 class TestAgentCounts:
     """Test agent counting by type."""
 
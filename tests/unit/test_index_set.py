@@ -0,0 +1,101 @@
+"""Unit tests for IndexSet class."""
+
+import pytest
+import numpy as np
+from environment.index_set import IndexSet, MASK_CHUNK_SIZE
+
+
+class TestIndexSetMembership:
+    """Test insertion and removal."""
+
+    def test_initial_keys(self):
+        index = IndexSet(10, [3, 5, 7])
+        assert len(index) == 3
+        assert 5 in index
+        assert 4 not in index
+
+    def test_add_and_discard(self):
+        index = IndexSet(10)
+
+        assert index.add(4) == True
+        assert index.add(4) == False
+        assert index.add(9) == True
+        assert index.discard(4) == True
+        assert index.discard(4) == False
+
+        assert len(index) == 1
+        assert index.keys.tolist() == [9]
+
+    def test_discard_keeps_slots_consistent(self):
+        index = IndexSet(100, np.arange(100))
+        for key in range(0, 100, 3):
+            index.discard(key)
+
+        expected = sorted(set(range(100)) - set(range(0, 100, 3)))
+        assert sorted(index.keys.tolist()) == expected
+        for key in expected:
+            assert key in index
+
+    def test_keys_view_is_read_only(self):
+        index = IndexSet(10, [1, 2])
+        with pytest.raises(ValueError):
+            index.keys[0] = 5
+
+    def test_small_capacity_uses_int32(self):
+        index = IndexSet(100, [3, 5])
+        assert index._keys.dtype == np.int32
+        assert index._slots.dtype == np.int32
+
+    def test_from_mask_matches_flatnonzero(self):
+        rng = np.random.default_rng(4)
+        mask = rng.random(2 * MASK_CHUNK_SIZE + 7) < 0.3
+
+        index = IndexSet.from_mask(mask)
+
+        assert index.capacity == len(mask)
+        assert index.keys.tolist() == np.flatnonzero(mask).tolist()
+        key = int(np.flatnonzero(mask)[-1])
+        assert index.discard(key)
+        assert key not in index
+
+
+class TestIndexSetSampling:
+    """Test random sampling and batch updates."""
+
+    def test_sample_returns_member(self):
+        index = IndexSet(50, [10, 20, 30])
+        for _ in range(20):
+            assert index.sample() in (10, 20, 30)
+
+    def test_sample_is_reproducible_with_generator(self):
+        index = IndexSet(100, range(0, 100, 3))
+        first = [index.sample(np.random.default_rng(4)) for _ in range(5)]
+        second = [index.sample(np.random.default_rng(4)) for _ in range(5)]
+        assert first == second
+
+    def test_sample_empty_raises_error(self):
+        with pytest.raises(ValueError):
+            IndexSet(5).sample()
+
+    def test_add_many_skips_duplicates(self):
+        index = IndexSet(10, [1])
+
+        index.add_many(np.array([1, 4, 4, 6]))
+
+        assert sorted(index.keys.tolist()) == [1, 4, 6]
+        for key in (1, 4, 6):
+            assert key in index
+
+    def test_discard_many_matches_discard(self):
+        rng = np.random.default_rng(0)
+        batch = IndexSet(200, np.arange(200))
+        single = IndexSet(200, np.arange(200))
+
+        removed = rng.integers(0, 250, size=120) % 200
+        batch.discard_many(removed)
+        for key in removed.tolist():
+            single.discard(key)
+
+        assert sorted(batch.keys.tolist()) == sorted(single.keys.tolist())
+        for key in range(200):
+            assert (key in batch) == (key in single)
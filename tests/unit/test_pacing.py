@@ -0,0 +1,91 @@
+"""Unit tests for frame-budget pacing."""
+
+import pytest
+from simulation.pacing import FramePacer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSimulation:
+    """Stands in for Simulation: each step advances the clock by a cost."""
+
+    def __init__(self, clock, cost, moves_left=None):
+        self.clock = clock
+        self.cost = cost
+        self.moves_left = moves_left
+        self.step_count = 0
+
+    def step(self):
+        self.clock.now += self.cost
+        self.step_count += 1
+        if self.moves_left is not None:
+            self.moves_left -= 1
+        return 1
+
+    def convergence(self, plateau_window=None):
+        return 'all_happy' if self.moves_left == 0 else None
+
+
+class TestFramePacer:
+    """Test adaptive step batching."""
+
+    def test_first_frame_measures_one_step(self):
+        clock = FakeClock()
+        pacer = FramePacer(budget=0.1, clock=clock)
+
+        assert pacer.advance(FakeSimulation(clock, 0.004)) == 1
+        assert pacer.step_cost == pytest.approx(0.004)
+
+    def test_batch_fills_budget(self):
+        clock = FakeClock()
+        pacer = FramePacer(budget=0.1, clock=clock)
+        sim = FakeSimulation(clock, 0.004)
+        pacer.advance(sim)
+
+        assert pacer.batch_size() == 25
+        start = clock.now
+        assert pacer.advance(sim) == 25
+        assert clock.now - start <= 0.1 + 1e-9
+
+    def test_slowdown_ends_frame_early(self):
+        clock = FakeClock()
+        pacer = FramePacer(budget=0.1, clock=clock)
+        sim = FakeSimulation(clock, 0.001)
+        pacer.advance(sim)
+
+        sim.cost = 0.05
+        assert pacer.advance(sim) == 2
+        assert pacer.step_cost > 0.001
+
+    def test_adapts_to_cost_changes(self):
+        clock = FakeClock()
+        pacer = FramePacer(budget=0.1, smoothing=0.5, clock=clock)
+        sim = FakeSimulation(clock, 0.01)
+        for _ in range(20):
+            pacer.advance(sim)
+        assert pacer.batch_size() == pytest.approx(10, abs=1)
+
+        sim.cost = 0.02
+        for _ in range(20):
+            pacer.advance(sim)
+        assert pacer.batch_size() == pytest.approx(5, abs=1)
+
+    def test_stops_when_converged(self):
+        clock = FakeClock()
+        pacer = FramePacer(budget=1.0, clock=clock)
+        pacer.step_cost = 0.001
+        sim = FakeSimulation(clock, 0.001, moves_left=3)
+
+        assert pacer.advance(sim) == 3
+        assert pacer.advance(sim) == 0
+        assert pacer.step_cost == 0.001
+
+    def test_invalid_budget_raises_error(self):
+        with pytest.raises(ValueError):
+            FramePacer(budget=0)
@@ -0,0 +1,31 @@
+"""Unit tests for grid packing functions."""
+
+import numpy as np
+from environment.packing import packed_size, pack_cells, unpack_cells
+
+
+class TestPacking:
+    """Test 2-bit pack/unpack."""
+
+    def test_packed_size(self):
+        assert packed_size(0) == 0
+        assert packed_size(4) == 1
+        assert packed_size(5) == 2
+
+    def test_pack_layout(self):
+        packed = pack_cells(np.array([1, 2, 0, 3, 2], dtype=np.uint8))
+        assert packed.tolist() == [0b11001001, 0b00000010]
+
+    def test_round_trip_uneven_shape(self):
+        rng = np.random.default_rng(0)
+        grid = rng.integers(0, 3, size=(13, 7)).astype(np.uint8)
+
+        packed = pack_cells(grid)
+
+        assert packed.nbytes == 23
+        assert (unpack_cells(packed, grid.shape) == grid).all()
+
+    def test_unpack_returns_uint8(self):
+        grid = unpack_cells(pack_cells(np.ones((4, 4))), (4, 4))
+        assert grid.dtype == np.uint8
+        assert (grid == 1).all()
@@ -0,0 +1,49 @@
+"""Unit tests for grid rendering."""
+
+import numpy as np
+from render import hex_to_rgb, render_grid, image_scale, PALETTE
+from config import AGENT_TYPE_A, AGENT_TYPE_B, COLOR_EMPTY, COLOR_TYPE_A, COLOR_TYPE_B
+
+
+class TestPalette:
+    """Test color conversion."""
+
+    def test_hex_to_rgb(self):
+        assert hex_to_rgb('#FF6B6B') == (255, 107, 107)
+        assert hex_to_rgb('4ECDC4') == (78, 205, 196)
+
+    def test_palette_uses_config_colors(self):
+        assert tuple(PALETTE[0]) == hex_to_rgb(COLOR_EMPTY)
+        assert tuple(PALETTE[AGENT_TYPE_A]) == hex_to_rgb(COLOR_TYPE_A)
+        assert tuple(PALETTE[AGENT_TYPE_B]) == hex_to_rgb(COLOR_TYPE_B)
+
+
+class TestRenderGrid:
+    """Test converting grids to images."""
+
+    def test_shape_and_dtype(self):
+        image = render_grid(np.zeros((30, 20), dtype=np.uint8), scale=3)
+        assert image.shape == (60, 90, 3)
+        assert image.dtype == np.uint8
+
+    def test_orientation(self):
+        grid = np.zeros((4, 3), dtype=np.uint8)
+        grid[0, 0] = AGENT_TYPE_A   # bottom left
+        grid[3, 2] = AGENT_TYPE_B   # top right
+
+        image = render_grid(grid)
+        assert tuple(image[2, 0]) == hex_to_rgb(COLOR_TYPE_A)
+        assert tuple(image[0, 3]) == hex_to_rgb(COLOR_TYPE_B)
+        assert tuple(image[0, 0]) == hex_to_rgb(COLOR_EMPTY)
+
+    def test_nearest_neighbor_blocks(self):
+        grid = np.array([[AGENT_TYPE_A, 0], [0, AGENT_TYPE_B]], dtype=np.uint8)
+        image = render_grid(grid, scale=4)
+
+        assert (image[4:, :4] == hex_to_rgb(COLOR_TYPE_A)).all()
+        assert (image[:4, 4:] == hex_to_rgb(COLOR_TYPE_B)).all()
+
+    def test_image_scale(self):
+        assert image_scale(50, 50) == 12
+        assert image_scale(200, 100) == 3
+        assert image_scale(1000, 10) == 1
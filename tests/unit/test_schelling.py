@@ -0,0 +1,141 @@
+"""Unit tests for the headless command line runner."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from schelling import main
+from simulation.trajectory import MoveLog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestRun:
+    """Test the run subcommand."""
+
+    def test_writes_one_record_per_step(self, tmp_path):
+        out = tmp_path / 'metrics.jsonl'
+        assert main(['run', '--size', '30', '--type-a', '300', '--type-b', '300',
+                     '--seed', '1', '--max-steps', '5', '--output', str(out)]) == 0
+
+        records = read_records(out)
+        assert [r['step'] for r in records] == list(range(len(records)))
+        assert 2 <= len(records) <= 6
+        for record in records:
+            assert set(record) == {'step', 'segregation', 'happiness', 'moved'}
+            assert 0.0 <= record['segregation'] <= 1.0
+            assert 0.0 <= record['happiness'] <= 1.0
+
+    def test_same_seed_same_output(self, tmp_path):
+        args = ['run', '--size', '30', '--type-a', '300', '--type-b', '300',
+                '--threshold', '0.5', '--seed', '7', '--max-steps', '20']
+        main(args + ['--output', str(tmp_path / 'a.jsonl')])
+        main(args + ['--output', str(tmp_path / 'b.jsonl')])
+
+        assert (tmp_path / 'a.jsonl').read_text() == (tmp_path / 'b.jsonl').read_text()
+
+    def test_stops_when_converged(self, tmp_path):
+        out = tmp_path / 'metrics.jsonl'
+        main(['run', '--size', '20', '--type-a', '50', '--type-b', '50', '--threshold', '0',
+              '--seed', '1', '--max-steps', '50', '--plateau-window', '0', '--output', str(out)])
+
+        records = read_records(out)
+        assert records[-1]['happiness'] == 1.0
+        assert len(records) < 51
+        assert all(r['moved'] > 0 for r in records[1:])
+
+    def test_stops_on_plateau(self, tmp_path):
+        out = tmp_path / 'metrics.jsonl'
+        main(['run', '--size', '30', '--type-a', '420', '--type-b', '420', '--threshold', '0.95',
+              '--seed', '1', '--max-steps', '500', '--plateau-window', '10', '--output', str(out)])
+
+        records = read_records(out)
+        assert len(records) < 501
+        assert records[-1]['happiness'] < 1.0
+
+    @pytest.mark.parametrize('policy', ['synchronous', 'checkerboard', 'best_of_k'])
+    def test_move_policy(self, tmp_path, policy):
+        out = tmp_path / 'metrics.jsonl'
+        main(['run', '--size', '30', '--type-a', '300', '--type-b', '300', '--seed', '3',
+              '--max-steps', '10', '--policy', policy, '--output', str(out)])
+
+        records = read_records(out)
+        assert records[1]['moved'] > 0
+        assert records[-1]['happiness'] > records[0]['happiness']
+
+    def test_records_move_log(self, tmp_path):
+        main(['run', '--size', '20', '--type-a', '120', '--type-b', '120', '--seed', '2',
+              '--max-steps', '6', '--output', str(tmp_path / 'metrics.jsonl'),
+              '--record', str(tmp_path / 'log'), '--keyframe-interval', '2'])
+
+        records = read_records(tmp_path / 'metrics.jsonl')
+        log = MoveLog(str(tmp_path / 'log'))
+        assert len(log) == records[-1]['step']
+        assert [len(log.moves(r['step'])) for r in records[1:]] == [r['moved'] for r in records[1:]]
+
+    def test_too_many_agents_exits_with_error(self, tmp_path):
+        with pytest.raises(SystemExit) as exc:
+            main(['run', '--size', '10', '--type-a', '80', '--type-b', '80',
+                  '--output', str(tmp_path / 'metrics.jsonl')])
+        assert exc.value.code == 2
+
+    def test_invalid_candidates_exits_with_error(self):
+        with pytest.raises(SystemExit) as exc:
+            main(['run', '--policy', 'best_of_k', '--candidates', '0'])
+        assert exc.value.code == 2
+
+    def test_invalid_threshold_exits_with_error(self):
+        with pytest.raises(SystemExit) as exc:
+            main(['run', '--threshold', '1.5'])
+        assert exc.value.code == 2
+
+    def test_does_not_import_ui_libraries(self):
+        code = ("import sys, schelling; "
+                "print(any(m.split('.')[0] in ('streamlit', 'matplotlib') for m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == 'False'
+
+
+class TestSweep:
+    """Test the sweep subcommand."""
+
+    def test_writes_one_record_per_replica(self, tmp_path):
+        out = tmp_path / 'sweep.jsonl'
+        assert main(['sweep', '--size', '20', '--type-a', '150', '--type-b', '150',
+                     '--thresholds', '0.3', '0.6', '--replicas', '3', '--seed', '1',
+                     '--max-steps', '50', '--output', str(out)]) == 0
+
+        records = read_records(out)
+        assert [r['replica'] for r in records] == list(range(6))
+        assert [r['threshold'] for r in records] == [0.3] * 3 + [0.6] * 3
+        for record in records:
+            assert set(record) == {'replica', 'threshold', 'steps', 'segregation', 'happiness'}
+            assert 0 <= record['steps'] <= 50
+            assert 0.0 <= record['segregation'] <= 1.0
+            assert 0.0 <= record['happiness'] <= 1.0
+
+    def test_same_seed_same_output(self, tmp_path):
+        args = ['sweep', '--size', '20', '--type-a', '150', '--type-b', '150',
+                '--replicas', '2', '--seed', '7', '--max-steps', '20']
+        main(args + ['--output', str(tmp_path / 'a.jsonl')])
+        main(args + ['--output', str(tmp_path / 'b.jsonl')])
+        assert read_records(tmp_path / 'a.jsonl') == read_records(tmp_path / 'b.jsonl')
+
+    def test_too_many_agents_exits_with_error(self, tmp_path):
+        with pytest.raises(SystemExit) as exc:
+            main(['sweep', '--size', '10', '--type-a', '80', '--type-b', '80',
+                  '--output', str(tmp_path / 'sweep.jsonl')])
+        assert exc.value.code == 2
+
+    def test_invalid_thresholds_exit_with_error(self):
+        with pytest.raises(SystemExit) as exc:
+            main(['sweep', '--thresholds', '0.5', '1.5'])
+        assert exc.value.code == 2
@@ -0,0 +1,533 @@
+"""Unit tests for Simulation class."""
+
+import numpy as np
+import pytest
+from agent.agent import Agent
+from environment.environment import Environment, sublattice_colors
+from simulation.simulation import Simulation
+from simulation.trajectory import MoveRecorder, MoveLog, Replay
+from helper import (create_agents, randomly_place_agents, calculate_segregation_index,
+                    calculate_happiness_rate, get_unhappy_agents)
+from config import (AGENT_TYPE_A, AGENT_TYPE_B, TOPOLOGY_BOUNDED, CONVERGED_ALL_HAPPY,
+                    CONVERGED_NO_MOVES, CONVERGED_PLATEAU, MOVE_POLICY_SYNCHRONOUS,
+                    MOVE_POLICY_CHECKERBOARD, MOVE_POLICY_BEST_OF_K)
+
+
+def place(env, x, y, agent_type, threshold=0.5):
+    """Place a new agent and return it."""
+    agent = Agent(x=x, y=y, agent_type=agent_type, similarity_threshold=threshold)
+    env.place_agent(agent, x, y)
+    return agent
+
+
+class TestUnhappyDetection:
+    """Test vectorized happiness evaluation."""
+
+    def test_unhappy_indices_match_helper(self):
+        env = Environment(seed=0)
+        agents = create_agents(300, 300, 0.5)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        expected = [i for i, agent in enumerate(agents) if not agent.is_happy(env)]
+
+        assert sim.unhappy_indices().tolist() == expected
+
+    def test_isolated_agent_is_unhappy(self):
+        env = Environment()
+        agents = [place(env, 25, 25, AGENT_TYPE_A, 0.0)]
+
+        sim = Simulation(env, agents)
+        assert sim.unhappy_indices().tolist() == [0]
+
+    def test_wrapped_neighbors_are_counted(self):
+        env = Environment()
+        agents = [place(env, 0, 0, AGENT_TYPE_A), place(env, 49, 49, AGENT_TYPE_A)]
+
+        sim = Simulation(env, agents)
+        assert len(sim.unhappy_indices()) == 0
+
+
+class TestStep:
+    """Test stepping the simulation."""
+
+    def test_step_moves_only_unhappy_agents(self):
+        env = Environment(seed=1)
+        happy = [place(env, x, y, AGENT_TYPE_A) for x in range(3) for y in range(3)]
+        lonely = place(env, 30, 30, AGENT_TYPE_B)
+        agents = happy + [lonely]
+
+        sim = Simulation(env, agents)
+        moved = sim.step()
+
+        assert moved == 1
+        assert [(a.x, a.y) for a in happy] == [(x, y) for x in range(3) for y in range(3)]
+        assert (lonely.x, lonely.y) != (30, 30)
+        assert env.grid[lonely.x, lonely.y] == AGENT_TYPE_B
+        assert env.grid[30, 30] == 0
+
+    def test_step_records_metrics(self):
+        env = Environment(seed=2)
+        agents = create_agents(200, 200, 0.3)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        sim.run(3)
+
+        assert sim.step_count == 3
+        assert len(sim.segregation_history) == 3
+        assert len(sim.happiness_history) == 3
+        assert abs(sim.segregation_history[-1] - calculate_segregation_index(agents, env)) < 1e-12
+        assert sim.happiness_history[-1] == calculate_happiness_rate(agents, env)
+
+    def test_step_without_vacancies_moves_nobody(self):
+        env = Environment()
+        env.grid[:, :] = AGENT_TYPE_B
+        agents = [Agent(x=0, y=0, agent_type=AGENT_TYPE_A, similarity_threshold=0.5)]
+        env.grid[0, 0] = AGENT_TYPE_A
+
+        sim = Simulation(env, agents)
+        assert sim.step() == 0
+
+
+class TestIncrementalTracking:
+    """Test that tracked state stays exact across vectorized steps."""
+
+    def test_counts_and_unhappy_set_stay_exact(self):
+        env = Environment(seed=5)
+        agents = create_agents(900, 900, 0.6)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        sim.run(8)
+
+        counts = env.neighbor_counts()
+        assert (env.type_counts[0] == counts['type_a']).all()
+        assert (env.type_counts[1] == counts['type_b']).all()
+        assert sim.unhappy_indices().tolist() == sorted(
+            i for i, agent in enumerate(agents) if not agent.is_happy(env))
+
+    def test_running_segregation_matches_full_pass(self):
+        env = Environment(width=80, height=80, seed=7)
+        agents = create_agents(2500, 2500, 0.5)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        sim.run(40)
+
+        assert abs(env.segregation_index() - calculate_segregation_index(agents, env)) < 1e-9
+        assert sim.happiness_history[-1] == calculate_happiness_rate(agents, env)
+
+
+class TestRandomStreams:
+    """Test per-instance random generators."""
+
+    def run_seeded(self, seed, sim_seed=None):
+        env = Environment(seed=seed)
+        agents = create_agents(500, 500, 0.5)
+        randomly_place_agents(agents, env)
+        sim = Simulation(env, agents, seed=sim_seed)
+        sim.run(10)
+        return env.grid.copy(), sim.segregation_history
+
+    def test_same_seed_is_bit_identical(self):
+        grid_a, history_a = self.run_seeded(11)
+        grid_b, history_b = self.run_seeded(11)
+
+        assert np.array_equal(grid_a, grid_b)
+        assert history_a == history_b
+
+    def test_unaffected_by_global_state(self):
+        np.random.seed(0)
+        grid_a, _ = self.run_seeded(11)
+        np.random.seed(1)
+        grid_b, _ = self.run_seeded(11)
+
+        assert np.array_equal(grid_a, grid_b)
+
+    def test_simulation_seed_gives_own_stream(self):
+        grid_a, _ = self.run_seeded(11, sim_seed=1)
+        grid_b, _ = self.run_seeded(11, sim_seed=2)
+        grid_c, _ = self.run_seeded(11, sim_seed=1)
+
+        assert not np.array_equal(grid_a, grid_b)
+        assert np.array_equal(grid_a, grid_c)
+
+
+class TestCheckpoint:
+    """Test saving and restoring full simulation state."""
+
+    def make_sim(self, sim_seed=None, **grid):
+        env = Environment(seed=21, **grid)
+        agents = create_agents(600, 600, 0.6)
+        randomly_place_agents(agents, env)
+        sim = Simulation(env, agents, seed=sim_seed)
+        sim.run(4)
+        return sim
+
+    def assert_same_state(self, a, b):
+        assert np.array_equal(a.env.grid, b.env.grid)
+        assert np.array_equal(a.agents.x, b.agents.x)
+        assert np.array_equal(a.agents.y, b.agents.y)
+        assert a.step_count == b.step_count
+        assert a.happiness_history == b.happiness_history
+        assert a.segregation_history == b.segregation_history
+
+    def test_round_trip_continues_identically(self, tmp_path):
+        path = str(tmp_path / 'sim.npz')
+        sim = self.make_sim()
+        sim.save(path)
+        restored = Simulation.load(path)
+
+        self.assert_same_state(sim, restored)
+        assert restored.env.width == 50 and restored.env.radius == 1
+
+        sim.run(6)
+        restored.run(6)
+        self.assert_same_state(sim, restored)
+
+    def test_metrics_continue_bit_for_bit(self, tmp_path):
+        path = str(tmp_path / 'sim.npz')
+        env = Environment(width=17, height=13, seed=0)
+        agents = create_agents(70, 70, 0.6)
+        randomly_place_agents(agents, env)
+        sim = Simulation(env, agents)
+        sim.run(23)
+        sim.save(path)
+        restored = Simulation.load(path)
+
+        sim.run(5)
+        restored.run(5)
+        self.assert_same_state(sim, restored)
+
+    def test_own_stream_and_bounded_grid_restored(self, tmp_path):
+        path = str(tmp_path / 'sim.npz')
+        sim = self.make_sim(sim_seed=3, width=40, height=60, radius=2,
+                            topology=TOPOLOGY_BOUNDED)
+        sim.save(path)
+        restored = Simulation.load(path)
+
+        assert restored.rng is not restored.env.rng
+        assert restored.env.topology == TOPOLOGY_BOUNDED
+        sim.run(5)
+        restored.run(5)
+        self.assert_same_state(sim, restored)
+
+    def test_memory_mapped_load(self, tmp_path):
+        path = str(tmp_path / 'sim.npz')
+        sim = self.make_sim()
+        sim.save(path, compressed=False)
+        saved_bytes = open(path, 'rb').read()
+
+        restored = Simulation.load(path, mmap_mode='c')
+        sim.run(5)
+        restored.run(5)
+
+        self.assert_same_state(sim, restored)
+        assert open(path, 'rb').read() == saved_bytes
+
+    def test_move_policy_restored(self, tmp_path):
+        path = str(tmp_path / 'sim.npz')
+        sim = self.make_sim()
+        sim.policy = MOVE_POLICY_SYNCHRONOUS
+        sim.save(path)
+        restored = Simulation.load(path)
+
+        assert restored.policy == MOVE_POLICY_SYNCHRONOUS
+        sim.run(5)
+        restored.run(5)
+        self.assert_same_state(sim, restored)
+
+    @pytest.mark.parametrize('mmap_mode', ['r', 'r+'])
+    def test_writable_or_read_only_mapping_rejected(self, tmp_path, mmap_mode):
+        path = str(tmp_path / 'sim.npz')
+        self.make_sim().save(path, compressed=False)
+
+        with pytest.raises(ValueError):
+            Simulation.load(path, mmap_mode=mmap_mode)
+
+    def test_packed_environment_stays_packed(self, tmp_path):
+        path = str(tmp_path / 'sim.npz')
+        sim = self.make_sim()
+        sim.env.pack()
+        sim.save(path)
+
+        restored = Simulation.load(path)
+        assert restored.env.is_packed
+        assert np.array_equal(restored.env.grid, sim.env.grid)
+
+
+class TestGridConfiguration:
+    """Test simulations on differently configured environments."""
+
+    def test_independent_grid_sizes(self):
+        small = Environment(width=20, height=30, seed=6)
+        large = Environment(width=120, height=80, radius=2, topology=TOPOLOGY_BOUNDED, seed=6)
+        small_agents = create_agents(200, 200, 0.4)
+        large_agents = create_agents(3000, 3000, 0.4)
+        randomly_place_agents(small_agents, small)
+        randomly_place_agents(large_agents, large)
+
+        Simulation(small, small_agents).run(5)
+        Simulation(large, large_agents).run(5)
+
+        assert small.grid.shape == (20, 30)
+        assert np.count_nonzero(small.grid) == 400
+        assert np.count_nonzero(large.grid) == 6000
+        assert (large.grid[large_agents.x, large_agents.y] == large_agents.agent_type).all()
+
+
+class TestMovePolicies:
+    """Test the alternative move policies."""
+
+    def make_sim(self, policy, seed=11):
+        env = Environment(seed=seed)
+        agents = create_agents(1000, 1000, 0.6)
+        randomly_place_agents(agents, env)
+        return Simulation(env, agents, policy=policy)
+
+    def test_synchronous_moves_into_initial_vacancies_only(self):
+        sim = self.make_sim(MOVE_POLICY_SYNCHRONOUS)
+        agents = sim.agents
+        unhappy = set(sim.unhappy_indices().tolist())
+        vacant = set(sim.env.vacancies.keys.tolist())
+        before = agents.x * 50 + agents.y
+
+        moved = sim.step()
+
+        after = agents.x * 50 + agents.y
+        changed = np.flatnonzero(after != before)
+        assert moved == len(changed) > 0
+        assert set(changed.tolist()) <= unhappy
+        assert set(after[changed].tolist()) <= vacant
+        assert len(set(after.tolist())) == len(agents)
+
+    def test_synchronous_contested_vacancy_has_one_winner(self):
+        env = Environment(width=10, height=10, seed=4)
+        env.grid[:, :] = AGENT_TYPE_B
+        env.grid[::2, ::2] = AGENT_TYPE_A
+        env.grid[5, 5] = 0
+        env.rebuild_vacancies()
+        x, y = np.nonzero(env.grid)
+        agents = [Agent(x=int(i), y=int(j), agent_type=int(env.grid[i, j]),
+                        similarity_threshold=0.5) for i, j in zip(x, y)]
+
+        sim = Simulation(env, agents, policy=MOVE_POLICY_SYNCHRONOUS)
+        assert len(sim.unhappy_indices()) > 1
+        assert sim.step() == 1
+        assert env.grid[5, 5] != 0
+
+    def test_synchronous_tracking_stays_exact(self):
+        sim = self.make_sim(MOVE_POLICY_SYNCHRONOUS)
+        sim.run(10)
+
+        env, agents = sim.env, sim.agents
+        assert abs(env.segregation_index() - calculate_segregation_index(agents, env)) < 1e-9
+        assert sim.unhappy_indices().tolist() == sorted(
+            i for i, agent in enumerate(agents) if not agent.is_happy(env))
+
+    def test_synchronous_same_seed_is_bit_identical(self):
+        a = self.make_sim(MOVE_POLICY_SYNCHRONOUS)
+        b = self.make_sim(MOVE_POLICY_SYNCHRONOUS)
+        a.run(5)
+        b.run(5)
+
+        assert np.array_equal(a.env.grid, b.env.grid)
+
+    def boxed_in(self, env, x, y):
+        """Place an unhappy type B agent walled in by contented type A agents."""
+        walls = [place(env, x + dx, y + dy, AGENT_TYPE_A, 0.0)
+                 for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+        return place(env, x, y, AGENT_TYPE_B), walls
+
+    def test_checkerboard_moves_stay_local(self):
+        env = Environment(width=30, height=30, seed=2)
+        lonely = place(env, 5, 5, AGENT_TYPE_A)
+        boxed, walls = self.boxed_in(env, 20, 20)
+
+        sim = Simulation(env, [lonely, boxed] + walls, policy=MOVE_POLICY_CHECKERBOARD)
+        assert sim.step() == 1
+
+        # At most one move of one cell per sublattice visited in the step
+        num_sublattices = (len(np.unique(sublattice_colors(30, 3)))
+                           * len(np.unique(sublattice_colors(30, 3))))
+        assert num_sublattices == 9
+        assert 0 < max(abs(lonely.x - 5), abs(lonely.y - 5)) <= num_sublattices
+        assert (boxed.x, boxed.y) == (20, 20)
+
+    def test_checkerboard_reports_no_moves_when_stuck(self):
+        env = Environment(seed=2)
+        boxed, walls = self.boxed_in(env, 20, 20)
+
+        sim = Simulation(env, [boxed] + walls, policy=MOVE_POLICY_CHECKERBOARD)
+        assert sim.convergence() is None
+        assert sim.step() == 0
+
+        assert sim.convergence() == CONVERGED_NO_MOVES
+        assert sim.run_until_converged(max_steps=100) == 0
+
+    def test_checkerboard_tracking_and_log_stay_exact(self, tmp_path):
+        sim = self.make_sim(MOVE_POLICY_CHECKERBOARD)
+        sim.record(MoveRecorder(str(tmp_path / 'log'), keyframe_interval=100))
+        start = sim.env.grid.copy()
+        moved = [sim.step() for _ in range(5)]
+        sim.recorder.close()
+
+        env, agents = sim.env, sim.agents
+        assert all(m > 0 for m in moved)
+        assert abs(env.segregation_index() - calculate_segregation_index(agents, env)) < 1e-9
+        assert sim.unhappy_indices().tolist() == sorted(
+            i for i, agent in enumerate(agents) if not agent.is_happy(env))
+
+        replay = Replay(MoveLog(str(tmp_path / 'log')))
+        assert np.array_equal(replay.grid_at(0), start)
+        assert np.array_equal(replay.grid_at(5), env.grid)
+
+    def test_checkerboard_on_bounded_odd_grid(self):
+        env = Environment(width=31, height=29, topology=TOPOLOGY_BOUNDED, seed=8)
+        agents = create_agents(300, 300, 0.6)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents, policy=MOVE_POLICY_CHECKERBOARD)
+        sim.run(5)
+
+        assert (env.grid[agents.x, agents.y] == agents.agent_type).all()
+        assert np.count_nonzero(env.grid) == 600
+
+    def fill(self, env, agent_type, keep):
+        """Fill every cell outside keep with contented agents of one type."""
+        cells = [(x, y) for x in range(env.width) for y in range(env.height)
+                 if env.grid[x, y] == 0 and (x, y) not in keep]
+        return [place(env, x, y, agent_type, 0.0) for x, y in cells]
+
+    def test_best_of_k_picks_most_similar_candidate(self):
+        env = Environment(width=20, height=20, seed=3)
+        mover = place(env, 2, 2, AGENT_TYPE_A)
+        block = [place(env, x, y, AGENT_TYPE_A, 0.0)
+                 for x in range(8, 11) for y in range(8, 11) if (x, y) != (9, 9)]
+        others = self.fill(env, AGENT_TYPE_B, keep={(9, 9), (15, 15)})
+
+        sim = Simulation(env, [mover] + block + others, policy=MOVE_POLICY_BEST_OF_K,
+                         candidates=50)
+        assert sim.step() == 1
+
+        assert (mover.x, mover.y) == (9, 9)
+
+    def test_best_of_k_discounts_own_neighborhood(self):
+        env = Environment(width=10, height=10, seed=0)
+        mover = place(env, 5, 5, AGENT_TYPE_A, 0.9)
+        near = place(env, 5, 7, AGENT_TYPE_B, 0.0)
+        inner = {(x, y) for x in range(3, 8) for y in range(3, 8)}
+        others = self.fill(env, AGENT_TYPE_B, keep=inner)
+
+        sim = Simulation(env, [mover, near] + others, policy=MOVE_POLICY_BEST_OF_K,
+                         candidates=100)
+        sim.step()
+
+        # Counting itself, cells next to the mover would look 100% similar,
+        # yet it would have no neighbors there at all
+        counts = env.count_neighbors(mover.x, mover.y)
+        assert counts['type_a'] + counts['type_b'] > 0
+
+    def test_best_of_k_converges_in_fewer_steps(self):
+        steps = {}
+        for policy in (MOVE_POLICY_SYNCHRONOUS, MOVE_POLICY_BEST_OF_K):
+            env = Environment(width=60, height=60, seed=9)
+            agents = create_agents(1500, 1500, 0.5)
+            randomly_place_agents(agents, env)
+            sim = Simulation(env, agents, policy=policy)
+            steps[policy] = sim.run_until_converged(max_steps=500)
+            assert sim.convergence() == CONVERGED_ALL_HAPPY
+
+        assert steps[MOVE_POLICY_BEST_OF_K] < steps[MOVE_POLICY_SYNCHRONOUS]
+
+    def test_invalid_candidates_raises_error(self):
+        with pytest.raises(ValueError):
+            Simulation(Environment(), [], policy=MOVE_POLICY_BEST_OF_K, candidates=0)
+
+    def test_unknown_policy_raises_error(self):
+        env = Environment()
+        with pytest.raises(ValueError):
+            Simulation(env, [], policy='teleport')
+
+
+class TestRunUntilConverged:
+    """Test convergence loop."""
+
+    def test_stops_when_all_happy(self):
+        env = Environment(seed=3)
+        agents = create_agents(100, 100, 0.3)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        sim.run_until_converged(max_steps=500)
+
+        assert len(get_unhappy_agents(agents, env)) == 0
+
+    def test_respects_max_steps(self):
+        env = Environment(seed=4)
+        agents = create_agents(600, 600, 0.8)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        steps = sim.run_until_converged(max_steps=5)
+
+        assert steps == 5
+        assert sim.step_count == 5
+
+    def test_no_step_recorded_after_convergence(self):
+        env = Environment()
+        agents = [place(env, x, y, AGENT_TYPE_A) for x in range(3) for y in range(3)]
+
+        sim = Simulation(env, agents)
+        assert sim.run_until_converged(max_steps=10) == 0
+        assert sim.step_count == 0
+        assert sim.segregation_history == []
+
+
+class TestConvergence:
+    """Test convergence states."""
+
+    def test_all_happy(self):
+        env = Environment()
+        agents = [place(env, x, y, AGENT_TYPE_A) for x in range(3) for y in range(3)]
+
+        assert Simulation(env, agents).convergence() == CONVERGED_ALL_HAPPY
+
+    def test_no_moves_without_vacancies(self):
+        env = Environment(width=3, height=3)
+        env.grid[:, :] = AGENT_TYPE_B
+        env.grid[0, 0] = AGENT_TYPE_A
+        agents = [Agent(x=x, y=y, agent_type=int(env.grid[x, y]), similarity_threshold=0.5)
+                  for x in range(3) for y in range(3)]
+
+        assert Simulation(env, agents).convergence() == CONVERGED_NO_MOVES
+
+    def test_evolving_simulation_has_no_state(self):
+        env = Environment(seed=8)
+        agents = create_agents(600, 600, 0.5)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        sim.run(3)
+        assert sim.convergence() is None
+
+    def test_plateau_stops_fluctuating_run(self):
+        env = Environment(width=30, height=30, seed=1)
+        agents = create_agents(420, 420, 0.95)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        steps = sim.run_until_converged(max_steps=300, plateau_window=10)
+
+        assert steps < 300
+        assert sim.convergence(plateau_window=10) == CONVERGED_PLATEAU
+        assert sim.convergence(plateau_window=None) is None
+
+    def test_plateau_disabled_runs_to_max_steps(self):
+        env = Environment(width=30, height=30, seed=1)
+        agents = create_agents(420, 420, 0.95)
+        randomly_place_agents(agents, env)
+
+        sim = Simulation(env, agents)
+        assert sim.run_until_converged(max_steps=60, plateau_window=None) == 60
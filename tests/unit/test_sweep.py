@@ -0,0 +1,49 @@
+"""Unit tests for parallel parameter sweeps."""
+
+import numpy as np
+from simulation.sweep import run_converged, run_sweep
+
+GRID = {'width': 20, 'height': 20}
+
+
+def make_runs():
+    return [dict(grid=GRID, num_type_a=100, num_type_b=100, threshold=t, max_steps=30)
+            for t in (0.2, 0.5, 0.8)]
+
+
+class TestRunConverged:
+    """Test a single sweep run."""
+
+    def test_same_seed_same_result(self):
+        assert run_converged(GRID, 100, 100, 0.5, 30, seed=3) == \
+            run_converged(GRID, 100, 100, 0.5, 30, seed=3)
+
+    def test_zero_threshold_everyone_with_neighbors_happy(self):
+        segregation, happiness = run_converged(GRID, 150, 150, 0.0, 50, seed=1)
+        assert 0.0 <= segregation <= 1.0
+        assert happiness > 0.9
+
+
+class TestRunSweep:
+    """Test sweeps in a process pool."""
+
+    def test_yields_every_run_once(self):
+        results = dict(run_sweep(make_runs(), seed=0, max_workers=2))
+        assert sorted(results) == [0, 1, 2]
+
+    def test_seeded_sweep_is_reproducible(self):
+        first = dict(run_sweep(make_runs(), seed=5, max_workers=2))
+        second = dict(run_sweep(make_runs(), seed=5, max_workers=3))
+        assert first == second
+
+    def test_matches_serial_runs_with_spawned_seeds(self):
+        runs = make_runs()
+        seeds = np.random.SeedSequence(8).spawn(len(runs))
+        serial = {i: run_converged(seed=seed, **run)
+                  for i, (run, seed) in enumerate(zip(runs, seeds))}
+        assert dict(run_sweep(runs, seed=8, max_workers=2)) == serial
+
+    def test_runs_get_independent_seeds(self):
+        runs = [make_runs()[1]] * 3
+        results = dict(run_sweep(runs, seed=5, max_workers=2))
+        assert len(set(results.values())) > 1
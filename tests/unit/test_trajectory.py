@@ -0,0 +1,141 @@
+"""Unit tests for the binary move log."""
+
+import os
+
+import numpy as np
+import pytest
+from environment.environment import Environment
+from simulation.simulation import Simulation
+from simulation.trajectory import MoveRecorder, MoveLog, Replay, MOVE_DTYPE, apply_step
+from helper import create_agents, randomly_place_agents
+
+
+def make_sim(seed=0):
+    env = Environment(width=30, height=20, seed=seed)
+    agents = create_agents(220, 220, 0.6)
+    randomly_place_agents(agents, env)
+    return Simulation(env, agents)
+
+
+def record_run(path, steps, keyframe_interval=3):
+    """Record a run and return the grid after every step."""
+    sim = make_sim()
+    grids = [sim.env.grid.copy()]
+    with MoveRecorder(path, keyframe_interval=keyframe_interval) as recorder:
+        sim.record(recorder)
+        for _ in range(steps):
+            sim.step()
+            grids.append(sim.env.grid.copy())
+    return grids
+
+
+class TestRecording:
+    """Test writing a log from a running simulation."""
+
+    def test_replaying_moves_reproduces_every_grid(self, tmp_path):
+        sim = make_sim()
+        grids = [sim.env.grid.copy()]
+        moved = []
+        with MoveRecorder(str(tmp_path), keyframe_interval=3) as recorder:
+            sim.record(recorder)
+            for _ in range(7):
+                moved.append(sim.step())
+                grids.append(sim.env.grid.copy())
+
+        log = MoveLog(str(tmp_path))
+        assert len(log) == 7
+        grid = grids[0].copy()
+        for step in range(1, 8):
+            moves = log.moves(step)
+            assert len(moves) == moved[step - 1]
+            apply_step(grid, moves)
+            assert np.array_equal(grid, grids[step])
+
+    def test_keyframes(self, tmp_path):
+        sim = make_sim()
+        grids = [sim.env.grid.copy()]
+        with MoveRecorder(str(tmp_path), keyframe_interval=3) as recorder:
+            sim.record(recorder)
+            for _ in range(7):
+                sim.step()
+                grids.append(sim.env.grid.copy())
+
+        log = MoveLog(str(tmp_path))
+        for step, expected in [(0, 0), (2, 0), (3, 3), (5, 3), (6, 6), (7, 6)]:
+            keyframe_step, grid = log.keyframe(step)
+            assert keyframe_step == expected
+            assert np.array_equal(grid, grids[expected])
+
+    def test_records_agent_ids(self, tmp_path):
+        sim = make_sim()
+        with MoveRecorder(str(tmp_path)) as recorder:
+            sim.record(recorder)
+            sim.step()
+
+        moves = MoveLog(str(tmp_path)).moves(1)
+        agents = sim.agents
+        expected = agents.x[moves['agent']] * sim.env.height + agents.y[moves['agent']]
+        assert np.array_equal(moves['destination'], expected)
+
+    def test_log_starts_at_current_step(self, tmp_path):
+        sim = make_sim()
+        sim.run(4)
+        with MoveRecorder(str(tmp_path), keyframe_interval=2) as recorder:
+            sim.record(recorder)
+            sim.run(3)
+
+        log = MoveLog(str(tmp_path))
+        assert (log.first_step, log.last_step) == (4, 7)
+        assert log.keyframe(7)[0] == 6
+        with pytest.raises(IndexError):
+            log.moves(4)
+        with pytest.raises(IndexError):
+            log.moves(8)
+
+    def test_files_trimmed_to_records(self, tmp_path):
+        sim = make_sim()
+        with MoveRecorder(str(tmp_path)) as recorder:
+            sim.record(recorder)
+            total = sum(sim.step() for _ in range(5))
+
+        assert os.path.getsize(tmp_path / 'moves.bin') == total * MOVE_DTYPE.itemsize
+
+    def test_flush_makes_steps_visible(self, tmp_path):
+        sim = make_sim()
+        recorder = MoveRecorder(str(tmp_path))
+        sim.record(recorder)
+        sim.run(2)
+        recorder.flush()
+
+        assert len(MoveLog(str(tmp_path))) == 2
+        recorder.close()
+
+    def test_begin_twice_raises_error(self, tmp_path):
+        sim = make_sim()
+        with MoveRecorder(str(tmp_path)) as recorder:
+            sim.record(recorder)
+            with pytest.raises(ValueError):
+                recorder.begin(sim.env, 0)
+
+
+class TestReplay:
+    """Test rebuilding historical grids."""
+
+    def test_every_step_in_any_order(self, tmp_path):
+        grids = record_run(str(tmp_path), 10)
+        replay = Replay(MoveLog(str(tmp_path)))
+
+        for step in [10, 0, 4, 5, 9, 2, 2, 7, 1, 10]:
+            assert np.array_equal(replay.grid_at(step), grids[step])
+
+    def test_grid_is_read_only(self, tmp_path):
+        record_run(str(tmp_path), 2)
+        grid = Replay(MoveLog(str(tmp_path))).grid_at(1)
+
+        with pytest.raises(ValueError):
+            grid[0, 0] = 1
+
+    def test_step_outside_log_raises_error(self, tmp_path):
+        record_run(str(tmp_path), 2)
+        with pytest.raises(IndexError):
+            Replay(MoveLog(str(tmp_path))).grid_at(3)